@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+# Valeur mise en cache pour « pas membre » (None signifie « absent du cache »)
+NOT_MEMBER = ''
+
+
+class TTLCache:
+    """Cache LRU borné dont les entrées expirent après `ttl` secondes"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class MembershipResolver:
+    """
+    Résout l'appartenance aux groupes de discussion et les rôles dans les projets.
+    Mémoïsé par requête, puis dans un cache LRU/TTL partagé par le processus ;
+    les écritures sur DiscussionMember et ProjectMember invalident les entrées.
+    """
+    request_attribute = '_membership_cache'
+
+    def __init__(self):
+        options = getattr(settings, 'MEMBERSHIP_CACHE', {})
+        self.cache = TTLCache(options.get('MAXSIZE', 10000), options.get('TTL', 60))
+        # Incrémenté à chaque invalidation pour périmer les mémos de requête
+        self.generation = 0
+
+    def _memo(self, request):
+        """Valeurs déjà résolues pendant la requête courante"""
+        if request is None:
+            return None
+        memo = getattr(request, self.request_attribute, None)
+        if memo is None or memo['generation'] != self.generation:
+            memo = {'generation': self.generation, 'values': {}}
+            setattr(request, self.request_attribute, memo)
+        return memo['values']
+
+    def _resolve(self, request, key, loader):
+        memo = self._memo(request)
+        if memo is not None and key in memo:
+            return memo[key]
+
+        value = self.cache.get(key)
+        if value is None:
+            value = loader() or NOT_MEMBER
+            self.cache.set(key, value)
+        if memo is not None:
+            memo[key] = value
+        return value
+
+    def prime(self, request, key, value):
+        """Enregistre une valeur déjà connue (ex. annotation d'un queryset)"""
+        value = value or NOT_MEMBER
+        self.cache.set(key, value)
+        memo = self._memo(request)
+        if memo is not None:
+            memo[key] = value
+
+    def _drop(self, key):
+        self.cache.delete(key)
+        self.generation += 1
+
+    def invalidate(self, key):
+        self._drop(key)
+        # Une requête concurrente a pu relire l'ancienne valeur avant la validation
+        transaction.on_commit(lambda: self._drop(key))
+
+    def clear(self):
+        self.cache.clear()
+        self.generation += 1
+
+    # Groupes de discussion
+
+    @staticmethod
+    def group_key(group_id, user_id):
+        return ('forum.group', int(group_id), user_id)
+
+    def is_group_member(self, request, group_id, user):
+        if not user.is_authenticated:
+            return False
+
+        def loader():
+            from forum.models import DiscussionMember
+            return DiscussionMember.objects.filter(
+                discussion_group_id=group_id, member=user
+            ).exists()
+
+        return bool(self._resolve(request, self.group_key(group_id, user.pk), loader))
+
+    def prime_group_member(self, request, group_id, user, is_member):
+        self.prime(request, self.group_key(group_id, user.pk), is_member)
+
+    def invalidate_group_member(self, group_id, user_id):
+        self.invalidate(self.group_key(group_id, user_id))
+
+    # Projets
+
+    @staticmethod
+    def project_key(project_id, user_id):
+        return ('project_management.project', int(project_id), user_id)
+
+    def project_role(self, request, project_id, user):
+        """Rôle de l'utilisateur dans le projet, ou None s'il n'est pas membre"""
+        if not user.is_authenticated:
+            return None
+
+        def loader():
+            from project_management.models import ProjectMember
+            return ProjectMember.objects.filter(
+                project_id=project_id, user=user
+            ).values_list('role', flat=True).first()
+
+        return self._resolve(request, self.project_key(project_id, user.pk), loader) or None
+
+    def invalidate_project_member(self, project_id, user_id):
+        self.invalidate(self.project_key(project_id, user_id))
+
+
+membership = MembershipResolver()
@@ -0,0 +1,175 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur sur un tuple de colonnes, ex. (created_at, id).
+    Chaque page est une comparaison lexicographique sur l'index composite :
+    aucune clause OFFSET, la latence ne dépend pas de la profondeur de défilement.
+    """
+    ordering = ('created_at', 'id')
+    # Clés du curseur pour chaque champ accepté par ?ordering=
+    orderings = {}
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Curseur invalide'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_ordering(request, queryset, view)
+        position, reverse = self.decode_cursor(request, queryset)
+
+        keys = [self.flip(key) for key in self.keys] if reverse else self.keys
+        if hasattr(view, 'keyset_branches'):
+            branches = view.keyset_branches(queryset)
+        else:
+            branches = [queryset]
+        results = list(self.page_query(branches, keys, position))
+        has_more = len(results) > self.page_size
+        del results[self.page_size:]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def page_query(self, branches, keys, position):
+        """
+        Lignes de la page (plus une). Une vue dont le filtre est un OU sur deux
+        colonnes fournit une branche par index via `keyset_branches(queryset)` :
+        les branches sont réunies par UNION, chacune lue sur son propre index.
+        """
+        limit = self.page_size + 1
+        if position is not None:
+            branches = [branch.filter(self.after(keys, position)) for branch in branches]
+        if len(branches) == 1:
+            return branches[0].order_by(*keys)[:limit]
+        if connections[branches[0].db].features.supports_slicing_ordering_in_compound:
+            # Chaque branche s'arrête après `limit` lignes dans l'ordre de son index
+            branches = [branch.order_by(*keys)[:limit] for branch in branches]
+        else:
+            branches = [branch.order_by() for branch in branches]
+        return branches[0].union(*branches[1:]).order_by(*keys)[:limit]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value and value.isdigit() and int(value) > 0:
+            return min(int(value), self.max_page_size)
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Ordre de la vue. Le premier champ de ?ordering= choisit les clés dans
+        `orderings` (ex. {'due_date': ('due_date', 'id')}), `ordering` à défaut ;
+        un tri descendant inverse toutes les clés.
+        """
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                requested = backend().get_ordering(request, queryset, view)
+                if requested:
+                    keys = self.orderings.get(requested[0].lstrip('-'), self.ordering)
+                    if requested[0].startswith('-'):
+                        return tuple(self.flip(key) for key in keys)
+                    return tuple(keys)
+        return tuple(self.ordering)
+
+    @staticmethod
+    def flip(key):
+        return key[1:] if key.startswith('-') else f'-{key}'
+
+    @staticmethod
+    def after(keys, position):
+        """Condition (k1, k2, ...) > (v1, v2, ...) selon le sens de chaque clé"""
+        conditions = []
+        for index, key in enumerate(keys):
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            condition = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(keys[:index], position):
+                condition &= Q(**{previous.lstrip('-'): value})
+            conditions.append(condition)
+        return reduce(or_, conditions)
+
+    def encode_cursor(self, instance, reverse):
+        position = [
+            self.model_field(instance, key).value_to_string(instance)
+            for key in self.keys
+        ]
+        cursor = json.dumps({'p': position, 'r': int(reverse)})
+        return urlsafe_b64encode(cursor.encode()).decode()
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            position = [
+                queryset.model._meta.get_field(key.lstrip('-')).to_python(value)
+                for key, value in zip(self.keys, cursor['p'])
+            ]
+            if len(position) != len(self.keys):
+                raise ValueError
+            return position, bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, AttributeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def model_field(instance, key):
+        return instance._meta.get_field(key.lstrip('-'))
+
+    def get_base_url(self):
+        return self.request.build_absolute_uri()
+
+    def get_link(self, instance, reverse):
+        return replace_query_param(
+            self.get_base_url(), self.cursor_query_param, self.encode_cursor(instance, reverse)
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.get_base_url(), self.cursor_query_param)
+        return self.get_link(self.page[0], reverse=True)
@@ -32,6 +32,8 @@ AUTH_USER_MODEL = 'auth_app.CustomUser'
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
+    'channels',
     'rest_framework',
     'rest_framework_simplejwt',
     'django.contrib.admin',
@@ -44,7 +46,8 @@ INSTALLED_APPS = [
     'corsheaders',
     'auth_app',
     'project_management',
-    'forum'
+    'forum',
+    'search'
 ]
 
 MIDDLEWARE = [
@@ -94,6 +97,24 @@ REST_FRAMEWORK = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 WSGI_APPLICATION = 'auth_api.wsgi.application'
+ASGI_APPLICATION = 'auth_api.asgi.application'
+
+# Channel layer : en mémoire pour un seul nœud et les tests.
+# Cache partagé (tableau de bord des projets). En multi-processus, utiliser
+# 'django.core.cache.backends.redis.RedisCache' avec 'LOCATION': 'redis://127.0.0.1:6379'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# En multi-nœuds, utiliser 'channels_redis.core.RedisChannelLayer'
+# avec 'CONFIG': {'hosts': [('127.0.0.1', 6379)]}
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
 
 
 # Database
@@ -161,6 +182,40 @@ REST_FRAMEWORK = {
     )
 }
 
+# Cache des appartenances (groupes de discussion, rôles projet), par processus
+MEMBERSHIP_CACHE = {
+    'MAXSIZE': 10000,
+    'TTL': 60,  # secondes
+}
+
+# Cache des agrégats du tableau de bord des projets, partagé via CACHES
+PROJECT_DASHBOARD_CACHE = {
+    'ALIAS': 'default',
+    'TTL': 300,  # secondes
+}
+
+# Numéros de référence de projet réservés d'un coup par chaque processus
+PROJECT_REFERENCE_BLOCK_SIZE = 20
+
+# Nombre d'entrées du journal entre deux instantanés d'un projet
+PROJECT_SNAPSHOT_INTERVAL = 50
+
+# Threads d'écriture des fichiers lors d'un upload multiple
+DOCUMENT_UPLOAD_WORKERS = 4
+
+# Uploads par blocs : taille maximale d'un bloc, durée de vie d'une session inactive
+UPLOAD_CHUNK_MAX_SIZE = 16 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 3600  # secondes
+
+# Envoi des documents par le proxy : None, 'x-accel-redirect' (nginx) ou 'x-sendfile'
+DOCUMENT_SENDFILE = None
+DOCUMENT_SENDFILE_PREFIX = '/protected-media/'
+
+# Threads de génération des miniatures et avatars
+THUMBNAIL_WORKERS = 2
+# Cache des miniatures et avatars, hors de MEDIA_ROOT (servi sous MEDIA_URL)
+THUMBNAIL_ROOT = BASE_DIR / 'thumbnails'
+
 # JWT settings
 
 from datetime import timedelta
@@ -0,0 +1,32 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+_DONE = object()
+
+
+def is_asgi(request):
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def pull(iterator):
+    """
+    Itérateur asynchrone sur un itérateur synchrone, un élément à la fois.
+    Toujours le même thread (thread_sensitive) : curseur serveur et connexion
+    à la base restent ceux qui ont ouvert la lecture.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await step(iterator, _DONE)
+        if chunk is _DONE:
+            return
+        yield chunk
+
+
+def stream(request, iterable):
+    """
+    Contenu d'une StreamingHttpResponse à mémoire constante sous les deux serveurs.
+    Sous ASGI (daphne), Django lit un itérateur synchrone d'un bloc avec
+    sync_to_async(list) : il faut lui fournir un itérateur asynchrone.
+    """
+    iterator = iter(iterable)
+    return pull(iterator) if is_asgi(request) else iterator
@@ -0,0 +1,211 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.http import FileResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from PIL import Image, ImageOps
+from rest_framework.permissions import BasePermission
+
+try:
+    import fitz  # PyMuPDF, optionnel : aperçu de la première page des PDF
+except ImportError:
+    fitz = None
+
+# Nom : (largeur, hauteur, recadrage carré)
+VARIANTS = {
+    'avatar-small': (48, 48, True),
+    'avatar': (128, 128, True),
+    'thumbnail': (320, 320, False),
+    'preview': (1024, 1024, False),
+}
+AVATAR_VARIANTS = ('avatar-small', 'avatar')
+DOCUMENT_VARIANTS = ('thumbnail', 'preview')
+
+# Fichier source : `key` identifie son contenu (empreinte ou nom immuable)
+ThumbnailSource = namedtuple('ThumbnailSource', ['storage', 'name', 'key', 'is_pdf'])
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+def content_key(file, chunk_size=1024 * 1024):
+    """Empreinte SHA-256 du contenu d'un fichier (clé des déclinaisons)"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def url_signature(path, version):
+    return signing.Signer(salt='auth_api.thumbnails').signature(f'{path}?v={version}')
+
+
+def is_signed(request):
+    version, signature = request.GET.get('v'), request.GET.get('s')
+    return bool(version and signature) and constant_time_compare(
+        signature, url_signature(request.path, version)
+    )
+
+
+class SignedURL(BasePermission):
+    """
+    URL signée émise par l'API : utilisable sans en-tête JWT (balise <img>).
+    La signature couvre le chemin et la version du contenu
+    """
+
+    def has_permission(self, request, view):
+        return is_signed(request)
+
+
+def can_render(source):
+    return source is not None and (not source.is_pdf or fitz is not None)
+
+
+def thumbnail_storage():
+    """Cache disque des déclinaisons, hors de MEDIA_ROOT : jamais servi par /media/"""
+    return FileSystemStorage(location=settings.THUMBNAIL_ROOT)
+
+
+def variant_name(key, variant):
+    """Chemin de la déclinaison dans le cache disque, partagé par les contenus identiques"""
+    return f'{key[:2]}/{key}-{variant}.webp'
+
+
+def discard(key, variants=tuple(VARIANTS)):
+    """Supprime les déclinaisons en cache d'un contenu"""
+    storage = thumbnail_storage()
+    for variant in variants:
+        storage.delete(variant_name(key, variant))
+
+
+def open_image(source, width, height):
+    with source.storage.open(source.name, 'rb') as file:
+        if source.is_pdf:
+            document = fitz.open(stream=file.read(), filetype='pdf')
+            pixmap = document[0].get_pixmap(dpi=96)
+            return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+        image = Image.open(file)
+        # Décodage JPEG directement à une résolution réduite
+        image.draft('RGB', (width * 2, height * 2))
+        image.load()
+        return image
+
+
+def render(source, variant):
+    width, height, crop = VARIANTS[variant]
+    try:
+        image = ImageOps.exif_transpose(open_image(source, width, height))
+        if crop:
+            image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            image.thumbnail((width, height), Image.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        output = io.BytesIO()
+        image.save(output, 'WEBP', quality=80)
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as exc:
+        raise ThumbnailError(str(exc)) from exc
+    return output.getvalue()
+
+
+def ensure(source, variant):
+    """Nom de la déclinaison, générée à la demande si elle manque"""
+    name = variant_name(source.key, variant)
+    path = thumbnail_storage().path(name)
+    if not os.path.exists(path):
+        data = render(source, variant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Écriture puis renommage : jamais de fichier partiel visible
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as staged:
+            staged.write(data)
+        os.replace(staged.name, path)
+    return name
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def generate(source, variants):
+    for variant in variants:
+        try:
+            ensure(source, variant)
+        except ThumbnailError:
+            return
+
+
+def schedule(source, variants):
+    """Génère les déclinaisons en arrière-plan après la validation de la transaction"""
+    if can_render(source):
+        transaction.on_commit(lambda: executor().submit(generate, source, variants))
+
+
+def thumbnail_response(request, source, variant):
+    """Déclinaison servie avec ETag ; None si la source ne peut pas être rendue"""
+    if not can_render(source):
+        return None
+    # Une URL signée ne donne accès qu'au contenu pour lequel elle a été émise
+    if 's' in request.GET and request.GET.get('v') != source.key[:12]:
+        return None
+    etag = f'"{source.key}-{variant}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    try:
+        name = ensure(source, variant)
+    except ThumbnailError:
+        return None
+    response = FileResponse(thumbnail_storage().open(name, 'rb'), content_type='image/webp')
+    response['ETag'] = etag
+    # L'URL versionnée (?v=) change avec le contenu : mise en cache définitive
+    immutable = 'v' in request.GET
+    response['Cache-Control'] = 'private, max-age=31536000, immutable' if immutable else 'private, max-age=3600'
+    return response
+
+
+def variant_urls(request, url_for, variants, version):
+    """URL versionnée et signée de chaque déclinaison ; `url_for(variant)` donne le chemin"""
+    urls = {}
+    version = version[:12]
+    for variant in variants:
+        path = url_for(variant)
+        url = f'{path}?v={version}&s={url_signature(path, version)}'
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def avatar_urls(request, user):
+    """URL des avatars d'un utilisateur, None sans photo de profil"""
+    source = user.avatar_source()
+    if source is None:
+        return None
+    return variant_urls(
+        request,
+        lambda variant: reverse('user_avatar', kwargs={'pk': user.pk, 'variant': variant}),
+        AVATAR_VARIANTS, source.key
+    )
@@ -24,4 +24,5 @@ urlpatterns = [
     path('auth/', include('auth_app.urls')),
     path('api/', include('project_management.urls')),
     path('api/', include('forum.urls')),
+    path('api/', include('search.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -0,0 +1,41 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+
+@database_sync_to_async
+def get_user_for_token(raw_token):
+    """Retourne l'utilisateur du jeton d'accès SimpleJWT, ou un anonyme"""
+    authentication = JWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authentifie les connexions WebSocket avec les jetons SimpleJWT.
+    Le jeton est lu dans l'en-tête Authorization ou le paramètre ?token=
+    (les navigateurs ne permettent pas d'en-têtes sur un WebSocket).
+    """
+
+    def get_token(self, scope):
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                parts = value.decode().split()
+                if len(parts) == 2 and parts[0] == 'Bearer':
+                    return parts[1]
+        query = parse_qs(scope.get('query_string', b'').decode())
+        return query.get('token', [None])[0]
+
+    async def __call__(self, scope, receive, send):
+        token = self.get_token(scope)
+        scope = dict(scope, user=await get_user_for_token(token) if token else AnonymousUser())
+        return await super().__call__(scope, receive, send)
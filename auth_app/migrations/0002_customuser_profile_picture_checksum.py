@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-17 03:39
+
+import auth_app.models
+from django.db import migrations, models
+
+from auth_api.thumbnails import content_key
+
+
+def fill_checksums(apps, schema_editor):
+    """Empreinte des photos existantes ; un fichier manquant garde une empreinte vide"""
+    CustomUser = apps.get_model('auth_app', 'CustomUser')
+    users = CustomUser.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+    for user in users.iterator():
+        try:
+            with user.profile_picture.open('rb') as picture:
+                checksum = content_key(picture)
+        except OSError:
+            continue
+        CustomUser.objects.filter(pk=user.pk).update(profile_picture_checksum=checksum)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_picture_checksum',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_picture',
+            field=auth_app.models.ProfilePictureField(blank=True, null=True, upload_to='profile_pictures/'),
+        ),
+        migrations.RunPython(fill_checksums, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,27 @@
+import hashlib
+
 from django.db import models
+from django.db.models.fields.files import ImageFieldFile
 from django.contrib.auth.models import AbstractUser
 
+from auth_api.thumbnails import ThumbnailSource, content_key
+
+
+class ProfilePictureFieldFile(ImageFieldFile):
+    """Tient à jour l'empreinte du contenu à chaque écriture ou suppression du fichier"""
+
+    def save(self, name, content, save=True):
+        self.instance.profile_picture_checksum = content_key(content)
+        super().save(name, content, save)
+
+    def delete(self, save=True):
+        self.instance.profile_picture_checksum = ''
+        super().delete(save)
+
+
+class ProfilePictureField(models.ImageField):
+    attr_class = ProfilePictureFieldFile
+
 class CustomUser(AbstractUser):
     ROLE_CHOICES = [
         ('admin', "ADMIN"),
@@ -8,11 +29,26 @@ class CustomUser(AbstractUser):
     ]
     
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='member')
-    profile_picture = models.ImageField(upload_to='profile_pictures/', null=True, blank=True)
+    profile_picture = ProfilePictureField(upload_to='profile_pictures/', null=True, blank=True)
+    # SHA-256 du contenu de la photo : version des URL d'avatar, sans accès disque à la lecture
+    profile_picture_checksum = models.CharField(max_length=64, blank=True, editable=False)
     newsletter_subscription = models.BooleanField(default=False)
     updated_at = models.DateTimeField(auto_now=True)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     is_verified = models.BooleanField(default=False)
     
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'profile_picture' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'profile_picture_checksum'}
+        super().save(*args, **kwargs)
+
+    def avatar_source(self):
+        """Photo de profil, identifiée par l'empreinte de son contenu"""
+        if not self.profile_picture:
+            return None
+        key = self.profile_picture_checksum or hashlib.sha256(self.profile_picture.name.encode()).hexdigest()
+        return ThumbnailSource(self.profile_picture.storage, self.profile_picture.name, key, False)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from auth_api import thumbnails
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Prépare les avatars ; les déclinaisons déjà en cache ne sont pas régénérées"""
+    if raw or (update_fields and 'profile_picture' not in update_fields):
+        return
+    thumbnails.schedule(instance.avatar_source(), thumbnails.AVATAR_VARIANTS)
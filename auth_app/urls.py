@@ -8,5 +8,6 @@ urlpatterns = [
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('register/', RegisterView.as_view(), name='register'),
     path('password-reset/', PasswordResetView.as_view(), name='password_reset'),
-    path('reset-password/<uidb64>/<token>', PasswordResetConfirmView.as_view(), name='password_reset_confirm')
+    path('reset-password/<uidb64>/<token>', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
+    path('users/<int:pk>/avatar/<str:variant>/', AvatarView.as_view(), name='user_avatar'),
 ]
\ No newline at end of file
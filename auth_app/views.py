@@ -8,6 +8,8 @@ from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.utils.encoding import force_bytes, force_str
 from django.core.mail import send_mail
+from django.shortcuts import get_object_or_404
+from auth_api import thumbnails
 from .serializers import RegistrationSerializer
 from .models import CustomUser
 
@@ -84,4 +86,17 @@ class PasswordResetConfirmView(APIView):
             
         user.set_password(new_password)
         user.save()
-        return Response({"detail": "Password reset successful"}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"detail": "Password reset successful"}, status=status.HTTP_200_OK)
+
+class AvatarView(APIView):
+    # URL signée (balise <img>) ou utilisateur authentifié
+    permission_classes = [thumbnails.SignedURL | IsAuthenticated]
+
+    def get(self, request, pk, variant):
+        if variant not in thumbnails.AVATAR_VARIANTS:
+            return Response({"detail": "Unknown avatar size"}, status=status.HTTP_404_NOT_FOUND)
+        user = get_object_or_404(CustomUser, pk=pk)
+        response = thumbnails.thumbnail_response(request, user.avatar_source(), variant)
+        if response is None:
+            return Response({"detail": "No profile picture"}, status=status.HTTP_404_NOT_FOUND)
+        return response
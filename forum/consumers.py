@@ -0,0 +1,47 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .events import group_channel_name
+from .models import DiscussionGroup
+
+
+class DiscussionGroupConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Diffusion en direct des discussions d'un groupe : nouvelles discussions,
+    réponses et accusés de lecture, à la place du polling sur unread/list.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        kwargs = self.scope['url_route']['kwargs']
+        if not user or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        if not await self.can_access(user, kwargs['forum_pk'], kwargs['group_pk']):
+            await self.close(code=4403)
+            return
+
+        self.group_name = group_channel_name(kwargs['group_pk'])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    @database_sync_to_async
+    def can_access(self, user, forum_pk, group_pk):
+        """Mêmes règles que IsGroupMember en lecture"""
+        group = DiscussionGroup.objects.filter(pk=group_pk, forum_id=forum_pk).first()
+        if group is None:
+            return False
+        return (group.visibility == 'public' or
+                group.members.filter(member=user).exists() or
+                user.is_staff or
+                user.is_superuser)
+
+    async def discussion_event(self, event):
+        await self.send_json({
+            'event': event['event'],
+            'data': event['payload']
+        })
@@ -0,0 +1,45 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+def group_channel_name(group_id):
+    return f"discussion_group_{group_id}"
+
+
+def publish(group_id, event, payload):
+    """Diffuse un événement aux WebSockets du groupe, après validation de la transaction"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    def send():
+        async_to_sync(channel_layer.group_send)(group_channel_name(group_id), {
+            'type': 'discussion.event',
+            'event': event,
+            'payload': payload
+        })
+
+    transaction.on_commit(send)
+
+
+def publish_discussion(discussion):
+    """Nouvelle discussion ou réponse"""
+    from .serializers import DiscussionSerializer
+
+    # Une discussion qui vient d'être créée n'a pas encore de réponses
+    discussion.replies_total = 0
+    discussion.prefetched_replies = []
+    publish(
+        discussion.discussion_group_id,
+        'discussion.reply' if discussion.parent_id else 'discussion.created',
+        DiscussionSerializer(discussion).data
+    )
+
+
+def publish_read(group_id, discussion_ids, user):
+    """Accusé de lecture d'une ou plusieurs discussions"""
+    publish(group_id, 'discussion.read', {
+        'discussions': list(discussion_ids),
+        'reader': user.pk
+    })
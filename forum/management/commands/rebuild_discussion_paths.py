@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from forum.models import Discussion
+
+
+class Command(BaseCommand):
+    help = "Recalcule le chemin matérialisé et la profondeur de toutes les discussions"
+
+    def handle(self, *args, **options):
+        step = Discussion.PATH_STEP
+        total = 0
+        with transaction.atomic():
+            parents = {}
+            level = list(Discussion.objects.filter(
+                parent__isnull=True
+            ).only('id', 'parent_id'))
+            depth = 0
+            while level:
+                for discussion in level:
+                    prefix = parents.get(discussion.parent_id, '')
+                    discussion.path = f"{prefix}{discussion.pk:0{step}d}/"
+                    discussion.depth = depth
+                Discussion.objects.bulk_update(level, ['path', 'depth'], batch_size=1000)
+                total += len(level)
+                parents = {d.pk: d.path for d in level}
+                ids = list(parents)
+                level = [
+                    child
+                    for start in range(0, len(ids), 500)
+                    for child in Discussion.objects.filter(
+                        parent_id__in=ids[start:start + 500]
+                    ).only('id', 'parent_id')
+                ]
+                depth += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{total} discussion(s) mise(s) à jour"))
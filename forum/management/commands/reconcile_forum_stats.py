@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from forum.stats import recompute_forum_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques des forums à partir des données (réconciliation périodique)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('forum_ids', nargs='*', type=int, help="Forums à recalculer ; tous par défaut")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = recompute_forum_stats(options['forum_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f"{len(rows)} forum(s) réconcilié(s)"))
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
 
 class Forum(models.Model):
@@ -30,6 +32,31 @@ class Forum(models.Model):
     def __str__(self):
         return self.title
 
+class DiscussionGroupQuerySet(models.QuerySet):
+    def with_member_data(self, user):
+        """Annote members_total et user_is_member dans la même requête"""
+        members = DiscussionMember.objects.filter(
+            discussion_group=OuterRef('pk')
+        ).order_by().values('discussion_group')
+        return self.annotate(
+            members_total=Coalesce(
+                Subquery(members.annotate(total=Count('pk')).values('total')), 0
+            ),
+            user_is_member=Exists(members.filter(member_id=user.pk))
+        )
+
+    def visible_to(self, user):
+        """Groupes publics ou dont l'utilisateur est membre (EXISTS, sans jointure)"""
+        if user.is_staff:
+            return self
+        return self.filter(
+            Q(visibility='public') |
+            Exists(DiscussionMember.objects.filter(
+                discussion_group=OuterRef('pk'), member_id=user.pk
+            ))
+        )
+
+
 class DiscussionGroup(models.Model):
     STATUS_CHOICES = [
         ('active', 'Active'),
@@ -66,8 +93,13 @@ class DiscussionGroup(models.Model):
     )
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DiscussionGroupQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['forum', 'visibility', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.theme} - {self.forum.title}"
@@ -87,11 +119,21 @@ class DiscussionMember(models.Model):
 
     class Meta:
         unique_together = ['discussion_group', 'member']
+        indexes = [
+            models.Index(fields=['discussion_group', 'joined_at', 'id']),
+            models.Index(fields=['member', 'discussion_group']),
+        ]
 
     def __str__(self):
         return f"{self.member.username} - {self.discussion_group.theme}"
 
 class Discussion(models.Model):
+    # Largeur d'un segment du chemin matérialisé (identifiant complété par des zéros)
+    PATH_STEP = 10
+    PATH_MAX_LENGTH = 1024
+    # Profondeur maximale : chaque niveau occupe PATH_STEP + 1 caractères du chemin
+    MAX_DEPTH = PATH_MAX_LENGTH // (PATH_STEP + 1) - 1
+
     STATUS_CHOICES = [
         ('read', 'Read'),
         ('unread', 'Unread')
@@ -128,9 +170,80 @@ class Discussion(models.Model):
         choices=STATUS_CHOICES, 
         default='unread'
     )
+    # Chemin matérialisé des ancêtres ("0000000001/0000000004/") : le sous-arbre
+    # d'une discussion est l'intervalle [path, path_upper_bound) de l'index
+    path = models.CharField(max_length=PATH_MAX_LENGTH, db_index=True, blank=True, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['discussion_group', 'created_at', 'id']),
+            models.Index(fields=['parent', 'created_at', 'id']),
+            models.Index(fields=['receiver', 'discussion_group', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Discussion in {self.discussion_group.theme} by {self.sender.username}"
+
+    def save(self, *args, **kwargs):
+        # Le chemin n'est calculé qu'à l'insertion : `parent` ne change plus ensuite
+        # (lecture seule à la mise à jour dans DiscussionSerializer)
+        is_new = self.pk is None
+        if is_new and self.parent_id:
+            self.depth = self.parent.depth + 1
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                prefix = self.parent.path if self.parent_id else ''
+                self.path = f"{prefix}{self.pk:0{self.PATH_STEP}d}/"
+                Discussion.objects.filter(pk=self.pk).update(path=self.path)
+
+    @property
+    def path_upper_bound(self):
+        # '0' suit immédiatement '/' : toutes les descendances sont avant cette borne
+        return self.path[:-1] + '0'
+
+    def subtree(self):
+        """Discussion et toutes ses réponses, par parcours d'intervalle sur l'index"""
+        return Discussion.objects.filter(
+            path__gte=self.path,
+            path__lt=self.path_upper_bound
+        )
+
+class UnreadCounter(models.Model):
+    """Nombre de discussions non lues d'un utilisateur dans un groupe (dénormalisé)"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='unread_counters'
+    )
+    discussion_group = models.ForeignKey(
+        DiscussionGroup,
+        on_delete=models.CASCADE,
+        related_name='unread_counters'
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'discussion_group']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.discussion_group.theme}: {self.count}"
+
+class ForumStats(models.Model):
+    """Statistiques d'un forum, mises à jour dans la transaction de chaque écriture"""
+    forum = models.OneToOneField(
+        Forum,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    groups_count = models.PositiveIntegerField(default=0)
+    active_groups_count = models.PositiveIntegerField(default=0)
+    discussions_count = models.PositiveIntegerField(default=0)
+    members_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
-        return f"Discussion in {self.discussion_group.theme} by {self.sender.username}"
\ No newline at end of file
+        return f"Statistiques - {self.forum.title}"
@@ -0,0 +1,9 @@
+from auth_api.pagination import KeysetPagination
+
+
+class DiscussionCursorPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+
+
+class MemberCursorPagination(KeysetPagination):
+    ordering = ('joined_at', 'id')
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from auth_api.membership import membership
+
 class IsForumAdmin(permissions.BasePermission):
     """
     Permission personnalisée pour les administrateurs du forum.
@@ -29,7 +31,7 @@ class IsGroupMember(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         # Pour les discussions, vérifier le groupe parent
-        if hasattr(obj, 'discussion_group'):
+        if hasattr(obj, 'discussion_group_id'):
             group = obj.discussion_group
         else:
             group = obj
@@ -39,9 +41,9 @@ class IsGroupMember(permissions.BasePermission):
             return True
 
         # Vérifier si l'utilisateur est membre du groupe
-        return (group.members.filter(member=request.user).exists() or
-                request.user.is_staff or 
-                request.user.is_superuser)
+        return (request.user.is_staff or
+                request.user.is_superuser or
+                membership.is_group_member(request, group.pk, request.user))
 
 class CanManageDiscussion(permissions.BasePermission):
     """
@@ -0,0 +1,66 @@
+from django.db.models import Count, Prefetch, prefetch_related_objects
+
+from .models import Discussion, DiscussionGroup
+
+# Nombre d'éléments imbriqués renvoyés par les serializers
+LATEST_DISCUSSIONS_LIMIT = 3
+REPLIES_LIMIT = 3
+
+
+def discussion_queryset():
+    """Queryset de base des discussions avec expéditeur, destinataire et nombre de réponses"""
+    return Discussion.objects.select_related('sender', 'receiver').annotate(
+        replies_total=Count('replies')
+    )
+
+
+def prefetch_replies(discussions, limit=REPLIES_LIMIT):
+    """
+    Charge les premières réponses de chaque discussion, niveau par niveau.
+    Une requête par niveau de profondeur, quel que soit le nombre de discussions.
+    """
+    while discussions:
+        parents = []
+        for discussion in discussions:
+            if discussion.replies_total:
+                parents.append(discussion)
+            else:
+                discussion.prefetched_replies = []
+        prefetch_related_objects(parents, Prefetch(
+            'replies',
+            queryset=discussion_queryset().order_by('created_at')[:limit],
+            to_attr='prefetched_replies'
+        ))
+        discussions = [r for d in parents for r in d.prefetched_replies]
+
+
+def prefetch_group_details(groups):
+    """Précharge les dernières discussions (et leurs réponses) des groupes"""
+    prefetch_related_objects(groups, Prefetch(
+        'discussions',
+        queryset=discussion_queryset().filter(
+            parent__isnull=True
+        ).order_by('-created_at')[:LATEST_DISCUSSIONS_LIMIT],
+        to_attr='prefetched_latest_discussions'
+    ))
+    prefetch_replies([
+        d for group in groups for d in group.prefetched_latest_discussions
+    ])
+
+
+def prefetch_forum_listing(forums):
+    """
+    Précharge tout ce dont ForumSerializer a besoin pour une liste de forums.
+    Le nombre de requêtes ne dépend pas du nombre de forums.
+    """
+    prefetch_related_objects(forums, Prefetch(
+        'discussion_groups',
+        queryset=DiscussionGroup.objects.select_related('created_by').annotate(
+            members_total=Count('members')
+        ).order_by('-created_at')[:1],
+        to_attr='prefetched_latest_group'
+    ))
+    prefetch_group_details([
+        group for forum in forums for group in forum.prefetched_latest_group
+    ])
+    return forums
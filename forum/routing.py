@@ -0,0 +1,10 @@
+from django.urls import re_path
+
+from .consumers import DiscussionGroupConsumer
+
+websocket_urlpatterns = [
+    re_path(
+        r'^ws/forums/(?P<forum_pk>\d+)/groups/(?P<group_pk>\d+)/$',
+        DiscussionGroupConsumer.as_asgi()
+    ),
+]
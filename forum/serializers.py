@@ -1,13 +1,21 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from auth_api.membership import membership
+from auth_api.thumbnails import avatar_urls
 from .models import Forum, DiscussionGroup, DiscussionMember, Discussion
+from .prefetch import prefetch_group_details
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'first_name', 'last_name', 'email']
+        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'avatar']
+
+    def get_avatar(self, obj):
+        return avatar_urls(self.context.get('request'), obj)
 
 class DiscussionSerializer(serializers.ModelSerializer):
     sender_details = UserSerializer(source='sender', read_only=True)
@@ -24,13 +32,33 @@ class DiscussionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['sender', 'created_at', 'status']
 
+    def validate_parent(self, parent):
+        if parent is not None and parent.depth >= Discussion.MAX_DEPTH:
+            raise serializers.ValidationError(
+                f"Profondeur maximale atteinte ({Discussion.MAX_DEPTH} niveaux de réponses)"
+            )
+        return parent
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # Déplacer une discussion invaliderait le chemin de tout son sous-arbre,
+            # changer de destinataire les compteurs de non-lus (UnreadCounter)
+            fields['parent'].read_only = True
+            fields['receiver'].read_only = True
+        return fields
+
     def get_replies(self, obj):
         """Récupère les réponses directes à cette discussion"""
-        replies = obj.replies.all()[:3]  # Limite aux 3 dernières réponses
+        replies = getattr(obj, 'prefetched_replies', None)
+        if replies is None:
+            replies = obj.replies.all()[:3]  # Limite aux 3 dernières réponses
         return DiscussionSerializer(replies, many=True).data
 
     def get_reply_count(self, obj):
         """Compte le nombre total de réponses"""
+        if hasattr(obj, 'replies_total'):
+            return obj.replies_total
         return obj.replies.count()
 
 class DiscussionMemberSerializer(serializers.ModelSerializer):
@@ -57,16 +85,23 @@ class DiscussionGroupSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_by', 'created_at', 'updated_at']
 
     def get_members_count(self, obj):
+        if hasattr(obj, 'members_total'):
+            return obj.members_total
         return obj.members.count()
 
     def get_latest_discussions(self, obj):
-        latest = obj.discussions.filter(parent__isnull=True).order_by('-created_at')[:3]
+        latest = getattr(obj, 'prefetched_latest_discussions', None)
+        if latest is None:
+            latest = obj.discussions.filter(parent__isnull=True).order_by('-created_at')[:3]
         return DiscussionSerializer(latest, many=True).data
 
     def get_is_member(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.members.filter(member=request.user).exists()
+            if hasattr(obj, 'user_is_member'):
+                membership.prime_group_member(request, obj.pk, request.user, obj.user_is_member)
+                return obj.user_is_member
+            return membership.is_group_member(request, obj.pk, request.user)
         return False
 
 class ForumSerializer(serializers.ModelSerializer):
@@ -85,10 +120,15 @@ class ForumSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_by', 'created_at', 'updated_at']
 
     def get_groups_count(self, obj):
+        if hasattr(obj, 'groups_total'):
+            return obj.groups_total
         return obj.discussion_groups.count()
 
     def get_latest_group(self, obj):
-        latest = obj.discussion_groups.order_by('-created_at').first()
+        if hasattr(obj, 'prefetched_latest_group'):
+            latest = next(iter(obj.prefetched_latest_group), None)
+        else:
+            latest = obj.discussion_groups.order_by('-created_at').first()
         if latest:
             return DiscussionGroupSerializer(latest).data
         return None
@@ -100,7 +140,12 @@ class ForumDetailSerializer(ForumSerializer):
         fields = ForumSerializer.Meta.fields + ['groups']
 
     def get_groups(self, obj):
-        groups = obj.discussion_groups.filter(visibility='public')
+        groups = obj.discussion_groups.filter(visibility='public').select_related('created_by')
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            groups = groups.with_member_data(request.user)
+        groups = list(groups)
+        prefetch_group_details(groups)
         return DiscussionGroupSerializer(
             groups, 
             many=True,
@@ -0,0 +1,111 @@
+import threading
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from auth_api.membership import membership
+from .events import publish_discussion
+from .models import Forum, ForumStats, DiscussionGroup, Discussion, DiscussionMember
+from .stats import adjust_stats, adjust_group_stats, refresh_active_groups
+from .unread import adjust_counter
+
+# Groupes et utilisateurs en cours de suppression dans ce thread : {(modèle, id): origine}
+_local = threading.local()
+
+
+def deleting():
+    if not hasattr(_local, 'objects'):
+        _local.objects = {}
+    return _local.objects
+
+
+def being_deleted(model, pk, origin):
+    """
+    Vrai si l'objet est supprimé par la même opération (cascade). La comparaison
+    avec l'origine écarte une marque laissée par une suppression échouée
+    """
+    key = (model, pk)
+    return key in deleting() and deleting()[key] is origin
+
+
+@receiver(pre_delete, sender=DiscussionGroup)
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def parent_deleting(sender, instance, origin=None, **kwargs):
+    deleting()[(sender._meta.label, instance.pk)] = origin
+
+
+@receiver(post_delete, sender=DiscussionGroup)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def parent_deleted(sender, instance, **kwargs):
+    deleting().pop((sender._meta.label, instance.pk), None)
+
+
+@receiver(post_save, sender=Forum)
+def forum_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ForumStats.objects.create(forum=instance)
+
+
+@receiver(post_save, sender=DiscussionGroup)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_stats(
+            {'forum_id': instance.forum_id},
+            last_activity_at=instance.created_at,
+            groups_count=1,
+            active_groups_count=int(instance.status == 'active')
+        )
+    else:
+        # Le statut a pu changer : recomptage indexé des groupes actifs du forum
+        refresh_active_groups(instance.forum_id)
+
+
+@receiver(post_delete, sender=DiscussionGroup)
+def group_deleted(sender, instance, **kwargs):
+    adjust_stats(
+        {'forum_id': instance.forum_id},
+        groups_count=-1,
+        active_groups_count=-int(instance.status == 'active')
+    )
+
+
+@receiver(post_save, sender=Discussion)
+def discussion_saved(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    if instance.receiver_id and instance.status == 'unread':
+        adjust_counter(instance.receiver_id, instance.discussion_group_id, 1)
+    adjust_group_stats(
+        instance.discussion_group_id,
+        last_activity_at=instance.created_at,
+        discussions_count=1
+    )
+    publish_discussion(instance)
+
+
+@receiver(post_delete, sender=Discussion)
+def discussion_deleted(sender, instance, origin=None, **kwargs):
+    # Les compteurs d'un groupe ou d'un destinataire supprimé disparaissent avec lui
+    if (
+        instance.receiver_id and instance.status == 'unread'
+        and not being_deleted(DiscussionGroup._meta.label, instance.discussion_group_id, origin)
+        and not being_deleted(settings.AUTH_USER_MODEL, instance.receiver_id, origin)
+    ):
+        adjust_counter(instance.receiver_id, instance.discussion_group_id, -1)
+    adjust_group_stats(instance.discussion_group_id, discussions_count=-1)
+
+
+@receiver(post_save, sender=DiscussionMember)
+def member_saved(sender, instance, created, raw=False, **kwargs):
+    membership.invalidate_group_member(instance.discussion_group_id, instance.member_id)
+    if created and not raw:
+        adjust_group_stats(instance.discussion_group_id, members_count=1)
+
+
+@receiver(post_delete, sender=DiscussionMember)
+def member_deleted(sender, instance, **kwargs):
+    membership.invalidate_group_member(instance.discussion_group_id, instance.member_id)
+    adjust_group_stats(instance.discussion_group_id, members_count=-1)
@@ -0,0 +1,88 @@
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Greatest
+
+from .models import Forum, ForumStats, DiscussionGroup, Discussion, DiscussionMember
+
+
+def adjust_stats(forum_filter, last_activity_at=None, **deltas):
+    """
+    Applique des deltas (ex. discussions_count=1) aux statistiques en un UPDATE.
+    `forum_filter` identifie le forum, directement ou via un groupe.
+    """
+    values = {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items() if delta
+    }
+    if last_activity_at is not None:
+        values['last_activity_at'] = last_activity_at
+    if values:
+        ForumStats.objects.filter(**forum_filter).update(**values)
+
+
+def adjust_group_stats(group_id, **kwargs):
+    adjust_stats({'forum__discussion_groups': group_id}, **kwargs)
+
+
+def refresh_active_groups(forum_id):
+    ForumStats.objects.filter(forum_id=forum_id).update(
+        active_groups_count=DiscussionGroup.objects.filter(
+            forum_id=forum_id, status='active'
+        ).count()
+    )
+
+
+def recompute_forum_stats(forum_ids=None):
+    """
+    Recalcule les statistiques par agrégation (une requête par mesure),
+    pour tous les forums ou seulement `forum_ids`. Retourne les lignes écrites.
+    """
+    forums = Forum.objects.all()
+    if forum_ids is not None:
+        forums = forums.filter(pk__in=forum_ids)
+    forum_ids = list(forums.values_list('pk', flat=True))
+
+    groups = {
+        row['forum_id']: row
+        for row in DiscussionGroup.objects.filter(
+            forum_id__in=forum_ids
+        ).values('forum_id').annotate(
+            total=Count('pk'), active=Count('pk', filter=Q(status='active'))
+        )
+    }
+    discussions = {
+        row['discussion_group__forum_id']: row
+        for row in Discussion.objects.filter(
+            discussion_group__forum_id__in=forum_ids
+        ).values('discussion_group__forum_id').annotate(
+            total=Count('pk'), last=Max('created_at')
+        )
+    }
+    members = dict(
+        DiscussionMember.objects.filter(
+            discussion_group__forum_id__in=forum_ids
+        ).values('discussion_group__forum_id').annotate(
+            total=Count('pk')
+        ).values_list('discussion_group__forum_id', 'total')
+    )
+
+    rows = [
+        ForumStats(
+            forum_id=forum_id,
+            groups_count=groups.get(forum_id, {}).get('total', 0),
+            active_groups_count=groups.get(forum_id, {}).get('active', 0),
+            discussions_count=discussions.get(forum_id, {}).get('total', 0),
+            members_count=members.get(forum_id, 0),
+            last_activity_at=discussions.get(forum_id, {}).get('last')
+        )
+        for forum_id in forum_ids
+    ]
+    ForumStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['forum'],
+        update_fields=[
+            'groups_count', 'active_groups_count', 'discussions_count',
+            'members_count', 'last_activity_at'
+        ]
+    )
+    return rows
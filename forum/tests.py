@@ -1,3 +1,442 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from auth_api.asgi import application
+from auth_api.membership import membership
+
+from .models import (
+    Forum, ForumStats, DiscussionGroup, DiscussionMember, Discussion, UnreadCounter
+)
+from .serializers import ForumSerializer
+from .unread import mark_discussions_read
+
+User = get_user_model()
+
+
+class ForumTestMixin:
+    def make_forum(self, user, title='Forum', groups=1, depth=2):
+        forum = Forum.objects.create(
+            title=title, description='desc', category='General', created_by=user
+        )
+        for g in range(groups):
+            group = DiscussionGroup.objects.create(
+                theme=f'{title} {g}', created_by=user, forum=forum
+            )
+            DiscussionMember.objects.create(discussion_group=group, member=user)
+            for _ in range(4):
+                parent = Discussion.objects.create(
+                    discussion_group=group, sender=user, message='root'
+                )
+                for _ in range(depth):
+                    for _ in range(4):
+                        reply = Discussion.objects.create(
+                            discussion_group=group, sender=user,
+                            message='reply', parent=parent
+                        )
+                    parent = reply
+        return forum
+
+
+class ForumListTests(ForumTestMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def list_forums(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/forums/')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_list_matches_forum_serializer(self):
+        self.make_forum(self.user, 'A', groups=2)
+        self.make_forum(self.user, 'B', groups=0)
+        data, _ = self.list_forums()
+        expected = ForumSerializer(Forum.objects.all(), many=True).data
+        self.assertEqual(data, [dict(item) for item in expected])
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        self.make_forum(self.user, 'A')
+        _, small = self.list_forums()
+        for i in range(5):
+            self.make_forum(self.user, f'F{i}')
+        _, large = self.list_forums()
+        self.assertEqual(small, large)
+
+
+class DiscussionThreadTests(ForumTestMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.forum = self.make_forum(self.user, depth=3)
+        self.group = self.forum.discussion_groups.get()
+        self.root = self.group.discussions.filter(parent__isnull=True).first()
+
+    def thread_url(self, query=''):
+        return (f'/api/forums/{self.forum.pk}/groups/{self.group.pk}'
+                f'/discussions/{self.root.pk}/thread/{query}')
+
+    def test_subtree_uses_materialized_path(self):
+        self.assertEqual(self.root.subtree().count(), 13)
+        deepest = self.root.subtree().order_by('-depth').first()
+        self.assertEqual(deepest.depth, 3)
+        self.assertTrue(deepest.path.startswith(self.root.path))
+
+    def test_thread_loads_whole_tree_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.thread_url())
+        self.assertEqual(response.status_code, 200)
+        # discussion, groupe (permission), page de réponses, sous-arbres
+        self.assertEqual(len(ctx.captured_queries), 4)
+        data = response.json()
+        self.assertEqual(data['discussion']['id'], self.root.pk)
+        self.assertEqual(len(data['results']), 4)
+        node, depth = data['results'][-1], 1
+        while node['replies']:
+            self.assertEqual(len(node['replies']), 4)
+            node, depth = node['replies'][-1], depth + 1
+        self.assertEqual(depth, 3)
+
+    def test_thread_depth_and_limit(self):
+        data = self.client.get(self.thread_url('?depth=2&limit=2')).json()
+        self.assertEqual(data['discussion']['reply_count'], 4)
+        child = data['results'][-1]
+        self.assertEqual(child['reply_count'], 4)
+        self.assertEqual(len(child['replies']), 2)
+        self.assertEqual(child['replies'][-1]['replies'], [])
+        self.assertEqual(self.client.get(self.thread_url('?depth=0')).status_code, 400)
+
+    def test_parent_cannot_be_changed_on_update(self):
+        other = self.group.discussions.filter(parent__isnull=True).exclude(pk=self.root.pk).first()
+        response = self.client.patch(
+            f'/api/forums/{self.forum.pk}/groups/{self.group.pk}/discussions/{self.root.pk}/',
+            {'parent': other.pk, 'message': 'edited'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.root.refresh_from_db()
+        self.assertEqual((self.root.parent_id, self.root.message), (None, 'edited'))
+        self.assertEqual(self.root.subtree().count(), 13)
+
+    def test_reply_depth_is_limited_by_the_path_length(self):
+        url = f'/api/forums/{self.forum.pk}/groups/{self.group.pk}/discussions/'
+        parent = self.root.subtree().order_by('-depth').first()
+        Discussion.objects.filter(pk=parent.pk).update(depth=Discussion.MAX_DEPTH - 1)
+        response = self.client.post(url, {'message': 'ok', 'parent': parent.pk})
+        self.assertEqual(response.status_code, 201)
+        deepest = Discussion.objects.get(pk=response.json()['id'])
+        self.assertEqual(deepest.depth, Discussion.MAX_DEPTH)
+
+        response = self.client.post(url, {'message': 'trop', 'parent': deepest.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.json())
+        self.assertLessEqual((Discussion.MAX_DEPTH + 1) * (Discussion.PATH_STEP + 1), Discussion.PATH_MAX_LENGTH)
+
+    def test_rebuild_discussion_paths(self):
+        Discussion.objects.update(path='', depth=0)
+        call_command('rebuild_discussion_paths', stdout=StringIO())
+        self.root.refresh_from_db()
+        self.assertEqual(self.root.subtree().count(), 13)
+        self.assertEqual(self.root.subtree().order_by('-depth').first().depth, 3)
+
+
+class CursorPaginationTests(ForumTestMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.forum = self.make_forum(self.user, depth=1)
+        self.group = self.forum.discussion_groups.get()
+        for i in range(6):
+            Discussion.objects.create(
+                discussion_group=self.group, sender=self.user, message=f'm{i}'
+            )
+        self.url = f'/api/forums/{self.forum.pk}/groups/{self.group.pk}/discussions/'
+
+    def collect(self, url):
+        ids, previous = [], None
+        while url:
+            data = self.client.get(url).json()
+            ids += [item['id'] for item in data['results']]
+            previous, url = data['previous'], data['next']
+        return ids, previous
+
+    def test_discussions_are_paginated_by_cursor(self):
+        expected = list(self.group.discussions.filter(
+            parent__isnull=True
+        ).order_by('created_at', 'id').values_list('id', flat=True))
+        ids, previous = self.collect(self.url + '?page_size=3')
+        self.assertEqual(ids, expected)
+        back = self.client.get(previous).json()
+        self.assertEqual([item['id'] for item in back['results']], expected[6:9])
+
+        ids, _ = self.collect(self.url + '?page_size=4&ordering=-created_at')
+        self.assertEqual(ids, expected[::-1])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url + '?cursor=abc').status_code, 404)
+
+    def test_members_are_paginated_by_cursor(self):
+        for i in range(4):
+            other = User.objects.create_user(username=f'u{i}', password='pass12345')
+            DiscussionMember.objects.create(discussion_group=self.group, member=other)
+        url = f'/api/forums/{self.forum.pk}/groups/{self.group.pk}/members/?page_size=2'
+        ids, _ = self.collect(url)
+        self.assertEqual(ids, list(self.group.members.order_by('joined_at', 'id').values_list('id', flat=True)))
+
+
+class DiscussionConsumerTests(ForumTestMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.forum = self.make_forum(self.user, depth=0)
+        self.group = self.forum.discussion_groups.get()
+
+    def connect(self, token):
+        return WebsocketCommunicator(
+            application,
+            f'/ws/forums/{self.forum.pk}/groups/{self.group.pk}/?token={token}',
+            headers=[(b'origin', b'http://testserver')]
+        )
+
+    def test_rejects_invalid_token(self):
+        async def scenario():
+            connected, code = await self.connect('invalid').connect()
+            return connected, code
+        self.assertEqual(async_to_sync(scenario)(), (False, 4401))
+
+    def test_pushes_new_discussions_and_read_receipts(self):
+        other = User.objects.create_user(username='bob', password='pass12345')
+
+        def create_and_read():
+            with self.captureOnCommitCallbacks(execute=True):
+                discussion = Discussion.objects.create(
+                    discussion_group=self.group, sender=other,
+                    receiver=self.user, message='hello'
+                )
+                mark_discussions_read(self.user, self.group.pk, ids=[discussion.pk])
+            return discussion
+
+        async def scenario():
+            communicator = self.connect(str(AccessToken.for_user(self.user)))
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            discussion = await database_sync_to_async(create_and_read)()
+            messages = [
+                await communicator.receive_json_from(),
+                await communicator.receive_json_from()
+            ]
+            await communicator.disconnect()
+            return discussion, messages
+
+        discussion, (created, read) = async_to_sync(scenario)()
+        self.assertEqual(created['event'], 'discussion.created')
+        self.assertEqual(created['data']['id'], discussion.pk)
+        self.assertEqual(created['data']['message'], 'hello')
+        self.assertEqual(read['event'], 'discussion.read')
+        self.assertEqual(read['data'], {'discussions': [discussion.pk], 'reader': self.user.pk})
+
+
+class UnreadCounterTests(ForumTestMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.forum = self.make_forum(self.other, depth=0)
+        self.group = self.forum.discussion_groups.get()
+        self.discussions = [
+            Discussion.objects.create(
+                discussion_group=self.group, sender=self.other,
+                receiver=self.user, message=f'm{i}'
+            )
+            for i in range(5)
+        ]
+        self.url = f'/api/forums/{self.forum.pk}/groups/{self.group.pk}/discussions/'
+
+    def counter(self):
+        return UnreadCounter.objects.get(user=self.user, discussion_group=self.group).count
+
+    def test_counter_follows_creates_and_deletes(self):
+        self.assertEqual(self.counter(), 5)
+        self.discussions[0].delete()
+        self.assertEqual(self.counter(), 4)
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url + 'unread_count/').json()
+        self.assertEqual(data, {'unread_count': 4, 'total_unread_count': 4})
+
+    def test_bulk_mark_read(self):
+        ids = [d.pk for d in self.discussions[:3]]
+        data = self.client.post(self.url + 'mark_read/', {'ids': ids}, format='json').json()
+        self.assertEqual(data['marked'], 3)
+        self.assertEqual(data['unread_count'], 2)
+        # Déjà lues : rien ne change
+        data = self.client.post(self.url + 'mark_read/', {'ids': ids}, format='json').json()
+        self.assertEqual((data['marked'], data['unread_count']), (0, 2))
+
+        data = self.client.post(self.url + 'mark_all_read/').json()
+        self.assertEqual((data['marked'], data['unread_count']), (2, 0))
+        self.assertFalse(Discussion.objects.filter(receiver=self.user, status='unread').exists())
+
+    def assert_cascade_leaves_no_counter(self, parent):
+        group_pk, user_pk = self.group.pk, self.user.pk
+        parent.delete()
+        # Clés étrangères vérifiées comme à la validation
+        connection.check_constraints()
+        self.assertFalse(UnreadCounter.objects.filter(discussion_group_id=group_pk).exists())
+        self.assertFalse(UnreadCounter.objects.filter(user_id=user_pk).exists())
+
+    def test_group_delete_does_not_recreate_counters(self):
+        self.assert_cascade_leaves_no_counter(self.group)
+
+    def test_forum_delete_does_not_recreate_counters(self):
+        self.assert_cascade_leaves_no_counter(self.forum)
+
+    def test_receiver_delete_does_not_recreate_counters(self):
+        self.assert_cascade_leaves_no_counter(self.user)
+
+    def test_decrement_never_creates_a_counter(self):
+        UnreadCounter.objects.all().delete()
+        self.discussions[0].delete()
+        self.assertFalse(UnreadCounter.objects.exists())
+
+    def test_mark_as_read_requires_a_discussion_of_the_group(self):
+        data = self.client.post(f'{self.url}{self.discussions[0].pk}/mark_as_read/').json()
+        self.assertEqual((data['marked'], data['unread_count']), (1, 4))
+        other_group = self.make_forum(self.other, 'Autre', depth=0).discussion_groups.get()
+        foreign = Discussion.objects.create(
+            discussion_group=other_group, sender=self.other, receiver=self.user, message='x'
+        )
+        for pk in (foreign.pk, 999999, 'abc'):
+            response = self.client.post(f'{self.url}{pk}/mark_as_read/')
+            self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.counter(), 4)
+
+    def test_receiver_cannot_be_changed_on_update(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.patch(
+            f'{self.url}{self.discussions[0].pk}/', {'receiver': self.other.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['receiver'], self.user.pk)
+        self.assertEqual(self.counter(), 5)
+        self.assertEqual(self.client.post(self.url + 'mark_read/', {'ids': 'x'}, format='json').status_code, 400)
+
+    def test_mark_as_read_ignores_other_receivers(self):
+        self.client.force_authenticate(self.other)
+        self.client.post(f'{self.url}{self.discussions[0].pk}/mark_as_read/')
+        self.assertEqual(self.counter(), 5)
+
+
+class MembershipCacheTests(ForumTestMixin, APITestCase):
+    def setUp(self):
+        membership.clear()
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.forum = self.make_forum(self.user, depth=0)
+        self.group = self.forum.discussion_groups.get()
+        self.url = f'/api/forums/{self.forum.pk}/groups/{self.group.pk}/'
+
+    def test_join_and_leave_invalidate_cache(self):
+        self.client.force_authenticate(self.other)
+        self.assertFalse(self.client.get(self.url).json()['is_member'])
+        self.assertEqual(self.client.post(self.url + 'join/').status_code, 201)
+        self.assertTrue(self.client.get(self.url).json()['is_member'])
+        self.assertEqual(self.client.post(self.url + 'leave/').status_code, 204)
+        self.assertFalse(self.client.get(self.url).json()['is_member'])
+
+    def test_membership_is_memoized(self):
+        self.assertTrue(membership.is_group_member(None, self.group.pk, self.user))
+        with self.assertNumQueries(0):
+            self.assertTrue(membership.is_group_member(None, self.group.pk, self.user))
+
+
+class GroupVisibilityTests(ForumTestMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.forum = self.make_forum(self.other, groups=3, depth=1)
+        self.private = DiscussionGroup.objects.create(
+            theme='secret', created_by=self.other, forum=self.forum, visibility='private'
+        )
+        self.url = f'/api/forums/{self.forum.pk}/groups/'
+
+    def list_groups(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(self.url).json()
+        return data, len(ctx.captured_queries)
+
+    def test_private_groups_need_membership(self):
+        data, _ = self.list_groups()
+        self.assertNotIn(self.private.pk, [g['id'] for g in data])
+        DiscussionMember.objects.create(discussion_group=self.private, member=self.user)
+        for i in range(3):
+            other = User.objects.create_user(username=f'u{i}', password='pass12345')
+            DiscussionMember.objects.create(discussion_group=self.private, member=other)
+        data, _ = self.list_groups()
+        groups = {g['id']: g for g in data}
+        self.assertEqual(len(data), 4)
+        self.assertTrue(groups[self.private.pk]['is_member'])
+        self.assertEqual(groups[self.private.pk]['members_count'], 4)
+        self.assertFalse(any(g['is_member'] for g in data if g['id'] != self.private.pk))
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        _, small = self.list_groups()
+        self.make_forum(self.other, groups=0)
+        for i in range(4):
+            group = DiscussionGroup.objects.create(
+                theme=f'g{i}', created_by=self.other, forum=self.forum
+            )
+            Discussion.objects.create(discussion_group=group, sender=self.other, message='m')
+        _, large = self.list_groups()
+        self.assertEqual(small, large)
+
+
+class ForumStatsTests(ForumTestMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.forum = self.make_forum(self.user, groups=2, depth=1)
+        self.url = f'/api/forums/{self.forum.pk}/statistics/'
+
+    def expected(self):
+        groups = self.forum.discussion_groups.all()
+        return {
+            'total_groups': groups.count(),
+            'active_groups': groups.filter(status='active').count(),
+            'total_discussions': Discussion.objects.filter(discussion_group__forum=self.forum).count(),
+            'total_members': DiscussionMember.objects.filter(discussion_group__forum=self.forum).count(),
+        }
+
+    def statistics(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url).json()
+        self.assertIsNotNone(data.pop('last_activity'))
+        return data
+
+    def test_stats_follow_writes(self):
+        self.assertEqual(self.statistics(), self.expected())
+        group = self.forum.discussion_groups.first()
+        group.status = 'closed'
+        group.save()
+        other = User.objects.create_user(username='bob', password='pass12345')
+        DiscussionMember.objects.create(discussion_group=group, member=other)
+        group.discussions.filter(parent__isnull=True).first().delete()
+        self.assertEqual(self.statistics(), self.expected())
+        self.forum.discussion_groups.last().delete()
+        self.assertEqual(self.statistics(), self.expected())
+
+    def test_reconcile_command(self):
+        ForumStats.objects.update(groups_count=0, discussions_count=0, members_count=0)
+        call_command('reconcile_forum_stats', stdout=StringIO())
+        self.assertEqual(self.statistics(), self.expected())
+        ForumStats.objects.all().delete()
+        data = self.client.get(self.url).json()
+        data.pop('last_activity')
+        self.assertEqual(data, self.expected())
@@ -0,0 +1,49 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from .prefetch import discussion_queryset
+
+
+def build_tree(nodes, roots, limit=None):
+    """
+    Rattache chaque discussion à son parent en mémoire.
+    Les réponses sont exposées dans `prefetched_replies`, limitées à `limit` par niveau.
+    """
+    by_id = {node.pk: node for node in nodes}
+    for node in nodes:
+        node.prefetched_replies = []
+    for node in nodes:
+        parent = by_id.get(node.parent_id)
+        if parent is not None and node.pk not in roots:
+            parent.prefetched_replies.append(node)
+    if limit is not None:
+        for node in nodes:
+            del node.prefetched_replies[limit:]
+    return [by_id[pk] for pk in roots if pk in by_id]
+
+
+def load_threads(roots, max_depth=None, limit=None):
+    """
+    Charge en une requête les fils complets de plusieurs discussions racines.
+    `max_depth` borne la profondeur relative, `limit` le nombre de réponses par niveau.
+    """
+    roots = list(roots)
+    if not roots:
+        return []
+    ranges = []
+    for root in roots:
+        condition = Q(path__gte=root.path, path__lt=root.path_upper_bound)
+        if max_depth is not None:
+            condition &= Q(depth__lte=root.depth + max_depth)
+        ranges.append(condition)
+    queryset = discussion_queryset().filter(reduce(or_, ranges))
+    nodes = list(queryset.order_by('path'))
+    return build_tree(nodes, [root.pk for root in roots], limit=limit)
+
+
+def load_thread(root, max_depth=None, limit=None):
+    """Charge le fil complet d'une discussion et le renvoie sous forme d'arbre"""
+    threads = load_threads([root], max_depth=max_depth, limit=limit)
+    return threads[0] if threads else None
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+
+from .events import publish_read
+from .models import Discussion, UnreadCounter
+
+
+def adjust_counter(user_id, group_id, delta):
+    """
+    Ajoute `delta` au compteur de non-lus (jamais en dessous de zéro).
+    Une décrémentation ne crée jamais de ligne : le groupe ou l'utilisateur
+    peut être en cours de suppression.
+    """
+    if not delta:
+        return
+    counters = UnreadCounter.objects.filter(user_id=user_id, discussion_group_id=group_id)
+    if delta < 0:
+        counters.update(count=Greatest(F('count') + delta, 0))
+        return
+    counter, created = UnreadCounter.objects.get_or_create(
+        user_id=user_id,
+        discussion_group_id=group_id,
+        defaults={'count': delta}
+    )
+    if not created:
+        counters.update(count=F('count') + delta)
+
+
+def get_unread_count(user, group_id):
+    """Badge de non-lus : une lecture sur l'index unique (user, discussion_group)"""
+    return UnreadCounter.objects.filter(
+        user=user, discussion_group_id=group_id
+    ).values_list('count', flat=True).first() or 0
+
+
+def get_total_unread_count(user):
+    return UnreadCounter.objects.filter(user=user).aggregate(total=Sum('count'))['total'] or 0
+
+
+def mark_discussions_read(user, group_id, ids=None):
+    """
+    Marque comme lues les discussions reçues par `user` dans le groupe
+    (toutes, ou seulement `ids`) en un seul UPDATE, puis met à jour le compteur.
+    Retourne le nombre de discussions marquées.
+    """
+    unread = Discussion.objects.filter(
+        discussion_group_id=group_id,
+        receiver=user,
+        status='unread'
+    )
+    if ids is not None:
+        unread = unread.filter(pk__in=ids)
+
+    with transaction.atomic():
+        marked_ids = list(unread.values_list('pk', flat=True))
+        if not marked_ids:
+            return 0
+        marked = Discussion.objects.filter(
+            pk__in=marked_ids, status='unread'
+        ).update(status='read')
+        adjust_counter(user.pk, group_id, -marked)
+        publish_read(group_id, marked_ids, user)
+    return marked
@@ -3,26 +3,49 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
 
-from ..models import Discussion, DiscussionGroup
+from search.filters import FullTextSearchFilter
+
+from ..models import DiscussionGroup
 from ..serializers import DiscussionSerializer
 from ..permissions import IsGroupMember
+from ..pagination import DiscussionCursorPagination
+from ..prefetch import discussion_queryset, prefetch_replies
+from ..threads import load_threads
+from ..unread import (
+    mark_discussions_read, get_unread_count, get_total_unread_count
+)
 
 class DiscussionViewSet(viewsets.ModelViewSet):
     serializer_class = DiscussionSerializer
     permission_classes = [IsAuthenticated, IsGroupMember]
-    filter_backends = [filters.OrderingFilter]
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
     ordering_fields = ['created_at']
+    search_document = 'discussion'  # message
     ordering = ['created_at']
+    pagination_class = DiscussionCursorPagination
 
     def get_queryset(self):
         group_pk = self.kwargs.get('group_pk')
-        return Discussion.objects.filter(
+        return discussion_queryset().filter(
             discussion_group_id=group_pk,
             parent__isnull=True  # Uniquement les discussions principales
         )
 
+    def get_search_scopes(self):
+        # Portée indexée en entier : le paramètre d'URL est une chaîne
+        return [int(self.kwargs['group_pk'])]
+
+    def _paginated_response(self, queryset):
+        """Page de discussions avec leurs premières réponses préchargées"""
+        discussions = self.paginate_queryset(queryset)
+        prefetch_replies(discussions)
+        serializer = self.get_serializer(discussions, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        return self._paginated_response(self.filter_queryset(self.get_queryset()))
+
     def perform_create(self, serializer):
         group = get_object_or_404(
             DiscussionGroup, 
@@ -48,34 +71,80 @@ class DiscussionViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _unread_counts(self, request, group_pk, **extra):
+        """Compteurs de non-lus à jour de l'utilisateur"""
+        return Response({
+            **extra,
+            'unread_count': get_unread_count(request.user, group_pk),
+            'total_unread_count': get_total_unread_count(request.user)
+        })
+
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None, group_pk=None, forum_pk=None):
         """Marquer une discussion comme lue"""
         discussion = self.get_object()
-        if discussion.receiver == request.user:
-            discussion.status = 'read'
-            discussion.save()
-            
-        return Response(status=status.HTTP_200_OK)
+        marked = mark_discussions_read(request.user, group_pk, ids=[discussion.pk])
+        return self._unread_counts(request, group_pk, marked=marked)
+
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request, group_pk=None, forum_pk=None):
+        """Marquer plusieurs discussions comme lues en une seule requête"""
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return Response(
+                {"error": "Le champ ids doit être une liste d'identifiants"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        marked = mark_discussions_read(request.user, group_pk, ids=ids)
+        return self._unread_counts(request, group_pk, marked=marked)
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request, group_pk=None, forum_pk=None):
+        """Marquer toutes les discussions reçues dans le groupe comme lues"""
+        marked = mark_discussions_read(request.user, group_pk)
+        return self._unread_counts(request, group_pk, marked=marked)
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request, group_pk=None, forum_pk=None):
+        """Nombre de discussions non lues (badge)"""
+        return self._unread_counts(request, group_pk)
 
     @action(detail=False, methods=['get'])
-    def unread(self, request, group_pk=None):
+    def unread(self, request, group_pk=None, forum_pk=None):
         """Récupérer toutes les discussions non lues"""
-        unread_discussions = Discussion.objects.filter(
+        unread_discussions = discussion_queryset().filter(
             discussion_group_id=group_pk,
             receiver=request.user,
             status='unread'
         )
-        serializer = self.get_serializer(unread_discussions, many=True)
-        return Response(serializer.data)
+        return self._paginated_response(unread_discussions)
 
     @action(detail=True, methods=['get'])
     def thread(self, request, pk=None, group_pk=None, forum_pk=None):
-        """Récupérer toute la discussion avec ses réponses"""
+        """Récupérer toute la discussion avec ses réponses, sous forme d'arbre"""
         discussion = self.get_object()
-        # Inclure la discussion principale et toutes ses réponses
-        thread = Discussion.objects.filter(
-            Q(id=discussion.id) | Q(parent=discussion)
-        ).order_by('created_at')
-        serializer = self.get_serializer(thread, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        params = {}
+        for param, key in (('depth', 'max_depth'), ('limit', 'limit')):
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            if not value.isdigit() or int(value) < 1:
+                return Response(
+                    {"error": f"Le paramètre {param} doit être un entier positif"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            params[key] = int(value)
+
+        # Les réponses directes sont paginées par curseur ; le sous-arbre de
+        # chaque réponse de la page est chargé en une requête puis assemblé en mémoire
+        replies = self.paginate_queryset(discussion.replies.all())
+        if 'max_depth' in params:
+            params['max_depth'] -= 1
+        threads = load_threads(replies, **params)
+
+        discussion.prefetched_replies = []
+        response = self.get_paginated_response(
+            self.get_serializer(threads, many=True).data
+        )
+        response.data['discussion'] = self.get_serializer(discussion).data
+        return response
\ No newline at end of file
@@ -3,26 +3,47 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count
 
-from ..models import Forum
+from search.filters import FullTextSearchFilter
+
+from ..models import Forum, ForumStats
 from ..serializers import ForumSerializer, ForumDetailSerializer
 from ..permissions import IsForumAdmin
+from ..prefetch import prefetch_forum_listing
+from ..stats import recompute_forum_stats
 
 class ForumViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'status']
-    search_fields = ['title', 'description', 'category']
+    search_document = 'forum'  # titre, description, catégorie
     ordering_fields = ['created_at', 'updated_at']
 
     def get_queryset(self):
-        return Forum.objects.all()
+        queryset = Forum.objects.select_related('created_by')
+        if self.action == 'list':
+            # Meta.ordering est ignoré avec GROUP BY : on le réapplique
+            queryset = queryset.annotate(
+                groups_total=Count('discussion_groups')
+            ).order_by(*Forum._meta.ordering)
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ForumDetailSerializer
         return ForumSerializer
 
+    def list(self, request, *args, **kwargs):
+        """Liste des forums avec un nombre de requêtes indépendant du nombre de lignes"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        forums = prefetch_forum_listing(list(page if page is not None else queryset))
+        serializer = self.get_serializer(forums, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -49,16 +70,16 @@ class ForumViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
-        forum = self.get_object()
+        """Statistiques du forum : une lecture par clé primaire de ForumStats"""
+        stats = ForumStats.objects.filter(forum_id=pk).first() if str(pk).isdigit() else None
+        if stats is None:
+            # Forum antérieur aux statistiques : calcul initial
+            forum = self.get_object()
+            stats = recompute_forum_stats([forum.pk])[0]
         return Response({
-            'total_groups': forum.discussion_groups.count(),
-            'active_groups': forum.discussion_groups.filter(status='active').count(),
-            'total_discussions': sum(
-                group.discussions.count() 
-                for group in forum.discussion_groups.all()
-            ),
-            'total_members': sum(
-                group.members.count() 
-                for group in forum.discussion_groups.all()
-            )
-        })
\ No newline at end of file
+            'total_groups': stats.groups_count,
+            'active_groups': stats.active_groups_count,
+            'total_discussions': stats.discussions_count,
+            'total_members': stats.members_count,
+            'last_activity': stats.last_activity_at
+        })
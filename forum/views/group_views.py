@@ -12,6 +12,8 @@ from ..serializers import (
     DiscussionMemberSerializer
 )
 from ..permissions import IsGroupAdmin, IsGroupMember
+from ..pagination import MemberCursorPagination
+from ..prefetch import prefetch_group_details
 
 class DiscussionGroupViewSet(viewsets.ModelViewSet):
     serializer_class = DiscussionGroupSerializer  # Add this line
@@ -22,14 +24,24 @@ class DiscussionGroupViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         forum_pk = self.kwargs.get('forum_pk')
-        queryset = DiscussionGroup.objects.filter(forum_id=forum_pk)
-        if not self.request.user.is_staff:
-            return queryset.filter(
-                visibility='public'
-            ) | queryset.filter(
-                members__member=self.request.user
-            )
-        return queryset
+        return DiscussionGroup.objects.filter(
+            forum_id=forum_pk
+        ).visible_to(
+            self.request.user
+        ).with_member_data(
+            self.request.user
+        ).select_related('created_by')
+
+    def list(self, request, *args, **kwargs):
+        """Liste des groupes avec les dernières discussions préchargées"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        groups = list(page if page is not None else queryset)
+        prefetch_group_details(groups)
+        serializer = self.get_serializer(groups, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         forum_pk = self.kwargs.get('forum_pk')
@@ -48,7 +60,7 @@ class DiscussionGroupViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        if group.members.filter(member=request.user).exists():
+        if group.user_is_member:
             return Response(
                 {"error": "Vous êtes déjà membre de ce groupe"},
                 status=status.HTTP_400_BAD_REQUEST
@@ -79,6 +91,9 @@ class DiscussionGroupViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def members(self, request, pk=None, forum_pk=None):
         group = self.get_object()
-        members = group.members.all()
+        paginator = MemberCursorPagination()
+        members = paginator.paginate_queryset(
+            group.members.select_related('member'), request, view=self
+        )
         serializer = DiscussionMemberSerializer(members, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return paginator.get_paginated_response(serializer.data)
\ No newline at end of file
@@ -0,0 +1,43 @@
+from collections import Counter, defaultdict
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentBlob
+from .storage import document_storage
+
+
+def blob_checksum(document):
+    return document_storage.checksum(document.file.name) if document.file else None
+
+
+def adjust_references(counts, sign):
+    """Un UPDATE atomique par valeur de delta (en pratique un ou deux)"""
+    by_delta = defaultdict(list)
+    for checksum, count in counts.items():
+        by_delta[count].append(checksum)
+    for delta, checksums in by_delta.items():
+        DocumentBlob.objects.filter(checksum__in=checksums).update(
+            references=F('references') + sign * delta, updated_at=timezone.now()
+        )
+
+
+def retain(documents):
+    """Ajoute une référence aux blobs des documents (créés au besoin)"""
+    documents = [document for document in documents if blob_checksum(document)]
+    if not documents:
+        return
+    counts = Counter(blob_checksum(document) for document in documents)
+    sizes = {blob_checksum(document): document.file.size for document in documents}
+    DocumentBlob.objects.bulk_create(
+        [DocumentBlob(checksum=checksum, size=sizes[checksum]) for checksum in counts],
+        ignore_conflicts=True
+    )
+    adjust_references(counts, 1)
+
+
+def release(names):
+    """Retire une référence aux blobs des fichiers ; collect_document_blobs les supprime à zéro"""
+    counts = Counter(filter(None, (document_storage.checksum(name) for name in names)))
+    if counts:
+        adjust_references(counts, -1)
@@ -0,0 +1,120 @@
+from django.utils import timezone
+
+from .changelog import changelog_batch, record
+from .counters import adjust_counters, counters_deferred
+from .models import Task
+
+# Nombre maximal de tâches par requête groupée
+BULK_TASK_LIMIT = 500
+
+# Champs modifiables en masse
+BULK_UPDATE_FIELDS = ('status', 'assigned_to', 'due_date')
+
+
+class MissingTasks(Exception):
+    def __init__(self, ids):
+        super().__init__(', '.join(str(pk) for pk in sorted(ids)))
+        self.ids = ids
+
+
+def display_name(user):
+    return user.get_full_name() if user else None
+
+
+def logged_value(field, value):
+    return display_name(value) if field == 'assigned_to' else value
+
+
+def locked_tasks(project, ids):
+    """Tâches du projet verrouillées ; MissingTasks si un identifiant est inconnu"""
+    # of=self : les jointures externes (assignations nulles) ne sont pas verrouillables
+    tasks = list(Task.objects.select_for_update(of=('self',)).select_related(
+        'assigned_to', 'assigned_by'
+    ).filter(
+        project=project, pk__in=ids
+    ).order_by('pk'))
+    missing = set(ids) - {task.pk for task in tasks}
+    if missing:
+        raise MissingTasks(missing)
+    return tasks
+
+
+def create_tasks(project, items, user):
+    """Insère les tâches validées et leurs entrées du journal en une transaction"""
+    with changelog_batch():
+        tasks = Task.objects.bulk_create([
+            Task(project=project, assigned_by=user, **item) for item in items
+        ])
+        # bulk_create n'émet pas post_save
+        adjust_counters(project.pk, task_count=len(tasks))
+        for task in tasks:
+            record(
+                project=project,
+                user=user,
+                action='task_added',
+                changes={
+                    'task_id': task.id,
+                    'title': task.title,
+                    'assigned_to': display_name(task.assigned_to)
+                },
+                description=f"Ajout de la tâche: {task.title}"
+            )
+    return tasks
+
+
+def update_tasks(project, ids, values, user):
+    """
+    Applique les mêmes valeurs à plusieurs tâches en un seul UPDATE.
+    Seules les tâches réellement modifiées sont écrites et journalisées.
+    """
+    with changelog_batch():
+        tasks = locked_tasks(project, ids)
+        changed = []
+        for task in tasks:
+            changes = {}
+            for field, value in values.items():
+                old_value = getattr(task, field)
+                if old_value != value:
+                    changes[field] = {
+                        'from': logged_value(field, old_value),
+                        'to': logged_value(field, value)
+                    }
+                    setattr(task, field, value)
+            if changes:
+                changed.append(task)
+                record(
+                    project=project,
+                    user=user,
+                    action='task_updated',
+                    changes={'task_id': task.id, 'title': task.title, **changes},
+                    description=f"Modification de la tâche: {task.title}"
+                )
+        if changed:
+            now = timezone.now()
+            Task.objects.filter(pk__in=[task.pk for task in changed]).update(
+                updated_at=now, **values
+            )
+            for task in changed:
+                task.updated_at = now
+    return tasks
+
+
+def delete_tasks(project, ids, user):
+    """Supprime les tâches en une requête DELETE ; retourne leur nombre"""
+    with changelog_batch():
+        tasks = locked_tasks(project, ids)
+        for task in tasks:
+            record(
+                project=project,
+                user=user,
+                action='task_deleted',
+                changes={'task_id': task.id, 'title': task.title},
+                description=f"Suppression de la tâche: {task.title}"
+            )
+        # Suppression par le Collector (signaux, cascades) ; le compteur est
+        # ajusté une fois pour toutes plutôt qu'à chaque post_delete
+        queryset = Task.objects.filter(pk__in=[task.pk for task in tasks])
+        with counters_deferred(project.pk, queryset):
+            deleted = queryset.delete()[1].get(Task._meta.label, 0)
+        adjust_counters(project.pk, task_count=-deleted)
+    return deleted
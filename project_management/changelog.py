@@ -0,0 +1,107 @@
+import json
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from django.db import transaction
+
+from .dashboard import invalidate_dashboard
+from .history import snapshot_if_due
+from .models import ProjectChangeLog
+
+_local = threading.local()
+
+
+def json_serial(obj):
+    """Fonction pour sérialiser les objets date en JSON"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} n'est pas JSON serializable")
+
+
+@contextmanager
+def changelog_batch():
+    """
+    Transaction dont les entrées du journal sont mises en attente, dédoublonnées
+    puis insérées en un seul bulk_create à la fin du bloc, avant la validation.
+    """
+    entries = getattr(_local, 'entries', None)
+    if entries is not None:
+        # Bloc imbriqué : le bloc englobant écrit les entrées. Si son savepoint
+        # est annulé, les entrées ajoutées ou remplacées dans le bloc le sont aussi
+        before = dict(entries)
+        try:
+            with transaction.atomic():
+                yield
+        except BaseException:
+            entries.clear()
+            entries.update(before)
+            raise
+        return
+
+    _local.entries = {}
+    try:
+        with transaction.atomic():
+            yield
+            flush(list(_local.entries.values()))
+    finally:
+        _local.entries = None
+
+
+def record(project, action, changes, user=None, description=None, key=None):
+    """
+    Ajoute une entrée au journal. Dans un `changelog_batch`, l'entrée est mise en
+    attente ; une entrée de même `key` remplace la précédente (à sa position).
+    """
+    entry = ProjectChangeLog(
+        project=project,
+        user=user,
+        action=action,
+        changes=json.loads(json.dumps(changes, default=json_serial)),
+        description=description
+    )
+    entries = getattr(_local, 'entries', None)
+    if entries is None:
+        entry.save()
+    else:
+        entries[key if key is not None else id(entry)] = entry
+    return entry
+
+
+def log_document_added(document, user):
+    """Une seule entrée par document créé (nouveau titre ou nouvelle version)"""
+    is_new = document.version == 1
+    return record(
+        project=document.project,
+        user=user,
+        action='document_added' if is_new else 'document_updated',
+        changes={
+            'document_id': document.id,
+            'title': document.title,
+            'version': document.version,
+            'document_type': document.document_type
+        },
+        description=f"{'Ajout' if is_new else 'Mise à jour'} du document: {document.title} (v{document.version})",
+        key=('document', document.pk)
+    )
+
+
+def flush(entries):
+    """Numérote les entrées par projet puis les insère en une requête"""
+    if not entries:
+        return []
+    by_project = {}
+    for entry in entries:
+        by_project.setdefault(entry.project_id, []).append(entry)
+    for project_id, project_entries in by_project.items():
+        first = ProjectChangeLog.allocate_versions(project_id, len(project_entries))
+        for offset, entry in enumerate(project_entries):
+            entry.version = first + offset
+    created = ProjectChangeLog.objects.bulk_create(entries)
+    # bulk_create n'émet pas post_save ; toute écriture groupée (tâches,
+    # documents) passe par le journal, qui invalide donc le tableau de bord
+    for entry in created:
+        snapshot_if_due(entry)
+    for project_id in by_project:
+        invalidate_dashboard(project_id)
+    return created
@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+from django.conf import settings
+
+from auth_api.membership import TTLCache
+from .storage import HASH_CHUNK_SIZE, document_storage
+
+# Empreinte en cours de chaque session : (octets hachés, objet sha256).
+# Propre au processus ; à défaut, le fichier préparé est relu à la validation.
+_digests = TTLCache(maxsize=1000, ttl=24 * 3600)
+
+
+class ChunkTooLarge(Exception):
+    pass
+
+
+def max_chunk_size():
+    return getattr(settings, 'UPLOAD_CHUNK_MAX_SIZE', 16 * 1024 * 1024)
+
+
+def staging_path(session):
+    directory = document_storage.path(f'{document_storage.prefix}/sessions')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, str(session.pk))
+
+
+def append_chunk(session, stream):
+    """
+    Ajoute un bloc au fichier préparé de la session (verrouillée par l'appelant).
+    Le fichier est d'abord ramené à la taille validée : un bloc interrompu est rejoué.
+    Retourne le nombre d'octets écrits.
+    """
+    cached = _digests.get(session.pk)
+    if session.received_size == 0:
+        digest = hashlib.sha256()
+    elif cached is not None and cached[0] == session.received_size:
+        digest = cached[1].copy()
+    else:
+        digest = None
+
+    limit = max_chunk_size()
+    written = 0
+    with open(staging_path(session), 'ab') as staged:
+        staged.truncate(session.received_size)
+        while stream is not None:
+            data = stream.read(HASH_CHUNK_SIZE)
+            if not data:
+                break
+            written += len(data)
+            if written > limit:
+                raise ChunkTooLarge
+            staged.write(data)
+            if digest is not None:
+                digest.update(data)
+
+    if digest is not None:
+        _digests.set(session.pk, (session.received_size + written, digest))
+    return written
+
+
+def session_checksum(session):
+    """SHA-256 des octets validés ; relit le fichier seulement si le cache est perdu"""
+    path = staging_path(session)
+    with open(path, 'ab') as staged:
+        staged.truncate(session.received_size)
+    cached = _digests.get(session.pk)
+    if cached is not None and cached[0] == session.received_size:
+        return cached[1].hexdigest()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as staged:
+        for data in iter(lambda: staged.read(HASH_CHUNK_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def finalize(session, checksum):
+    """Déplace le fichier préparé dans le stockage adressé par contenu, sans copie"""
+    name = document_storage.commit(staging_path(session), checksum)
+    _digests.delete(session.pk)
+    return name
+
+
+def discard(session):
+    _digests.delete(session.pk)
+    try:
+        os.unlink(staging_path(session))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,71 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Project, ProjectChangeLog, ProjectDocument, Task, ProjectMember
+
+# Compteur de Project alimenté par chaque modèle
+COUNTED_MODELS = {
+    ProjectChangeLog: 'version_count',
+    ProjectDocument: 'document_count',
+    Task: 'task_count',
+    ProjectMember: 'member_count',
+}
+
+
+def adjust_counters(project_id, **deltas):
+    """Ajoute les deltas aux compteurs du projet en un seul UPDATE"""
+    values = {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items() if delta
+    }
+    if values:
+        Project.objects.filter(pk=project_id).update(**values)
+
+
+# Suppressions dont l'appelant ajuste lui-même les compteurs, dans ce thread :
+# {id du projet: origine de la suppression (instance ou queryset)}
+_local = threading.local()
+
+
+def deferred_deletes():
+    if not hasattr(_local, 'deletes'):
+        _local.deletes = {}
+    return _local.deletes
+
+
+def is_deferred(project_id, origin):
+    """
+    Vrai si la ligne est supprimée par une opération dont les compteurs sont
+    ajustés en bloc. La comparaison avec l'origine écarte une marque laissée
+    par une suppression échouée
+    """
+    deletes = deferred_deletes()
+    return project_id in deletes and deletes[project_id] is origin
+
+
+@contextmanager
+def counters_deferred(project_id, origin):
+    """Les post_delete émis par `origin` n'ajustent pas les compteurs du projet"""
+    deferred_deletes()[project_id] = origin
+    try:
+        yield
+    finally:
+        deferred_deletes().pop(project_id, None)
+
+
+def count_subquery(model, aggregate=None):
+    rows = model.objects.filter(project=OuterRef('pk')).order_by().values('project')
+    aggregate = Count('pk') if aggregate is None else aggregate
+    return Coalesce(Subquery(rows.annotate(total=aggregate).values('total')), 0)
+
+
+def repair_counters(queryset=None):
+    """Recalcule tous les compteurs en un UPDATE ; retourne le nombre de projets"""
+    queryset = Project.objects.all() if queryset is None else queryset
+    values = {field: count_subquery(model) for model, field in COUNTED_MODELS.items()}
+    # Dernière version attribuée : un numéro n'est jamais réutilisé
+    values['version_count'] = count_subquery(ProjectChangeLog, Max('version'))
+    return queryset.update(**values)
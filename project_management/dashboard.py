@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DocumentBlob, ProjectChangeLog, ProjectDocument, Task
+
+# Entrées du journal affichées dans le tableau de bord
+RECENT_ACTIVITY_LIMIT = 10
+# Fenêtre des tâches « à échéance proche »
+DUE_SOON_DAYS = 7
+
+
+def options():
+    return getattr(settings, 'PROJECT_DASHBOARD_CACHE', {})
+
+
+def rollups():
+    """
+    Cache Django partagé par les processus (Redis en production) : les écritures
+    sur les tâches, documents et le journal suppriment la clé pour tous
+    """
+    return caches[options().get('ALIAS', 'default')]
+
+
+def cache_key(project_id):
+    return f'project-dashboard:{project_id}'
+
+
+def tasks_by_status(project_id):
+    rows = Task.objects.filter(project_id=project_id).order_by().values('status').annotate(
+        total=Count('pk')
+    )
+    return {row['status']: row['total'] for row in rows}
+
+
+def tasks_per_assignee(project_id):
+    rows = Task.objects.filter(project_id=project_id).order_by().values(
+        'assigned_to', 'assigned_to__username'
+    ).annotate(
+        total=Count('pk'),
+        open=Count('pk', filter=Q(status='open'))
+    )
+    return sorted([
+        {
+            'user': row['assigned_to'],
+            'username': row['assigned_to__username'],
+            'total': row['total'],
+            'open': row['open'],
+        }
+        for row in rows
+    ], key=lambda row: (-row['total'], row['username'] or ''))
+
+
+def deadlines(project_id, today):
+    return Task.objects.filter(project_id=project_id, status='open').aggregate(
+        overdue=Count('pk', filter=Q(due_date__lt=today)),
+        due_soon=Count('pk', filter=Q(
+            due_date__gte=today, due_date__lte=today + timedelta(days=DUE_SOON_DAYS)
+        ))
+    )
+
+
+def documents_by_type(project_id):
+    """Nombre et octets par type ; la taille vient du blob partagé (0 pour un ancien fichier)"""
+    size = DocumentBlob.objects.filter(checksum=OuterRef('checksum')).values('size')[:1]
+    rows = ProjectDocument.objects.filter(project_id=project_id).order_by().annotate(
+        size=Coalesce(Subquery(size), 0)
+    ).values('document_type').annotate(
+        total=Count('pk'),
+        bytes=Sum('size')
+    )
+    return {
+        row['document_type']: {'count': row['total'], 'bytes': row['bytes'] or 0}
+        for row in rows
+    }
+
+
+def recent_activity(project_id, limit=RECENT_ACTIVITY_LIMIT):
+    logs = ProjectChangeLog.objects.filter(project_id=project_id).select_related(
+        'user'
+    ).order_by('-version')[:limit]
+    return [
+        {
+            'version': log.version,
+            'action': log.action,
+            'action_display': log.get_action_display(),
+            'user': log.user.username if log.user else None,
+            'timestamp': log.timestamp.isoformat(),
+            'description': log.description,
+        }
+        for log in logs
+    ]
+
+
+def compute_dashboard(project_id, today):
+    """Un agrégat par requête, indépendamment du nombre de tâches et de documents"""
+    return {
+        'tasks_by_status': tasks_by_status(project_id),
+        'tasks_per_assignee': tasks_per_assignee(project_id),
+        'deadlines': deadlines(project_id, today),
+        'documents_by_type': documents_by_type(project_id),
+        'recent_activity': recent_activity(project_id),
+    }
+
+
+def project_dashboard(project_id):
+    """Agrégats du projet, recalculés après une écriture ou un changement de jour"""
+    today = timezone.localdate()
+    cached = rollups().get(cache_key(project_id))
+    if cached is not None and cached[0] == today:
+        return cached[1]
+    data = compute_dashboard(project_id, today)
+    rollups().set(cache_key(project_id), (today, data), options().get('TTL', 300))
+    return data
+
+
+def invalidate_dashboard(project_id):
+    rollups().delete(cache_key(project_id))
+    # Une lecture concurrente a pu remettre en cache l'état d'avant la validation
+    transaction.on_commit(lambda: rollups().delete(cache_key(project_id)))
+
+
+def clear_dashboards():
+    """Vide le cache du tableau de bord (tests) ; à réserver à un alias dédié"""
+    rollups().clear()
@@ -0,0 +1,151 @@
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+from auth_api.streaming import is_asgi, stream
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+DEFAULT_CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+}
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Plage unique (début, fin incluse) demandée par l'en-tête Range.
+    None si l'en-tête est absent, multiple ou mal formé (réponse complète).
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffixe : les `end` derniers octets
+        length = int(end)
+        if not length:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if start >= size:
+        raise RangeNotSatisfiable
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        # Fin antérieure au début : en-tête invalide, ignoré
+        return None
+    return start, end
+
+
+class RangeFile:
+    """Lecture limitée à une plage d'un fichier ouvert (sans seek/tell : longueur fixée par la vue)"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def content_type(document):
+    guessed, _ = mimetypes.guess_type(document.title)
+    return guessed or DEFAULT_CONTENT_TYPES.get(document.document_type, 'application/octet-stream')
+
+
+def sendfile_response(document):
+    """Réponse vide déléguant l'envoi au proxy, ou None si DOCUMENT_SENDFILE n'est pas défini"""
+    mode = getattr(settings, 'DOCUMENT_SENDFILE', None)
+    if not mode:
+        return None
+    response = HttpResponse()
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'DOCUMENT_SENDFILE_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(document.file.name)
+    else:
+        response['X-Sendfile'] = document.file.path
+    return response
+
+
+def streamed(request, response):
+    """
+    Sous ASGI, Django lirait tout le fichier avec sync_to_async(list) :
+    il est lu bloc par bloc. Sous WSGI, le fichier reste confié à wsgi.file_wrapper.
+    """
+    if is_asgi(request):
+        response.streaming_content = stream(request, response.streaming_content)
+    return response
+
+
+def document_response(request, document, as_attachment=True):
+    """
+    Réponse de téléchargement d'un document : ETag fort (empreinte du contenu),
+    304 conditionnel, plage unique (206/416), envoi par blocs ou par le proxy.
+    """
+    size = document.file.size
+    etag = f'"{document.checksum}"' if document.checksum else None
+    last_modified = int(document.updated_at.timestamp())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    headers = {
+        'Content-Type': content_type(document),
+        'Content-Disposition': content_disposition_header(as_attachment, document.title),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, max-age=0, must-revalidate',
+        'Last-Modified': http_date(last_modified),
+    }
+    if etag:
+        headers['ETag'] = etag
+
+    response = sendfile_response(document)
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    # If-Range : la plage n'est servie que si le contenu n'a pas changé
+    if 'Range' in request.headers and (if_range is None or (etag and if_range == etag)):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = document.file.storage.open(document.file.name, 'rb')
+    # FileResponse écrit lui-même Content-Disposition
+    del headers['Content-Disposition']
+    options = {'as_attachment': as_attachment, 'filename': document.title, 'headers': headers}
+    if byte_range is None:
+        response = FileResponse(file, **options)
+        response['Content-Length'] = size
+        return streamed(request, response)
+
+    start, end = byte_range
+    response = FileResponse(RangeFile(file, start, end - start + 1), status=206, **options)
+    response['Content-Length'] = end - start + 1
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return streamed(request, response)
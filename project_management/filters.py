@@ -0,0 +1,45 @@
+import django_filters
+
+from .models import ProjectChangeLog, Task
+
+
+class ChangeLogFilter(django_filters.FilterSet):
+    """Filtres du journal : ?action=update&action=restore&user=3&since=...&until=..."""
+    action = django_filters.MultipleChoiceFilter(choices=ProjectChangeLog.ACTION_CHOICES)
+    since = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='gte')
+    until = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='lt')
+
+    class Meta:
+        model = ProjectChangeLog
+        fields = ['action', 'user']
+
+
+class MyTaskFilter(django_filters.FilterSet):
+    """
+    Filtres de /me/tasks/ : ?role=assigned|created&status=open&due_after=...&due_before=...
+    Sans rôle, MyTasksView restreint aux tâches assignées ou créées par l'utilisateur
+    (une branche par index, réunies par UNION).
+    """
+    ROLE_CHOICES = [
+        ('assigned', 'Assigned'),
+        ('created', 'Created'),
+    ]
+
+    role = django_filters.ChoiceFilter(choices=ROLE_CHOICES, method='filter_role')
+    status = django_filters.ChoiceFilter(choices=Task.STATUS_CHOICES)
+    due_after = django_filters.DateFilter(field_name='due_date', lookup_expr='gte')
+    due_before = django_filters.DateFilter(field_name='due_date', lookup_expr='lte')
+
+    class Meta:
+        model = Task
+        fields = ['role', 'status']
+
+    def filter_role(self, queryset, name, value):
+        field = 'assigned_to' if value == 'assigned' else 'assigned_by'
+        return queryset.filter(**{field: self.request.user})
+
+
+class MyActivityFilter(ChangeLogFilter):
+    class Meta:
+        model = ProjectChangeLog
+        fields = ['action']
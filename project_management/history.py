@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .models import Project, ProjectChangeLog, ProjectSnapshot
+
+# Champs du projet reconstitués à partir du journal
+TRACKED_FIELDS = [
+    field.name for field in Project._meta.concrete_fields
+    if field.editable and not field.primary_key and field.name != 'owner'
+]
+
+
+def snapshot_interval():
+    return getattr(settings, 'PROJECT_SNAPSHOT_INTERVAL', 50)
+
+
+def apply_log(state, log):
+    """Applique une entrée du journal à un état (dictionnaire JSON)"""
+    changes = log.changes or {}
+    if log.action == 'create':
+        values = changes.items()
+    elif log.action == 'update':
+        values = (
+            (field, change['to']) for field, change in changes.items()
+            if isinstance(change, dict) and 'to' in change
+        )
+    elif log.action == 'restore':
+        values = (changes.get('restored_state') or {}).items()
+    else:
+        return state
+    for field, value in values:
+        if field in TRACKED_FIELDS:
+            state[field] = value
+    return state
+
+
+def current_state(project):
+    return {
+        field: Project._meta.get_field(field).value_to_string(project)
+        for field in TRACKED_FIELDS
+    }
+
+
+def state_at(project_id, version):
+    """
+    État du projet à la version donnée : dernier instantané antérieur,
+    puis au plus `snapshot_interval()` entrées rejouées.
+    """
+    snapshot = ProjectSnapshot.objects.filter(
+        project_id=project_id, version__lte=version
+    ).only('version', 'state').order_by('-version').first()
+    state, start = (dict(snapshot.state), snapshot.version) if snapshot else ({}, 0)
+    if version > start:
+        logs = ProjectChangeLog.objects.filter(
+            project_id=project_id, version__gt=start, version__lte=version
+        ).only('action', 'changes').order_by('version')
+        for log in logs:
+            apply_log(state, log)
+    return state
+
+
+def diff_states(old, new):
+    """Champs modifiés entre deux états, au format des entrées 'update'"""
+    return {
+        field: {'from': old.get(field), 'to': new.get(field)}
+        for field in TRACKED_FIELDS
+        if old.get(field) != new.get(field)
+    }
+
+
+def apply_state(project, state):
+    """Affecte l'état au projet (sans l'enregistrer) ; ignore les valeurs invalides"""
+    for field, value in state.items():
+        try:
+            setattr(project, field, Project._meta.get_field(field).to_python(value))
+        except ValidationError:
+            continue
+
+
+def take_snapshot(project_id, log, version, state=None):
+    if state is None:
+        state = state_at(project_id, version)
+    ProjectSnapshot.objects.update_or_create(
+        project_id=project_id, version=version,
+        defaults={'log': log, 'state': state}
+    )
+
+
+def snapshot_if_due(log):
+    """Instantané toutes les `PROJECT_SNAPSHOT_INTERVAL` entrées"""
+    if log.version % snapshot_interval() == 0:
+        take_snapshot(log.project_id, log, log.version)
@@ -0,0 +1,89 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from auth_api import thumbnails
+from project_management.models import DocumentBlob, ProjectDocument
+from project_management.storage import document_storage
+
+
+class Command(BaseCommand):
+    help = "Supprime les blobs de documents qui ne sont plus référencés"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help="Âge minimal (secondes) d'un blob ou d'un fichier préparé avant suppression"
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help="Recalcule les références à partir des documents avant la collecte"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Affiche sans supprimer")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        if options['recount']:
+            self.recount()
+
+        with transaction.atomic():
+            dead = DocumentBlob.objects.select_for_update().filter(
+                references__lte=0, updated_at__lt=cutoff
+            )
+            checksums = set(dead.values_list('checksum', flat=True))
+            if not options['dry_run']:
+                dead.delete()
+
+        # Fichiers sans ligne DocumentBlob (transaction annulée après l'écriture)
+        root = document_storage.path(document_storage.prefix)
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if document_storage.checksum(name):
+                    files[name] = os.path.join(directory, name)
+        known = set()
+        candidates = [checksum for checksum in files if checksum not in checksums]
+        for start in range(0, len(candidates), 500):
+            known.update(DocumentBlob.objects.filter(
+                checksum__in=candidates[start:start + 500]
+            ).values_list('checksum', flat=True))
+
+        limit = cutoff.timestamp()
+        freed, total = 0, 0
+        for checksum, path in files.items():
+            if checksum in known or os.path.getmtime(path) >= limit:
+                continue
+            total += 1
+            freed += os.path.getsize(path)
+            if not options['dry_run']:
+                os.unlink(path)
+                thumbnails.discard(checksum, thumbnails.DOCUMENT_VARIANTS)
+
+        staging = os.path.join(root, 'tmp')
+        if os.path.isdir(staging):
+            for name in os.listdir(staging):
+                path = os.path.join(staging, name)
+                if os.path.getmtime(path) < limit and not options['dry_run']:
+                    os.unlink(path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} blob(s) supprimé(s), {freed} octet(s) libéré(s)"
+        ))
+
+    def recount(self):
+        counts = dict(ProjectDocument.objects.exclude(checksum='').filter(
+            file__startswith=f'{document_storage.prefix}/'
+        ).order_by().values('checksum').annotate(total=Count('pk')).values_list('checksum', 'total'))
+        with transaction.atomic():
+            blobs = list(DocumentBlob.objects.select_for_update())
+            for blob in blobs:
+                blob.references = counts.pop(blob.checksum, 0)
+            DocumentBlob.objects.bulk_update(blobs, ['references'], batch_size=1000)
+            DocumentBlob.objects.bulk_create([
+                DocumentBlob(checksum=checksum, references=total)
+                for checksum, total in counts.items()
+            ], ignore_conflicts=True)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from project_management.counters import repair_counters
+from project_management.models import Project, ProjectChangeLog
+
+
+class Command(BaseCommand):
+    help = "Numérote les entrées du journal de chaque projet dans l'ordre (timestamp, id)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help="Projets à traiter ; tous par défaut")
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options['project_ids']:
+            projects = projects.filter(pk__in=options['project_ids'])
+
+        total = 0
+        for project_id in projects.values_list('pk', flat=True).iterator():
+            with transaction.atomic():
+                logs = list(ProjectChangeLog.objects.filter(
+                    project_id=project_id
+                ).only('id', 'version').order_by('timestamp', 'id'))
+                # Numéros temporaires au-delà des valeurs actuelles et finales (contrainte d'unicité)
+                offset = max([len(logs)] + [log.version or 0 for log in logs])
+                for version, log in enumerate(logs, start=1):
+                    log.version = version + offset
+                ProjectChangeLog.objects.bulk_update(logs, ['version'], batch_size=1000)
+                for version, log in enumerate(logs, start=1):
+                    log.version = version
+                ProjectChangeLog.objects.bulk_update(logs, ['version'], batch_size=1000)
+                total += len(logs)
+        repair_counters(projects)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} entrée(s) numérotée(s)"))
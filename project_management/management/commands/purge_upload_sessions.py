@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from project_management.chunked import discard
+from project_management.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Supprime les sessions d'upload inactives et leurs fichiers préparés"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age', type=int, default=getattr(settings, 'UPLOAD_SESSION_TTL', 24 * 3600),
+            help="Inactivité (secondes) au-delà de laquelle une session est supprimée"
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['age'])
+        sessions = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+        for session in sessions:
+            discard(session)
+        UploadSession.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+        self.stdout.write(self.style.SUCCESS(f"{len(sessions)} session(s) supprimée(s)"))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from project_management.history import apply_log, snapshot_interval
+from project_management.models import ProjectChangeLog, ProjectSnapshot
+
+
+class Command(BaseCommand):
+    help = "Recalcule les instantanés des projets en rejouant leur journal une seule fois"
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help="Projets à traiter ; tous par défaut")
+
+    def handle(self, *args, **options):
+        interval = snapshot_interval()
+        logs = ProjectChangeLog.objects.only('project_id', 'version', 'action', 'changes')
+        snapshots = ProjectSnapshot.objects.all()
+        if options['project_ids']:
+            logs = logs.filter(project_id__in=options['project_ids'])
+            snapshots = snapshots.filter(project_id__in=options['project_ids'])
+
+        total = 0
+        with transaction.atomic():
+            snapshots.delete()
+            batch, project_id = [], None
+            for log in logs.order_by('project_id', 'version').iterator(chunk_size=2000):
+                if log.project_id != project_id:
+                    project_id, state = log.project_id, {}
+                apply_log(state, log)
+                if log.version % interval == 0 or log.action == 'restore':
+                    batch.append(ProjectSnapshot(
+                        project_id=project_id, log=log, version=log.version, state=dict(state)
+                    ))
+                if len(batch) >= 500:
+                    total += len(ProjectSnapshot.objects.bulk_create(batch))
+                    batch = []
+            total += len(ProjectSnapshot.objects.bulk_create(batch))
+
+        self.stdout.write(self.style.SUCCESS(f"{total} instantané(s) créé(s)"))
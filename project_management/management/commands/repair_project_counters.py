@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from project_management.counters import repair_counters
+from project_management.models import Project
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de versions, documents, tâches et membres des projets"
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help="Projets à réparer ; tous par défaut")
+
+    def handle(self, *args, **options):
+        queryset = Project.objects.all()
+        if options['project_ids']:
+            queryset = queryset.filter(pk__in=options['project_ids'])
+        total = repair_counters(queryset)
+        self.stdout.write(self.style.SUCCESS(f"{total} projet(s) réparé(s)"))
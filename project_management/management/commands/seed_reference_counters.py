@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from project_management.models import Project, ReferenceCounter
+
+
+class Command(BaseCommand):
+    help = "Aligne les compteurs de références de projet sur les références existantes"
+
+    def handle(self, *args, **options):
+        highest = {}
+        references = Project.objects.filter(
+            reference_number__startswith=f"{ReferenceCounter.PREFIX}-"
+        ).values_list('reference_number', flat=True)
+        for reference in references.iterator():
+            parts = reference.split('-')
+            if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit():
+                year, number = int(parts[1]), int(parts[2])
+                highest[year] = max(highest.get(year, 0), number)
+
+        with transaction.atomic():
+            ReferenceCounter.objects.bulk_create([
+                ReferenceCounter(year=year, last_number=number) for year, number in highest.items()
+            ], ignore_conflicts=True)
+            # Un compteur déjà plus avancé (blocs réservés) n'est jamais reculé
+            for year, number in highest.items():
+                ReferenceCounter.objects.filter(year=year).update(
+                    last_number=Greatest(F('last_number'), number)
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(highest)} année(s) alignée(s)"))
@@ -1,9 +1,15 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 from django.utils import timezone
 import uuid
+import mimetypes
 from datetime import datetime, date
 
+from auth_api.thumbnails import ThumbnailSource
+
+from .storage import document_storage
+
 class Project(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
@@ -28,6 +34,14 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Compteurs dénormalisés, modifiés uniquement par des UPDATE atomiques (F())
+    version_count = models.PositiveIntegerField(default=0, editable=False)
+    document_count = models.PositiveIntegerField(default=0, editable=False)
+    task_count = models.PositiveIntegerField(default=0, editable=False)
+    member_count = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ['version_count', 'document_count', 'task_count', 'member_count']
+
     class Meta:
         ordering = ['-created_at']
 
@@ -35,12 +49,57 @@ class Project(models.Model):
         return f"{self.reference_number} - {self.title}"
 
     def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Ne pas écraser les compteurs avec des valeurs en mémoire périmées
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
         if not self.reference_number:
-            year = timezone.now().strftime('%Y')
-            unique_id = str(uuid.uuid4().int)[:5]
-            self.reference_number = f"RJPC-{year}-{unique_id}"
+            from .references import next_reference
+            self.reference_number = next_reference()
         super().save(*args, **kwargs)
 
+class ReferenceCounter(models.Model):
+    """Dernier numéro de référence RJPC-AAAA-NNNNN réservé pour une année"""
+    year = models.PositiveIntegerField(primary_key=True)
+    last_number = models.PositiveBigIntegerField(default=0)
+
+    PREFIX = 'RJPC'
+
+    @classmethod
+    def format(cls, year, number):
+        return f"{cls.PREFIX}-{year}-{number:05d}"
+
+    @classmethod
+    def highest_existing(cls, year):
+        """Plus grand numéro déjà utilisé par un projet de l'année (références historiques comprises)"""
+        prefix = f"{cls.PREFIX}-{year}-"
+        numbers = Project.objects.filter(reference_number__startswith=prefix).values_list(
+            'reference_number', flat=True
+        ).iterator()
+        return max(
+            (int(reference[len(prefix):]) for reference in numbers if reference[len(prefix):].isdigit()),
+            default=0
+        )
+
+    @classmethod
+    def reserve(cls, year, size):
+        """
+        Réserve `size` numéros consécutifs et retourne le premier. Un seul UPDATE
+        atomique (verrou de ligne jusqu'à la fin de la transaction) ; au premier
+        usage de l'année, le compteur reprend après les références existantes.
+        """
+        with transaction.atomic():
+            counters = cls.objects.filter(year=year)
+            if not counters.update(last_number=F('last_number') + size):
+                cls.objects.bulk_create(
+                    [cls(year=year, last_number=cls.highest_existing(year))],
+                    ignore_conflicts=True
+                )
+                counters.update(last_number=F('last_number') + size)
+            return counters.values_list('last_number', flat=True).get() - size + 1
+
 class ProjectDocument(models.Model):
     DOCUMENT_TYPES = [
         ('pdf', 'PDF'),
@@ -57,7 +116,7 @@ class ProjectDocument(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     document_type = models.CharField(max_length=10, choices=DOCUMENT_TYPES)
-    file = models.FileField(upload_to='project_documents/')
+    file = models.FileField(upload_to='project_documents/', storage=document_storage)
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.SET_NULL, 
@@ -65,40 +124,119 @@ class ProjectDocument(models.Model):
         related_name='uploaded_documents'
     )
     version = models.PositiveIntegerField(default=1)
+    checksum = models.CharField(max_length=64, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['project', 'uploaded_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.project.reference_number}"
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            last_version = ProjectDocument.objects.filter(
-                project=self.project,
-                title=self.title
-            ).order_by('-version').first()
-            
-            if last_version:
-                self.version = last_version.version + 1
-        
+        if self.file and not self.file._committed:
+            # Écrit le fichier avant la ligne : son nom dépend de l'empreinte
+            self.file.save(self.file.name, self.file.file, save=False)
+            self.checksum = document_storage.checksum(self.file.name) or ''
+        if self._state.adding:
+            with transaction.atomic():
+                self.version = DocumentVersionCounter.next_version(self.project_id, self.title)
+                super().save(*args, **kwargs)
+            return
         super().save(*args, **kwargs)
-        
-        if not hasattr(self, '_skip_log'):
-            ProjectChangeLog.objects.create(
-                project=self.project,
-                user=self.uploaded_by,
-                action='document_added' if self.version == 1 else 'document_updated',
-                changes={
-                    'document_id': self.id,
-                    'title': self.title,
-                    'version': self.version,
-                    'document_type': self.document_type
-                },
-                description=f"{'Ajout' if self.version == 1 else 'Mise à jour'} du document: {self.title} (v{self.version})"
-            )
+
+    def thumbnail_source(self):
+        """Source des aperçus : images, et PDF (première page) si PyMuPDF est installé"""
+        if not self.file or not self.checksum:
+            return None
+        guessed = mimetypes.guess_type(self.title)[0] or ''
+        is_pdf = self.document_type == 'pdf' or guessed == 'application/pdf'
+        if not is_pdf and self.document_type != 'image' and not guessed.startswith('image/'):
+            return None
+        return ThumbnailSource(self.file.storage, self.file.name, self.checksum, is_pdf)
+
+class DocumentVersionCounter(models.Model):
+    """Dernière version attribuée pour un titre de document dans un projet"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    title = models.CharField(max_length=255)
+    last_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['project', 'title']
+
+    @classmethod
+    def next_version(cls, project_id, title):
+        return cls.allocate(project_id, {title: 1})[title]
+
+    @classmethod
+    def allocate(cls, project_id, counts):
+        """
+        Réserve `counts[title]` versions consécutives par titre et retourne la
+        première de chacun. Les lignes restent verrouillées jusqu'à la fin de la
+        transaction ; nombre de requêtes constant quel que soit le nombre de titres.
+        """
+        titles = list(counts)
+        with transaction.atomic():
+            counters = cls.objects.select_for_update().filter(project_id=project_id, title__in=titles)
+            found = {counter.title: counter for counter in counters}
+            missing = [title for title in titles if title not in found]
+            if missing:
+                # Premier usage du titre : reprendre après les versions existantes
+                existing = dict(ProjectDocument.objects.filter(
+                    project_id=project_id, title__in=missing
+                ).order_by().values('title').annotate(
+                    last=models.Max('version')
+                ).values_list('title', 'last'))
+                cls.objects.bulk_create([
+                    cls(project_id=project_id, title=title, last_version=existing.get(title, 0))
+                    for title in missing
+                ], ignore_conflicts=True)
+                found.update({
+                    counter.title: counter
+                    for counter in cls.objects.select_for_update().filter(
+                        project_id=project_id, title__in=missing
+                    )
+                })
+
+            first = {}
+            for title in titles:
+                counter = found[title]
+                first[title] = counter.last_version + 1
+                counter.last_version += counts[title]
+            cls.objects.bulk_update(list(found.values()), ['last_version'])
+        return first
+
+class UploadSession(models.Model):
+    """Upload d'un document en plusieurs blocs, reprenable après une coupure"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='upload_sessions')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    filename = models.CharField(max_length=255)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True, null=True)
+    document_type = models.CharField(max_length=10, choices=ProjectDocument.DOCUMENT_TYPES, default='other')
+    total_size = models.BigIntegerField(null=True, blank=True)
+    received_size = models.BigIntegerField(default=0)
+    next_chunk = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size} octets)"
+
+class DocumentBlob(models.Model):
+    """Contenu stocké une seule fois et partagé par les documents de même empreinte"""
+    checksum = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField(default=0)
+    references = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.checksum} ({self.references})"
 
 class ProjectChangeLog(models.Model):
     ACTION_CHOICES = [
@@ -117,6 +255,7 @@ class ProjectChangeLog(models.Model):
     ]
 
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='logs')
+    version = models.PositiveIntegerField(editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
     timestamp = models.DateTimeField(auto_now_add=True)
@@ -125,10 +264,48 @@ class ProjectChangeLog(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        unique_together = ['project', 'version']
+        indexes = [
+            models.Index(fields=['project', 'action', 'version']),
+            models.Index(fields=['user', 'timestamp', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.get_action_display()} - {self.project.reference_number} par {self.user.username if self.user else 'Système'}"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.version:
+            with transaction.atomic():
+                self.version = self.allocate_versions(self.project_id)
+                super().save(*args, **kwargs)
+            return
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def allocate_versions(project_id, count=1):
+        """
+        Réserve `count` numéros de version consécutifs et retourne le premier.
+        L'UPDATE verrouille la ligne du projet jusqu'à la fin de la transaction.
+        """
+        projects = Project.objects.filter(pk=project_id)
+        projects.update(version_count=F('version_count') + count)
+        return projects.values_list('version_count', flat=True).get() - count + 1
+
+class ProjectSnapshot(models.Model):
+    """État complet du projet à une version du journal (point de reprise)"""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='snapshots')
+    log = models.ForeignKey(ProjectChangeLog, on_delete=models.CASCADE, related_name='+')
+    version = models.PositiveIntegerField()
+    state = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['project', 'version']
+        ordering = ['version']
+
+    def __str__(self):
+        return f"{self.project_id} - v{self.version}"
+
 class Task(models.Model):
     STATUS_CHOICES = [
         ('open', 'Open'),
@@ -155,6 +332,15 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_at', 'id']),
+            models.Index(fields=['project', 'due_date', 'id']),
+            # /me/tasks/ : filtre sur l'utilisateur et le statut, tri par échéance
+            models.Index(fields=['assigned_to', 'status', 'due_date', 'id']),
+            models.Index(fields=['assigned_by', 'status', 'due_date', 'id']),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.project.reference_number}"
 
@@ -183,6 +369,9 @@ class ProjectMember(models.Model):
 
     class Meta:
         unique_together = ['project', 'user']
+        indexes = [
+            models.Index(fields=['project', 'joined_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.role} - {self.project.reference_number}"
\ No newline at end of file
@@ -0,0 +1,51 @@
+from auth_api.pagination import KeysetPagination
+
+
+class VersionCursorPagination(KeysetPagination):
+    ordering = ('version',)
+
+
+class TaskCursorPagination(KeysetPagination):
+    ordering = ('created_at', 'id')
+    orderings = {
+        'created_at': ('created_at', 'id'),
+        'due_date': ('due_date', 'id'),
+    }
+
+
+class DueTaskCursorPagination(KeysetPagination):
+    ordering = ('due_date', 'id')
+
+
+class ActivityCursorPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class DocumentCursorPagination(KeysetPagination):
+    # Plus récents d'abord, comme Meta.ordering de ProjectDocument
+    ordering = ('-uploaded_at', '-id')
+
+
+class MemberCursorPagination(KeysetPagination):
+    ordering = ('joined_at', 'id')
+
+
+class SectionPagination(KeysetPagination):
+    """
+    Première page d'une liste imbriquée dans le détail d'un projet.
+    Le lien `next` mène à l'endpoint de la liste, paginé avec le même ordre.
+    """
+
+    def __init__(self, pagination_class, url, page_size):
+        self.ordering = pagination_class.ordering
+        self.url = url
+        self.section_size = page_size
+
+    def get_page_size(self, request):
+        return self.section_size
+
+    def decode_cursor(self, request, queryset):
+        return None, False
+
+    def get_base_url(self):
+        return self.request.build_absolute_uri(self.url) if self.request else self.url
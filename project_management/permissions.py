@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from auth_api.membership import membership
+
 class IsProjectOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if hasattr(obj, 'project'):
@@ -8,27 +10,24 @@ class IsProjectOwner(permissions.BasePermission):
 
 class IsProjectMember(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'project'):
-            project = obj.project
-        else:
-            project = obj
-        return project.members.filter(user=request.user).exists()
+        project_id = obj.project_id if hasattr(obj, 'project_id') else obj.pk
+        return membership.project_role(request, project_id, request.user) is not None
 
 class HasProjectRole(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
             
-        project = obj if hasattr(obj, 'owner') else obj.project
-        member = project.members.filter(user=request.user).first()
+        project_id = obj.pk if hasattr(obj, 'owner') else obj.project_id
+        role = membership.project_role(request, project_id, request.user)
         
-        if not member:
+        if not role:
             return False
             
-        if member.role == 'owner':
+        if role == 'owner':
             return True
             
-        if member.role == 'collaborator':
+        if role == 'collaborator':
             return request.method != 'DELETE'
             
         return False
\ No newline at end of file
@@ -0,0 +1,68 @@
+from django.urls import reverse
+
+from .models import ProjectDocument, ProjectMember, Task
+from .pagination import (
+    DocumentCursorPagination, MemberCursorPagination, SectionPagination, TaskCursorPagination
+)
+
+# Sections imbriquées de ProjectDetailSerializer, sélectionnables via ?include=
+DETAIL_SECTIONS = ('members', 'tasks', 'documents')
+# Éléments renvoyés par section ; la suite se lit sur l'endpoint de la liste
+SECTION_PAGE_SIZE = 20
+
+
+class UnknownSection(ValueError):
+    pass
+
+
+def member_queryset():
+    return ProjectMember.objects.select_related('user')
+
+
+def task_queryset():
+    return Task.objects.select_related('assigned_to', 'assigned_by')
+
+
+def document_queryset():
+    return ProjectDocument.objects.select_related('uploaded_by')
+
+
+def parse_include(value):
+    """Sections demandées par ?include=a,b ; toutes si le paramètre est absent"""
+    if value is None:
+        return DETAIL_SECTIONS
+    include = tuple(name.strip() for name in value.split(',') if name.strip())
+    unknown = [name for name in include if name not in DETAIL_SECTIONS]
+    if unknown:
+        raise UnknownSection(', '.join(unknown))
+    return include
+
+
+def section_sources(project):
+    """(queryset, pagination de la liste, URL de la liste, total dénormalisé) par section"""
+    return {
+        'members': (
+            member_queryset().filter(project=project), MemberCursorPagination,
+            reverse('project-members', kwargs={'pk': project.pk}), project.member_count
+        ),
+        'tasks': (
+            task_queryset().filter(project=project), TaskCursorPagination,
+            reverse('project-tasks-list', kwargs={'project_pk': project.pk}), project.task_count
+        ),
+        'documents': (
+            document_queryset().filter(project=project), DocumentCursorPagination,
+            reverse('project-documents-list', kwargs={'project_pk': project.pk}), project.document_count
+        ),
+    }
+
+
+def load_section(request, project, name, page_size=SECTION_PAGE_SIZE):
+    """
+    Première page d'une section en une requête (utilisateurs joints),
+    avec le total tiré des compteurs du projet : aucun COUNT.
+    Retourne (éléments, total, lien vers la page suivante).
+    """
+    queryset, pagination_class, url, count = section_sources(project)[name]
+    paginator = SectionPagination(pagination_class, url, page_size)
+    items = paginator.paginate_queryset(queryset, request)
+    return items, count, paginator.get_next_link()
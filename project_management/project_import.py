@@ -0,0 +1,113 @@
+from collections import Counter
+
+from django.utils import timezone
+
+from auth_api.membership import membership
+from .blobs import retain
+from .changelog import changelog_batch, record
+from .counters import adjust_counters
+from .history import current_state
+from .models import DocumentVersionCounter, Project, ProjectDocument, ProjectMember, Task
+
+# Champs du projet repris lors d'un import ou d'une copie
+PROJECT_FIELDS = ['title', 'description', 'objectives', 'deadline', 'status', 'start_date', 'location']
+
+
+def document_copies(project, documents, user):
+    """
+    Documents du nouveau projet pointant vers les fichiers existants :
+    le stockage étant adressé par contenu, seule une référence au blob est ajoutée.
+    """
+    copies = [
+        ProjectDocument(
+            project=project,
+            title=item['title'],
+            description=item['document'].description,
+            document_type=item['document'].document_type,
+            file=item['document'].file.name,
+            checksum=item['document'].checksum,
+            uploaded_by=user
+        )
+        for item in documents
+    ]
+    if not copies:
+        return []
+    first = DocumentVersionCounter.allocate(project.pk, Counter(copy.title for copy in copies))
+    for copy in copies:
+        copy.version = first[copy.title]
+        first[copy.title] += 1
+    return copies
+
+
+def create_project_graph(owner, data, members=(), tasks=(), documents=(), description="Import du projet"):
+    """
+    Crée un projet complet (membres, tâches, documents référencés) en quelques
+    requêtes groupées, dans une transaction, avec une seule entrée du journal.
+    `members` : [(utilisateur, rôle)] ; `tasks` : valeurs des champs de Task ;
+    `documents` : [{'document': document source, 'title': titre}].
+    """
+    with changelog_batch():
+        project = Project.objects.create(owner=owner, **data)
+
+        today = timezone.now().date()
+        member_rows = [ProjectMember(project=project, user=owner, role='owner', joined_at=today)]
+        seen = {owner.pk}
+        for user, role in members:
+            if user.pk not in seen:
+                seen.add(user.pk)
+                member_rows.append(ProjectMember(project=project, user=user, role=role, joined_at=today))
+        ProjectMember.objects.bulk_create(member_rows)
+        # bulk_create n'émet pas post_save : invalidation explicite des rôles en cache
+        for member in member_rows:
+            membership.invalidate_project_member(project.pk, member.user_id)
+
+        created_tasks = Task.objects.bulk_create([
+            Task(project=project, assigned_by=owner, **task) for task in tasks
+        ])
+        copies = ProjectDocument.objects.bulk_create(document_copies(project, documents, owner))
+        retain(copies)
+        adjust_counters(
+            project.pk,
+            member_count=len(member_rows),
+            task_count=len(created_tasks),
+            document_count=len(copies)
+        )
+
+        record(
+            project=project,
+            user=owner,
+            action='create',
+            changes={
+                **current_state(project),
+                'imported': {
+                    'members': len(member_rows),
+                    'tasks': len(created_tasks),
+                    'documents': len(copies)
+                }
+            },
+            description=description
+        )
+    # Compteurs et version écrits par requête (adjust_counters, journal) : relus pour la réponse
+    project.refresh_from_db(fields=Project.COUNTER_FIELDS)
+    return project
+
+
+def clone_graph(source, sections):
+    """Membres, tâches et documents d'un projet, au format attendu par create_project_graph"""
+    members, tasks, documents = [], [], []
+    if 'members' in sections:
+        # L'ancien propriétaire devient collaborateur de la copie
+        members = [
+            (member.user, 'collaborator' if member.role == 'owner' else member.role)
+            for member in source.members.select_related('user')
+        ]
+    if 'tasks' in sections:
+        tasks = list(source.tasks.order_by('created_at', 'id').values(
+            'title', 'description', 'due_date', 'status', 'assigned_to_id'
+        ))
+    if 'documents' in sections:
+        documents = [
+            {'document': document, 'title': document.title}
+            for document in source.documents.order_by('title', 'version')
+        ]
+    return members, tasks, documents
@@ -0,0 +1,56 @@
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ReferenceCounter
+
+# Numéros réservés par ce processus et pas encore attribués : {année: [prochain, fin exclue]}
+_blocks = {}
+_lock = threading.Lock()
+
+
+def block_size():
+    return getattr(settings, 'PROJECT_REFERENCE_BLOCK_SIZE', 20)
+
+
+def _take(year):
+    with _lock:
+        block = _blocks.get(year)
+        if block and block[0] < block[1]:
+            number = block[0]
+            block[0] += 1
+            return number
+    return None
+
+
+def _release_block(year, start, end):
+    # Un bloc concurrent encore entamé est abandonné : trou dans la numérotation, jamais de doublon
+    with _lock:
+        _blocks[year] = [start, end]
+
+
+def next_reference(year=None):
+    """
+    Référence RJPC-AAAA-NNNNN suivante. Le chemin courant pioche dans le bloc
+    réservé par le processus, sans requête ni verrou en base ; un bloc épuisé
+    est remplacé par `block_size()` numéros réservés d'un coup.
+    """
+    year = year or timezone.now().year
+    number = _take(year)
+    if number is None:
+        size = block_size()
+        number = ReferenceCounter.reserve(year, size)
+        if size > 1:
+            # Le reste du bloc n'est utilisable qu'une fois la réservation validée :
+            # après un rollback, le compteur revient en arrière et ces numéros
+            # seraient réservés à nouveau par un autre processus
+            start, end = number + 1, number + size
+            transaction.on_commit(lambda: _release_block(year, start, end))
+    return ReferenceCounter.format(year, number)
+
+
+def clear_blocks():
+    with _lock:
+        _blocks.clear()
@@ -1,36 +1,83 @@
 from rest_framework import serializers
+from auth_api.thumbnails import DOCUMENT_VARIANTS, avatar_urls, can_render, variant_urls
+from django.urls import reverse
 from django.contrib.auth import get_user_model
 from .models import (
     Project, ProjectMember, Task, 
-    ProjectDocument, ProjectChangeLog
+    ProjectDocument, ProjectChangeLog, UploadSession
 )
+from .bulk_tasks import BULK_TASK_LIMIT, BULK_UPDATE_FIELDS
+from .prefetch import DETAIL_SECTIONS, load_section
 
 User = get_user_model()
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name']
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'avatar']
+
+    def get_avatar(self, obj):
+        return avatar_urls(self.context.get('request'), obj)
 
 class ProjectDocumentSerializer(serializers.ModelSerializer):
     uploaded_by_details = UserSerializer(source='uploaded_by', read_only=True)
     file_url = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = ProjectDocument
         fields = [
             'id', 'title', 'description', 'document_type', 
             'file', 'file_url', 'version', 'uploaded_by', 
-            'uploaded_by_details', 'uploaded_at', 'updated_at'
+            'uploaded_by_details', 'uploaded_at', 'updated_at', 'thumbnails'
         ]
         read_only_fields = ['uploaded_by', 'version', 'uploaded_at', 'updated_at']
 
     def get_file_url(self, obj):
+        """URL de téléchargement authentifiée (et non la route média publique)"""
         request = self.context.get('request')
-        if obj.file and hasattr(obj.file, 'url') and request:
-            return request.build_absolute_uri(obj.file.url)
+        if obj.file and request:
+            return request.build_absolute_uri(reverse(
+                'project-documents-download',
+                kwargs={'project_pk': obj.project_id, 'pk': obj.pk}
+            ))
         return None
 
+    def get_thumbnails(self, obj):
+        """URL des miniatures (images, PDF), None pour les autres documents"""
+        source = obj.thumbnail_source()
+        if not can_render(source):
+            return None
+        return variant_urls(
+            self.context.get('request'),
+            lambda variant: reverse(
+                'project-documents-thumbnail',
+                kwargs={'project_pk': obj.project_id, 'pk': obj.pk, 'variant': variant}
+            ),
+            DOCUMENT_VARIANTS, source.key
+        )
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    title = serializers.CharField(max_length=255, required=False)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'filename', 'title', 'description', 'document_type',
+            'total_size', 'received_size', 'next_chunk', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['received_size', 'next_chunk', 'created_at', 'updated_at']
+
+    def validate(self, data):
+        if not data.get('title'):
+            data['title'] = data['filename']
+        return data
+
+class UploadCommitSerializer(serializers.Serializer):
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
+
 class TaskSerializer(serializers.ModelSerializer):
     assigned_to = serializers.SlugRelatedField(
         slug_field='username',
@@ -51,6 +98,65 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at', 'assigned_by']
 
+class ProjectRefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = ['id', 'reference_number', 'title']
+
+class MyTaskSerializer(TaskSerializer):
+    project_details = ProjectRefSerializer(source='project', read_only=True)
+
+    class Meta(TaskSerializer.Meta):
+        fields = TaskSerializer.Meta.fields + ['project', 'project_details']
+
+def resolve_assignees(items):
+    """Remplace les noms d'utilisateur `assigned_to` par les utilisateurs, en une requête"""
+    usernames = {item['assigned_to'] for item in items if item.get('assigned_to')}
+    users = User.objects.in_bulk(usernames, field_name='username') if usernames else {}
+    missing = usernames - set(users)
+    if missing:
+        raise serializers.ValidationError(
+            f"Collaborator don't exist: {', '.join(sorted(missing))}"
+        )
+    for item in items:
+        if 'assigned_to' in item:
+            item['assigned_to'] = users.get(item['assigned_to'])
+    return items
+
+class TaskBulkItemSerializer(serializers.ModelSerializer):
+    # Nom d'utilisateur, résolu pour tout le lot par resolve_assignees
+    assigned_to = serializers.CharField(allow_null=True, required=False)
+
+    class Meta:
+        model = Task
+        fields = ['title', 'description', 'assigned_to', 'due_date', 'status']
+
+class TaskBulkCreateSerializer(serializers.Serializer):
+    tasks = TaskBulkItemSerializer(many=True, allow_empty=False, max_length=BULK_TASK_LIMIT)
+
+    def validate_tasks(self, tasks):
+        return resolve_assignees(tasks)
+
+class TaskBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=BULK_TASK_LIMIT
+    )
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
+
+class TaskBulkUpdateSerializer(TaskBulkDeleteSerializer):
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    assigned_to = serializers.CharField(allow_null=True, required=False)
+    due_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if not any(field in data for field in BULK_UPDATE_FIELDS):
+            raise serializers.ValidationError(
+                f"Aucune modification : champs possibles {', '.join(BULK_UPDATE_FIELDS)}"
+            )
+        return resolve_assignees([data])[0]
+
 class ProjectMemberSerializer(serializers.ModelSerializer):
     user = serializers.EmailField()
     user_details = UserSerializer(source='user', read_only=True)
@@ -72,20 +178,39 @@ class ProjectChangeLogSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'timestamp', 'action_display', 'user_details']
 
-class ProjectVersionSerializer(serializers.Serializer):
-    version = serializers.IntegerField()
-    timestamp = serializers.DateTimeField()
-    action = serializers.CharField()
-    action_display = serializers.CharField()
-    user = serializers.CharField()
-    description = serializers.CharField()
-    changes = serializers.JSONField()
+class ActivitySerializer(ProjectChangeLogSerializer):
+    project_details = ProjectRefSerializer(source='project', read_only=True)
+
+    class Meta(ProjectChangeLogSerializer.Meta):
+        fields = ProjectChangeLogSerializer.Meta.fields + ['version', 'project', 'project_details']
+
+class ProjectVersionSerializer(serializers.ModelSerializer):
+    action_display = serializers.CharField(source='get_action_display', read_only=True)
+    user = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProjectChangeLog
+        fields = ['version', 'timestamp', 'action', 'action_display', 'user', 'description', 'changes']
+
+    def get_user(self, obj):
+        return obj.user.get_full_name() if obj.user else "Système"
 
 class ProjectDetailSerializer(serializers.ModelSerializer):
+    """
+    Détail d'un projet ; chaque section imbriquée est un objet
+    {count, next, results} limité à sa première page.
+    Le contexte `include` restreint les sections renvoyées.
+    """
+    SECTION_SERIALIZERS = {
+        'members': ProjectMemberSerializer,
+        'tasks': TaskSerializer,
+        'documents': ProjectDocumentSerializer,
+    }
+
     owner_details = UserSerializer(source='owner', read_only=True)
-    members = ProjectMemberSerializer(many=True, read_only=True)
-    tasks = TaskSerializer(many=True, read_only=True)
-    documents = ProjectDocumentSerializer(many=True, read_only=True)
+    members = serializers.SerializerMethodField()
+    tasks = serializers.SerializerMethodField()
+    documents = serializers.SerializerMethodField()
     current_version = serializers.SerializerMethodField()
     
     class Meta:
@@ -99,8 +224,30 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['owner', 'created_at', 'updated_at', 'reference_number']
 
+    def get_fields(self):
+        fields = super().get_fields()
+        include = self.context.get('include', DETAIL_SECTIONS)
+        for name in DETAIL_SECTIONS:
+            if name not in include:
+                del fields[name]
+        return fields
+
+    def section(self, obj, name):
+        items, count, next_link = load_section(self.context.get('request'), obj, name)
+        serializer = self.SECTION_SERIALIZERS[name](items, many=True, context=self.context)
+        return {'count': count, 'next': next_link, 'results': serializer.data}
+
+    def get_members(self, obj):
+        return self.section(obj, 'members')
+
+    def get_tasks(self, obj):
+        return self.section(obj, 'tasks')
+
+    def get_documents(self, obj):
+        return self.section(obj, 'documents')
+
     def get_current_version(self, obj):
-        return obj.logs.count()
+        return obj.version_count
 
 class ProjectListSerializer(serializers.ModelSerializer):
     owner_details = UserSerializer(source='owner', read_only=True)
@@ -112,14 +259,15 @@ class ProjectListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'reference_number', 'title', 'status', 
             'start_date', 'deadline', 'location', 'created_at', 
-            'owner_details', 'version_count', 'document_count'
+            'owner_details', 'version_count', 'document_count',
+            'task_count', 'member_count'
         ]
 
     def get_version_count(self, obj):
-        return obj.logs.count()
+        return obj.version_count
 
     def get_document_count(self, obj):
-        return obj.documents.count()
+        return obj.document_count
 
 class ProjectUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -138,4 +286,64 @@ class ProjectUpdateSerializer(serializers.ModelSerializer):
         return data
 
 class RestoreVersionSerializer(serializers.Serializer):
-    version = serializers.IntegerField(min_value=1)
\ No newline at end of file
+    version = serializers.IntegerField(min_value=1)
+
+class VersionDiffSerializer(serializers.Serializer):
+    from_version = serializers.IntegerField(min_value=1)
+    to_version = serializers.IntegerField(min_value=1)
+
+class ProjectImportMemberSerializer(serializers.Serializer):
+    user = serializers.EmailField()
+    role = serializers.ChoiceField(
+        choices=[choice for choice in ProjectMember.ROLE_CHOICES if choice[0] != 'owner'],
+        default='collaborator'
+    )
+
+class ProjectImportDocumentSerializer(serializers.Serializer):
+    document = serializers.IntegerField(min_value=1)
+    title = serializers.CharField(max_length=255, required=False)
+
+class ProjectImportSerializer(ProjectUpdateSerializer):
+    """Projet complet : champs du projet, membres (e-mails), tâches et documents existants"""
+    members = ProjectImportMemberSerializer(many=True, required=False, max_length=BULK_TASK_LIMIT)
+    tasks = TaskBulkItemSerializer(many=True, required=False, max_length=BULK_TASK_LIMIT)
+    documents = ProjectImportDocumentSerializer(many=True, required=False, max_length=BULK_TASK_LIMIT)
+
+    class Meta(ProjectUpdateSerializer.Meta):
+        fields = ProjectUpdateSerializer.Meta.fields + ['members', 'tasks', 'documents']
+
+    def validate_members(self, members):
+        """Utilisateurs résolus en une requête ; [(utilisateur, rôle)]"""
+        emails = {member['user'] for member in members}
+        users = {user.email: user for user in User.objects.filter(email__in=emails)}
+        missing = emails - set(users)
+        if missing:
+            raise serializers.ValidationError(
+                f"Utilisateur non trouvé : {', '.join(sorted(missing))}"
+            )
+        return [(users[member['user']], member['role']) for member in members]
+
+    def validate_tasks(self, tasks):
+        return resolve_assignees(tasks)
+
+    def validate_documents(self, documents):
+        """Documents référencés, limités aux projets dont l'utilisateur est membre"""
+        ids = {item['document'] for item in documents}
+        found = ProjectDocument.objects.filter(
+            pk__in=ids, project__members__user=self.context['request'].user
+        ).in_bulk()
+        missing = ids - set(found)
+        if missing:
+            raise serializers.ValidationError(
+                f"Documents introuvables : {', '.join(str(pk) for pk in sorted(missing))}"
+            )
+        return [
+            {'document': found[item['document']], 'title': item.get('title') or found[item['document']].title}
+            for item in documents
+        ]
+
+class ProjectCloneSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255, required=False)
+    sections = serializers.MultipleChoiceField(
+        choices=['members', 'tasks', 'documents'], required=False
+    )
@@ -0,0 +1,86 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from auth_api import thumbnails
+from auth_api.membership import membership
+from .blobs import release, retain
+from .counters import COUNTED_MODELS, adjust_counters, deferred_deletes, is_deferred
+from .dashboard import invalidate_dashboard
+from .history import snapshot_if_due
+from .models import Project, ProjectChangeLog, ProjectDocument, ProjectMember, Task
+
+
+@receiver([post_save, post_delete], sender=ProjectMember)
+def membership_changed(sender, instance, **kwargs):
+    membership.invalidate_project_member(instance.project_id, instance.user_id)
+
+
+def counted_saved(sender, instance, created, raw=False, **kwargs):
+    # version_count est incrémenté par ProjectChangeLog.allocate_versions
+    if created and not raw and sender is not ProjectChangeLog:
+        adjust_counters(instance.project_id, **{COUNTED_MODELS[sender]: 1})
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleting(sender, instance, origin=None, **kwargs):
+    # Les compteurs disparaissent avec le projet : rien à ajuster pour ses lignes
+    deferred_deletes()[instance.pk] = origin
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    deferred_deletes().pop(instance.pk, None)
+
+
+def counted_deleted(sender, instance, origin=None, **kwargs):
+    # version_count attribue les numéros de version : jamais décrémenté
+    if sender is ProjectChangeLog or is_deferred(instance.project_id, origin):
+        return
+    adjust_counters(instance.project_id, **{COUNTED_MODELS[sender]: -1})
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(counted_saved, sender=model)
+    post_delete.connect(counted_deleted, sender=model)
+
+
+
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=ProjectDocument)
+@receiver([post_save, post_delete], sender=ProjectChangeLog)
+def dashboard_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboard(instance.project_id)
+
+
+@receiver(post_save, sender=ProjectChangeLog)
+def changelog_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        snapshot_if_due(instance)
+
+
+
+@receiver(pre_save, sender=ProjectDocument)
+def document_file_changing(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk and not instance._state.adding:
+        instance._previous_file = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('file', flat=True).first()
+
+
+@receiver(post_save, sender=ProjectDocument)
+def document_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_file', None)
+    if created:
+        retain([instance])
+        thumbnails.schedule(instance.thumbnail_source(), thumbnails.DOCUMENT_VARIANTS)
+    elif previous is not None and previous != instance.file.name:
+        retain([instance])
+        release([previous])
+
+
+@receiver(post_delete, sender=ProjectDocument)
+def document_deleted(sender, instance, **kwargs):
+    release([instance.file.name])
@@ -0,0 +1,69 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 1024 * 1024
+CHECKSUM_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Fichiers nommés par leur empreinte SHA-256 et répartis par préfixe :
+    <prefix>/ab/cd/abcd…. Un contenu identique n'est écrit qu'une fois ;
+    les références sont comptées par DocumentBlob.
+    """
+    prefix = 'project_documents'
+
+    def __init__(self, prefix=None, **kwargs):
+        super().__init__(**kwargs)
+        if prefix:
+            self.prefix = prefix
+
+    def blob_name(self, checksum):
+        return f'{self.prefix}/{checksum[:2]}/{checksum[2:4]}/{checksum}'
+
+    @staticmethod
+    def checksum(name):
+        """Empreinte d'un nom de blob, None pour un fichier hors du stockage adressé"""
+        base = os.path.basename(name or '')
+        return base if CHECKSUM_RE.match(base) else None
+
+    def staging_dir(self):
+        path = self.path(f'{self.prefix}/tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def save(self, name, content, max_length=None):
+        """Le nom demandé est ignoré : le contenu est haché pendant l'écriture"""
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.staging_dir(), delete=False) as staged:
+            for chunk in content.chunks(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+                staged.write(chunk)
+        return self.commit(staged.name, digest.hexdigest())
+
+    def commit(self, path, checksum):
+        """Range un fichier préparé sous son empreinte, par renommage (sans copie)"""
+        name = self.blob_name(checksum)
+        target = self.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.unlink(path)
+            # Rafraîchit la date : le ramasse-miettes épargne les blobs récents
+            os.utime(target)
+        else:
+            os.replace(path, target)
+            if self.file_permissions_mode is not None:
+                os.chmod(target, self.file_permissions_mode)
+        return name
+
+
+document_storage = ContentAddressedStorage()
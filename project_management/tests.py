@@ -0,0 +1,1150 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+from PIL import Image
+from rest_framework.test import APITestCase, force_authenticate
+
+from auth_api.membership import membership
+from .history import state_at
+from .changelog import changelog_batch, record
+from .dashboard import cache_key, clear_dashboards
+from .references import clear_blocks, next_reference
+from .views import ProjectDocumentViewSet, ProjectViewSet
+from .models import (
+    Project, ProjectMember, ProjectChangeLog, ProjectSnapshot, Task, ProjectDocument,
+    DocumentBlob, UploadSession, ReferenceCounter
+)
+
+User = get_user_model()
+
+
+class ProjectTestMixin:
+    def make_project(self, owner, title='Projet'):
+        project = Project.objects.create(
+            title=title, description='desc', objectives='obj',
+            deadline=date(2030, 1, 1), start_date=date(2024, 1, 1),
+            location='Paris', owner=owner
+        )
+        ProjectMember.objects.create(project=project, user=owner, role='owner')
+        return project
+
+    def use_temp_media(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.thumbnail_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.thumbnail_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, THUMBNAIL_ROOT=self.thumbnail_root
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def asgi_response(self, viewset, actions, path, user, **kwargs):
+        """Réponse de la vue à une requête ASGI (comme sous daphne)"""
+        request = AsyncRequestFactory().get(path)
+        force_authenticate(request, user=user)
+        return viewset.as_view(actions)(request, **kwargs)
+
+    def async_content(self, response):
+        self.assertTrue(response.is_async)
+
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        return async_to_sync(collect)()
+
+    def create_project(self, title='Projet'):
+        response = self.client.post('/api/projects/', {
+            'title': title, 'description': 'desc', 'objectives': 'obj',
+            'deadline': '2030-01-01', 'start_date': '2024-01-01', 'location': 'Paris'
+        })
+        self.assertEqual(response.status_code, 201)
+        return Project.objects.get(pk=response.json()['id'])
+
+
+class MembershipCacheTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        membership.clear()
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.user = User.objects.create_user(
+            username='bob', email='bob@example.com', password='pass12345'
+        )
+        self.project = self.make_project(self.owner)
+
+    def test_role_is_cached_across_requests(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(membership.project_role(None, self.project.pk, self.owner), 'owner')
+        with self.assertNumQueries(0):
+            self.assertEqual(membership.project_role(None, self.project.pk, self.owner), 'owner')
+
+    def test_add_and_remove_member_invalidate_cache(self):
+        self.assertIsNone(membership.project_role(None, self.project.pk, self.user))
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(
+            f'/api/projects/{self.project.pk}/add_member/',
+            {'user': 'bob@example.com', 'role': 'viewer'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(membership.project_role(None, self.project.pk, self.user), 'viewer')
+
+        self.client.delete(
+            f'/api/projects/{self.project.pk}/remove_member/?user_id={self.user.pk}'
+        )
+        self.assertIsNone(membership.project_role(None, self.project.pk, self.user))
+
+
+class ProjectCounterTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+
+    def test_counters_follow_writes(self):
+        project = self.create_project()
+        self.client.post(f'/api/projects/{project.pk}/tasks/', {
+            'title': 'Tâche', 'description': 'desc', 'due_date': '2030-01-01'
+        })
+        self.client.patch(f'/api/projects/{project.pk}/', {'title': 'Renommé'})
+        project.refresh_from_db()
+        self.assertEqual(
+            (project.version_count, project.task_count, project.member_count, project.document_count),
+            (project.logs.count(), 1, 1, 0)
+        )
+        self.assertEqual(project.version_count, 3)
+        project.tasks.get().delete()
+        project.refresh_from_db()
+        self.assertEqual(project.task_count, 0)
+
+    def test_create_response_reports_counters(self):
+        response = self.client.post('/api/projects/', {
+            'title': 'Projet', 'description': 'desc', 'objectives': 'obj',
+            'deadline': '2030-01-01', 'start_date': '2024-01-01', 'location': 'Paris'
+        })
+        data = response.json()
+        self.assertEqual(data['current_version'], 1)
+        self.assertEqual(data['members']['count'], 1)
+        self.assertEqual(len(data['members']['results']), 1)
+        log = Project.objects.get(pk=data['id']).logs.get()
+        self.assertEqual(log.changes['title'], 'Projet')
+
+    def test_stale_instance_does_not_overwrite_counters(self):
+        project = self.create_project()
+        ProjectChangeLog.objects.create(project=project, action='update', changes={})
+        project.title = 'Nouveau'
+        project.save()
+        project.refresh_from_db()
+        self.assertEqual(project.version_count, 2)
+
+    def test_list_is_one_query_for_any_page_size(self):
+        for i in range(5):
+            self.create_project(f'P{i}')
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/projects/').json()
+        self.assertEqual(len(data), 5)
+        self.assertEqual({p['version_count'] for p in data}, {1})
+
+    def test_deleting_a_log_does_not_reuse_versions(self):
+        project = self.create_project()
+        for _ in range(2):
+            record(project, 'update', {})
+        project.logs.get(version=1).delete()
+        self.assertEqual(record(project, 'update', {}).version, 4)
+        project.refresh_from_db()
+        self.assertEqual(project.version_count, 4)
+
+    def test_project_delete_does_not_update_counters_per_child(self):
+        counts = []
+        for total in (1, 10):
+            project = self.create_project()
+            for i in range(total):
+                Task.objects.create(project=project, title=f't{i}', description='d', due_date=date(2030, 1, 1))
+            with CaptureQueriesContext(connection) as queries:
+                project.delete()
+            updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+            self.assertEqual(updates, [])
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_child_delete_after_failed_project_delete_still_counts(self):
+        project = self.create_project()
+        task = Task.objects.create(project=project, title='t', description='d', due_date=date(2030, 1, 1))
+
+        def fail(**kwargs):
+            raise RuntimeError
+        post_delete.connect(fail, sender=ProjectDocument)
+        self.addCleanup(post_delete.disconnect, fail, sender=ProjectDocument)
+        ProjectDocument.objects.create(project=project, title='d', file='x', uploaded_by=self.owner)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Project.objects.get(pk=project.pk).delete()
+        task.delete()
+        project.refresh_from_db()
+        self.assertEqual(project.task_count, 0)
+
+    def test_repair_command(self):
+        project = self.create_project()
+        Task.objects.create(project=project, title='t', description='d', due_date=date(2030, 1, 1))
+        Project.objects.update(version_count=0, task_count=0, member_count=0)
+        call_command('repair_project_counters', stdout=StringIO())
+        project.refresh_from_db()
+        self.assertEqual(
+            (project.version_count, project.task_count, project.member_count), (1, 1, 1)
+        )
+
+
+class ProjectDetailTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.make_project(self.owner)
+
+    def add_tasks(self, total):
+        for i in range(total):
+            Task.objects.create(
+                project=self.project, title=f't{i}', description='d', due_date=date(2030, 1, 1),
+                assigned_to=User.objects.create_user(username=f'u{Task.objects.count()}'),
+                assigned_by=self.owner
+            )
+
+    def test_retrieve_query_count_does_not_depend_on_size(self):
+        counts = []
+        for total in (2, 30):
+            self.add_tasks(total)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/api/projects/{self.project.pk}/')
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        tasks = response.json()['tasks']
+        self.assertEqual(tasks['count'], 32)
+        self.assertEqual(len(tasks['results']), 20)
+        self.assertEqual(tasks['results'][0]['assigned_by_details']['username'], 'owner')
+
+    def test_section_cursor_continues_on_list_endpoint(self):
+        self.add_tasks(25)
+        data = self.client.get(f'/api/projects/{self.project.pk}/').json()
+        following = self.client.get(data['tasks']['next']).json()
+        self.assertIsNone(following['next'])
+        titles = [t['title'] for t in data['tasks']['results'] + following['results']]
+        self.assertEqual(titles, [f't{i}' for i in range(25)])
+        self.assertIsNone(data['members']['next'])
+        self.assertEqual(data['members']['count'], 1)
+
+    def test_task_cursor_follows_requested_ordering(self):
+        for i, day in enumerate([5, 1, 3, 2, 4]):
+            Task.objects.create(
+                project=self.project, title=f't{i}', description='d', due_date=date(2030, 1, day)
+            )
+        url = f'/api/projects/{self.project.pk}/tasks/'
+        for ordering, expected in (('due_date', [1, 3, 2, 4, 0]), ('-due_date', [0, 4, 2, 3, 1])):
+            data = self.client.get(url, {'ordering': ordering, 'page_size': 2}).json()
+            titles = [t['title'] for t in data['results']]
+            while data['next']:
+                data = self.client.get(data['next']).json()
+                titles += [t['title'] for t in data['results']]
+            self.assertEqual(titles, [f't{i}' for i in expected])
+
+    def test_documents_are_listed_newest_first(self):
+        self.use_temp_media()
+        for name in ('a.pdf', 'b.pdf', 'c.pdf'):
+            self.client.post(
+                f'/api/projects/{self.project.pk}/documents/',
+                {'title': name, 'document_type': 'other', 'file': SimpleUploadedFile(name, b'data')},
+                format='multipart'
+            )
+        data = self.client.get(f'/api/projects/{self.project.pk}/documents/').json()
+        self.assertEqual([d['title'] for d in data['results']], ['c.pdf', 'b.pdf', 'a.pdf'])
+        section = self.client.get(f'/api/projects/{self.project.pk}/').json()['documents']
+        self.assertEqual([d['title'] for d in section['results']], ['c.pdf', 'b.pdf', 'a.pdf'])
+
+    def test_include_selects_sections(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/', {'include': 'tasks'})
+        self.assertIn('tasks', response.json())
+        self.assertNotIn('members', response.json())
+        self.assertNotIn('documents', response.json())
+        response = self.client.get(f'/api/projects/{self.project.pk}/', {'include': ''})
+        self.assertNotIn('tasks', response.json())
+        response = self.client.get(f'/api/projects/{self.project.pk}/', {'include': 'logs'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkTaskTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.make_project(self.owner)
+        self.url = f'/api/projects/{self.project.pk}/tasks/bulk/'
+
+    def create(self, total, **extra):
+        tasks = [
+            {'title': f't{i}', 'description': 'd', 'due_date': '2030-01-01', **extra}
+            for i in range(total)
+        ]
+        return self.client.post(self.url, {'tasks': tasks}, format='json')
+
+    def test_bulk_create_query_count_does_not_depend_on_size(self):
+        User.objects.create_user(username='bob')
+        counts = []
+        for total in (3, 40):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.create(total, assigned_to='bob')
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertLessEqual(counts[1], counts[0])
+        self.assertEqual(response.json()[0]['assigned_to'], 'bob')
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.task_count, self.project.version_count), (43, 43))
+        self.assertEqual(self.project.logs.filter(action='task_added').count(), 43)
+
+    def test_bulk_create_validates_whole_batch(self):
+        response = self.create(3, assigned_to='ghost')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ghost', str(response.json()['tasks']))
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_update_logs_changed_tasks_only(self):
+        self.create(3)
+        ids = list(Task.objects.order_by('pk').values_list('pk', flat=True))
+        Task.objects.filter(pk=ids[0]).update(status='closed')
+        response = self.client.patch(self.url, {'ids': ids, 'status': 'closed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({t['status'] for t in response.json()}, {'closed'})
+        logs = self.project.logs.filter(action='task_updated')
+        self.assertEqual(sorted(log.changes['task_id'] for log in logs), ids[1:])
+        self.assertEqual(logs[0].changes['status'], {'from': 'open', 'to': 'closed'})
+
+        response = self.client.patch(self.url, {'ids': ids + [999], 'status': 'open'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Task.objects.filter(status='open').count(), 0)
+        self.assertEqual(self.client.patch(self.url, {'ids': ids}, format='json').status_code, 400)
+
+    def test_bulk_delete(self):
+        self.create(5)
+        ids = list(Task.objects.values_list('pk', flat=True))[:3]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete(self.url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('DELETE')]), 1)
+        # Versions du journal et compteur de tâches : pas d'UPDATE par tâche
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2, updates)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_count, 2)
+        self.assertEqual(self.project.logs.filter(action='task_deleted').count(), 3)
+
+    def test_bulk_requires_membership(self):
+        self.client.force_authenticate(User.objects.create_user(username='outsider'))
+        self.assertEqual(self.create(1).status_code, 403)
+
+
+class MyWorkTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.me = User.objects.create_user(username='me', email='me@example.com')
+        self.other = User.objects.create_user(username='other', email='other@example.com')
+        self.client.force_authenticate(self.me)
+        self.projects = [self.make_project(self.other, f'P{i}') for i in range(3)]
+
+    def task(self, project, day, **extra):
+        return Task.objects.create(
+            project=project, title=f'{project.title}-{day}', description='d',
+            due_date=date(2030, 1, day), **extra
+        )
+
+    def test_tasks_across_projects_ordered_by_due_date(self):
+        for day, project in enumerate(self.projects, start=1):
+            self.task(project, day, assigned_to=self.me)
+            self.task(project, day + 10, assigned_by=self.me, status='closed')
+            self.task(project, day + 20, assigned_to=self.other)
+
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/me/tasks/', {'page_size': 4}).json()
+        following = self.client.get(data['next']).json()
+        titles = [t['title'] for t in data['results'] + following['results']]
+        self.assertEqual(titles, ['P0-1', 'P1-2', 'P2-3', 'P0-11', 'P1-12', 'P2-13'])
+        self.assertEqual(data['results'][0]['project_details']['title'], 'P0')
+
+        data = self.client.get('/api/me/tasks/', {'role': 'assigned'}).json()
+        self.assertEqual([t['title'] for t in data['results']], ['P0-1', 'P1-2', 'P2-3'])
+        data = self.client.get('/api/me/tasks/', {'status': 'closed', 'due_before': '2030-01-12'}).json()
+        self.assertEqual([t['title'] for t in data['results']], ['P0-11', 'P1-12'])
+
+    def test_my_tasks_union_reads_each_branch_from_its_index(self):
+        project = self.projects[0]
+        self.task(project, 1, assigned_to=self.me)
+        self.task(project, 2, assigned_to=self.me, assigned_by=self.me)
+        self.task(project, 3, assigned_by=self.me, status='closed')
+        self.task(project, 4, assigned_to=self.other)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/me/tasks/', {'status': 'open'}).json()
+        self.assertEqual([t['title'] for t in data['results']], ['P0-1', 'P0-2'])
+        sql = queries[0]['sql']
+        self.assertIn(' UNION ', sql)
+        self.assertNotIn(' OR ', sql.split(' UNION ')[0])
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+            # Une recherche par index et par branche, aucun parcours complet de la table
+            self.assertEqual(len([step for step in plan if 'project_management_task USING' in step]), 2)
+            self.assertFalse([step for step in plan if step.startswith('SCAN project_management_task')])
+
+    def test_activity_lists_own_entries_newest_first(self):
+        for project in self.projects:
+            record(project, 'update', {}, user=self.me, description=project.title)
+        record(self.projects[0], 'update', {}, user=self.other)
+        data = self.client.get('/api/me/activity/').json()
+        self.assertEqual([e['description'] for e in data['results']], ['P2', 'P1', 'P0'])
+        self.assertEqual(data['results'][0]['project_details']['id'], self.projects[2].pk)
+        data = self.client.get('/api/me/activity/', {'action': 'restore'}).json()
+        self.assertEqual(data['results'], [])
+
+
+class DashboardTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        clear_dashboards()
+        self.use_temp_media()
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.make_project(self.owner)
+        self.url = f'/api/projects/{self.project.pk}/dashboard/'
+
+    def add_task(self, due_date, **extra):
+        return Task.objects.create(
+            project=self.project, title='t', description='d', due_date=due_date, **extra
+        )
+
+    def test_rollups(self):
+        self.add_task(date(2000, 1, 1), assigned_to=self.owner)
+        self.add_task(date(2000, 1, 1), assigned_to=self.owner, status='closed')
+        self.add_task(date(2100, 1, 1))
+        for name, content in (('a.txt', b'1234'), ('b.txt', b'123456')):
+            self.client.post(
+                f'/api/projects/{self.project.pk}/documents/',
+                {'title': name, 'document_type': 'other', 'file': SimpleUploadedFile(name, content)},
+                format='multipart'
+            )
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['tasks_by_status'], {'open': 2, 'closed': 1})
+        self.assertEqual(
+            [(row['username'], row['total'], row['open']) for row in data['tasks_per_assignee']],
+            [('owner', 2, 1), (None, 1, 1)]
+        )
+        self.assertEqual(data['deadlines'], {'overdue': 1, 'due_soon': 0})
+        self.assertEqual(data['documents_by_type'], {'other': {'count': 2, 'bytes': 10}})
+        self.assertEqual(data['recent_activity'][0]['version'], 2)
+        self.assertEqual(data['project']['task_count'], 3)
+
+    def test_cached_until_a_write(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+        # Entrée du cache partagé (django.core.cache), visible de tous les processus
+        self.assertIsNotNone(cache.get(cache_key(self.project.pk)))
+
+        self.client.post(f'/api/projects/{self.project.pk}/tasks/bulk/', {'tasks': [
+            {'title': 't', 'description': 'd', 'due_date': '2000-01-01'}
+        ]}, format='json')
+        self.assertEqual(self.client.get(self.url).json()['tasks_by_status'], {'open': 1})
+        Task.objects.get().delete()
+        self.assertEqual(self.client.get(self.url).json()['tasks_by_status'], {})
+
+
+class ExportTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.create_project()
+        self.url = f'/api/projects/{self.project.pk}/export/'
+        for i in range(3):
+            self.client.post(f'/api/projects/{self.project.pk}/tasks/', {
+                'title': f'Tâche {i}', 'description': 'desc', 'due_date': '2030-01-01'
+            })
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_streams_every_section(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).decode().splitlines()]
+        self.assertEqual(
+            [row['type'] for row in rows],
+            ['project', 'members'] + ['tasks'] * 3 + ['changelog'] * 4
+        )
+        self.assertEqual(rows[2]['title'], 'Tâche 0')
+        self.assertEqual(rows[-1]['version'], 4)
+
+    def test_asgi_export_is_pulled_block_by_block(self):
+        response = self.asgi_response(
+            ProjectViewSet, {'get': 'export'}, self.url, self.owner, pk=self.project.pk
+        )
+        lines = self.async_content(response).decode().splitlines()
+        self.assertEqual(len(lines), 9)
+
+    def test_csv_section_with_gzip(self):
+        response = self.client.get(self.url, {'output': 'csv', 'sections': 'tasks', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        rows = list(csv.reader(gzip.decompress(self.content(response)).decode().splitlines()))
+        self.assertEqual(rows[0][:2], ['id', 'title'])
+        self.assertEqual([row[1] for row in rows[1:]], ['Tâche 0', 'Tâche 1', 'Tâche 2'])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'output': 'csv'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'sections': 'secrets'}).status_code, 400)
+
+
+class ProjectImportTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com')
+        self.client.force_authenticate(self.owner)
+        self.source = self.create_project('Modèle')
+        self.client.post(f'/api/projects/{self.source.pk}/add_member/', {
+            'user': 'bob@example.com', 'role': 'viewer'
+        })
+        self.client.post(f'/api/projects/{self.source.pk}/tasks/', {
+            'title': 'Tâche', 'description': 'desc', 'due_date': '2030-01-01', 'assigned_to': 'bob'
+        })
+        self.client.post(
+            f'/api/projects/{self.source.pk}/documents/',
+            {'title': 'plan.txt', 'document_type': 'other', 'file': SimpleUploadedFile('plan.txt', b'plan')},
+            format='multipart'
+        )
+        self.document = ProjectDocument.objects.get()
+
+    def payload(self, tasks=1):
+        return {
+            'title': 'Importé', 'description': 'desc', 'objectives': 'obj',
+            'deadline': '2030-01-01', 'start_date': '2024-01-01', 'location': 'Paris',
+            'members': [{'user': 'bob@example.com', 'role': 'collaborator'}],
+            'tasks': [
+                {'title': f't{i}', 'description': 'd', 'due_date': '2030-01-01', 'assigned_to': 'bob'}
+                for i in range(tasks)
+            ],
+            'documents': [{'document': self.document.pk, 'title': 'copie.txt'}],
+        }
+
+    def test_import_creates_graph_with_one_log(self):
+        counts = []
+        for tasks in (2, 40):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/projects/import/', self.payload(tasks), format='json')
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        data = response.json()
+        self.assertEqual(
+            (data['members']['count'], data['tasks']['count'], data['documents']['count'], data['current_version']),
+            (2, 40, 1, 1)
+        )
+
+        project = Project.objects.get(pk=data['id'])
+        self.assertEqual(
+            (project.member_count, project.task_count, project.document_count, project.version_count),
+            (2, 40, 1, 1)
+        )
+        log = project.logs.get()
+        self.assertEqual((log.action, log.changes['title']), ('create', 'Importé'))
+        self.assertEqual(project.members.get(user=self.bob).role, 'collaborator')
+        self.assertEqual(project.documents.get().title, 'copie.txt')
+
+    def test_import_validates_references(self):
+        payload = self.payload()
+        payload['members'] = [{'user': 'ghost@example.com'}]
+        payload['documents'] = [{'document': 999}]
+        response = self.client.post('/api/projects/import/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'members', 'documents'})
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_clone_shares_document_blobs(self):
+        response = self.client.post(f'/api/projects/{self.source.pk}/clone/', {}, format='json')
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(
+            (data['members']['count'], data['tasks']['count'], data['documents']['count'], data['current_version']),
+            (2, 1, 1, 1)
+        )
+        clone = Project.objects.get(pk=data['id'])
+        self.assertEqual(clone.title, 'Modèle (copie)')
+        self.assertEqual(clone.members.get(user=self.bob).role, 'viewer')
+        self.assertEqual(clone.tasks.get().assigned_to, self.bob)
+        copy = clone.documents.get()
+        self.assertEqual((copy.file.name, copy.version), (self.document.file.name, 1))
+        self.assertEqual(DocumentBlob.objects.get(checksum=copy.checksum).references, 2)
+
+        response = self.client.post(
+            f'/api/projects/{self.source.pk}/clone/', {'title': 'Vide', 'sections': ['members']},
+            format='json'
+        )
+        clone = Project.objects.get(pk=response.json()['id'])
+        self.assertEqual((clone.member_count, clone.task_count, clone.document_count), (2, 0, 0))
+
+
+@override_settings(PROJECT_REFERENCE_BLOCK_SIZE=5)
+class ReferenceNumberTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        clear_blocks()
+        self.addCleanup(clear_blocks)
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+
+    def test_block_is_used_without_queries_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(next_reference(2030), 'RJPC-2030-00001')
+        with self.assertNumQueries(0):
+            references = [next_reference(2030) for _ in range(4)]
+        self.assertEqual(references[-1], 'RJPC-2030-00005')
+        self.assertEqual(next_reference(2030), 'RJPC-2030-00006')
+        self.assertEqual(ReferenceCounter.objects.get(year=2030).last_number, 10)
+
+    def test_rolled_back_block_is_not_reused(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    next_reference(2030)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertFalse(ReferenceCounter.objects.filter(year=2030).exists())
+        self.assertEqual(next_reference(2030), 'RJPC-2030-00001')
+
+    def test_counter_starts_after_existing_references(self):
+        project = self.make_project(self.owner)
+        Project.objects.filter(pk=project.pk).update(reference_number='RJPC-2031-48213')
+        self.assertEqual(next_reference(2031), 'RJPC-2031-48214')
+
+    def test_seed_command(self):
+        project = self.make_project(self.owner)
+        Project.objects.filter(pk=project.pk).update(reference_number='RJPC-2032-00042')
+        ReferenceCounter.objects.create(year=2033, last_number=7)
+        call_command('seed_reference_counters', stdout=StringIO())
+        self.assertEqual(ReferenceCounter.objects.get(year=2032).last_number, 42)
+        self.assertEqual(ReferenceCounter.objects.get(year=2033).last_number, 7)
+
+    def test_projects_get_sequential_references(self):
+        first, second = self.make_project(self.owner), self.make_project(self.owner)
+        year = timezone.now().year
+        self.assertEqual(first.reference_number, f'RJPC-{year}-00001')
+        self.assertEqual(second.reference_number, f'RJPC-{year}-00006')
+
+
+@override_settings(PROJECT_SNAPSHOT_INTERVAL=3)
+class ProjectHistoryTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.create_project('v1')
+        # versions 2 à 8 : titres v2 à v8
+        for i in range(2, 9):
+            self.client.patch(f'/api/projects/{self.project.pk}/', {'title': f'v{i}'})
+
+    def test_snapshots_every_interval(self):
+        self.assertEqual(
+            list(self.project.snapshots.values_list('version', flat=True)), [3, 6]
+        )
+        self.assertEqual(self.project.snapshots.get(version=6).state['title'], 'v6')
+
+    def test_state_at_version(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/state/?version=7')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['state']['title'], 'v7')
+        self.assertEqual(response.json()['state']['location'], 'Paris')
+        response = self.client.get(f'/api/projects/{self.project.pk}/state/?version=9')
+        self.assertEqual(response.status_code, 404)
+
+    def test_diff_between_versions(self):
+        response = self.client.get(
+            f'/api/projects/{self.project.pk}/diff/?from_version=2&to_version=5'
+        )
+        self.assertEqual(response.json()['changes'], {'title': {'from': 'v2', 'to': 'v5'}})
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.title, 'v8')
+
+    def test_restore_uses_snapshot_and_creates_one(self):
+        # Instantané v6 puis une seule entrée rejouée
+        with self.assertNumQueries(2):
+            self.assertEqual(state_at(self.project.pk, 7)['title'], 'v7')
+
+        response = self.client.post(
+            f'/api/projects/{self.project.pk}/restore_version/', {'version': 4}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.title, self.project.version_count), ('v4', 9))
+        self.assertEqual(self.project.snapshots.get(version=9).state['title'], 'v4')
+        self.assertEqual(state_at(self.project.pk, 9)['title'], 'v4')
+
+    def test_rebuild_command_matches_replay(self):
+        self.client.post(f'/api/projects/{self.project.pk}/restore_version/', {'version': 2})
+        expected = list(self.project.snapshots.values_list('version', 'state'))
+        ProjectSnapshot.objects.all().delete()
+        call_command('rebuild_project_snapshots', stdout=StringIO())
+        self.assertEqual(list(self.project.snapshots.values_list('version', 'state')), expected)
+
+    def test_versions_are_numbered_and_paginated(self):
+        self.assertEqual(
+            list(self.project.logs.order_by('timestamp', 'id').values_list('version', flat=True)),
+            list(range(1, 9))
+        )
+        url = f'/api/projects/{self.project.pk}/versions/'
+        with self.assertNumQueries(2):
+            data = self.client.get(url, {'page_size': 3}).json()
+        self.assertEqual([v['version'] for v in data['results']], [1, 2, 3])
+        self.assertEqual(data['results'][0]['user'], self.owner.get_full_name())
+        self.assertEqual(data['project']['version_count'], 8)
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([v['version'] for v in data['results']], [4, 5, 6])
+
+        data = self.client.get(url, {'action': 'create'}).json()
+        self.assertEqual([v['version'] for v in data['results']], [1])
+        response = self.client.get(url, {'action': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_number_command_renumbers_in_order(self):
+        ProjectChangeLog.objects.filter(project=self.project).update(version=F('version') + 100)
+        Project.objects.update(version_count=0)
+        call_command('number_changelog_versions', stdout=StringIO())
+        self.assertEqual(
+            list(self.project.logs.order_by('timestamp', 'id').values_list('version', flat=True)),
+            list(range(1, 9))
+        )
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.version_count, 8)
+
+
+class ChangeLogWriterTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.make_project(self.owner)
+
+    def upload(self, *names, title=None, content=b'data'):
+        data = {'documents': [SimpleUploadedFile(name, content) for name in names]}
+        if title:
+            data['title'] = title
+        return self.client.post(
+            f'/api/projects/{self.project.pk}/upload_documents/', data, format='multipart'
+        )
+
+    def test_upload_logs_one_entry_per_document(self):
+        response = self.upload('a.txt', 'b.txt', title='Plan')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([d['version'] for d in response.json()['documents']], [1, 2])
+        logs = list(self.project.logs.order_by('version').values_list('action', 'version'))
+        self.assertEqual(logs, [('document_added', 1), ('document_updated', 2)])
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.version_count, self.project.document_count), (2, 2))
+
+    def test_nested_create_logs_once(self):
+        response = self.client.post(
+            f'/api/projects/{self.project.pk}/documents/',
+            {'title': 'Plan', 'document_type': 'other', 'file': SimpleUploadedFile('a.txt', b'x')},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.project.logs.count(), 1)
+
+    def test_batch_deduplicates_and_bulk_inserts(self):
+        with changelog_batch():
+            record(self.project, 'update', {'title': {'from': 'a', 'to': 'b'}}, key='k')
+            record(self.project, 'update', {'title': {'from': 'a', 'to': 'c'}}, key='k')
+            record(self.project, 'task_added', {})
+            self.assertEqual(self.project.logs.count(), 0)
+        logs = list(self.project.logs.order_by('version'))
+        self.assertEqual([(log.action, log.version) for log in logs], [('update', 1), ('task_added', 2)])
+        self.assertEqual(logs[0].changes['title']['to'], 'c')
+
+    def test_batch_is_discarded_on_error(self):
+        with self.assertRaises(ValueError):
+            with changelog_batch():
+                record(self.project, 'update', {})
+                raise ValueError
+        self.assertEqual(self.project.logs.count(), 0)
+
+    def test_nested_batch_rollback_discards_its_entries(self):
+        with changelog_batch():
+            record(self.project, 'update', {'title': 'a'}, key='k')
+            with self.assertRaises(ValueError):
+                with changelog_batch():
+                    record(self.project, 'update', {'title': 'b'}, key='k')
+                    record(self.project, 'task_added', {})
+                    raise ValueError
+            record(self.project, 'task_deleted', {})
+        logs = list(self.project.logs.order_by('version'))
+        self.assertEqual([log.action for log in logs], ['update', 'task_deleted'])
+        self.assertEqual(logs[0].changes, {'title': 'a'})
+
+    def test_document_versions_continue_from_existing_rows(self):
+        ProjectDocument.objects.bulk_create([ProjectDocument(
+            project=self.project, title='Plan', document_type='other', file='x.txt', version=4
+        )])
+        self.upload('a.txt', title='Plan')
+        self.assertEqual(
+            list(self.project.documents.order_by('version').values_list('version', flat=True)), [4, 5]
+        )
+
+    def test_upload_query_count_does_not_depend_on_file_count(self):
+        counts = []
+        for total in (3, 30):
+            names = [f'f{total}-{i}.txt' for i in range(total)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.upload(*names)
+            self.assertEqual(len(response.json()['documents']), total)
+            counts.append(len(queries))
+        # Le second appel profite du cache des rôles
+        self.assertLessEqual(counts[1], counts[0])
+        self.assertLessEqual(counts[0], 20)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.document_count, self.project.version_count), (33, 33))
+
+    def test_upload_reports_failures_per_file(self):
+        data = {'documents': [SimpleUploadedFile('ok.txt', b'data'), SimpleUploadedFile('empty.txt', b'')]}
+        response = self.client.post(
+            f'/api/projects/{self.project.pk}/upload_documents/', data, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual([d['title'] for d in body['documents']], ['ok.txt'])
+        self.assertEqual([e['file'] for e in body['errors']], ['empty.txt'])
+        document = ProjectDocument.objects.get()
+        self.assertEqual(len(document.checksum), 64)
+
+        response = self.upload('empty.txt', content=b'')
+        self.assertEqual(response.status_code, 400)
+
+
+class DocumentBlobTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.first = self.make_project(self.owner, 'A')
+        self.second = self.make_project(self.owner, 'B')
+
+    def upload(self, project, name, content):
+        return self.client.post(
+            f'/api/projects/{project.pk}/documents/',
+            {'title': name, 'document_type': 'other', 'file': SimpleUploadedFile(name, content)},
+            format='multipart'
+        )
+
+    def blob_files(self):
+        return [
+            name for _, _, names in os.walk(self.media_root) for name in names
+        ]
+
+    def test_identical_content_is_stored_once(self):
+        self.upload(self.first, 'a.pdf', b'same bytes')
+        self.upload(self.first, 'a.pdf', b'same bytes')
+        self.upload(self.second, 'b.pdf', b'same bytes')
+        checksums = set(ProjectDocument.objects.values_list('checksum', flat=True))
+        self.assertEqual(len(checksums), 1)
+        checksum = checksums.pop()
+        name = ProjectDocument.objects.first().file.name
+        self.assertEqual(name, f'project_documents/{checksum[:2]}/{checksum[2:4]}/{checksum}')
+        self.assertEqual(self.blob_files(), [checksum])
+        self.assertEqual(DocumentBlob.objects.get().references, 3)
+
+    def test_collect_removes_unreferenced_blobs_only(self):
+        self.upload(self.first, 'a.pdf', b'kept')
+        self.upload(self.first, 'b.pdf', b'dropped')
+        self.upload(self.second, 'c.pdf', b'dropped')
+        for document in ProjectDocument.objects.filter(title__in=['b.pdf', 'c.pdf']):
+            self.client.delete(f'/api/projects/{document.project_id}/documents/{document.pk}/')
+        self.assertEqual(DocumentBlob.objects.filter(references=0).count(), 1)
+
+        call_command('collect_document_blobs', grace=0, stdout=StringIO())
+        kept = ProjectDocument.objects.get()
+        self.assertEqual(self.blob_files(), [kept.checksum])
+        self.assertEqual(list(DocumentBlob.objects.values_list('checksum', flat=True)), [kept.checksum])
+        self.assertEqual(kept.file.read(), b'kept')
+
+    def test_recount_repairs_references(self):
+        self.upload(self.first, 'a.pdf', b'data')
+        DocumentBlob.objects.update(references=0)
+        call_command('collect_document_blobs', grace=0, recount=True, stdout=StringIO())
+        self.assertEqual(DocumentBlob.objects.get().references, 1)
+        self.assertEqual(len(self.blob_files()), 1)
+
+
+class UploadSessionTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.make_project(self.owner)
+        self.url = f'/api/projects/{self.project.pk}/uploads/'
+
+    def start(self, **data):
+        response = self.client.post(self.url, {'filename': 'film.mp4', 'document_type': 'video', **data})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def put_chunk(self, session_id, index, data):
+        return self.client.put(
+            f'{self.url}{session_id}/chunks/{index}/', data, content_type='application/octet-stream'
+        )
+
+    def test_chunks_are_assembled_into_a_document(self):
+        session_id = self.start(total_size=9)
+        self.assertEqual(self.put_chunk(session_id, 0, b'abc').json()['next_chunk'], 1)
+        # Bloc rejoué après une coupure : ignoré
+        self.assertEqual(self.put_chunk(session_id, 0, b'abc').json()['received_size'], 3)
+        self.assertEqual(self.put_chunk(session_id, 2, b'ghi').status_code, 409)
+        self.put_chunk(session_id, 1, b'def')
+        self.put_chunk(session_id, 2, b'ghi')
+
+        checksum = hashlib.sha256(b'abcdefghi').hexdigest()
+        response = self.client.post(f'{self.url}{session_id}/commit/', {'checksum': checksum})
+        self.assertEqual(response.status_code, 201)
+        document = ProjectDocument.objects.get()
+        self.assertEqual((document.title, document.checksum, document.version), ('film.mp4', checksum, 1))
+        self.assertEqual(document.file.read(), b'abcdefghi')
+        self.assertEqual(self.project.logs.filter(action='document_added').count(), 1)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'project_documents', 'sessions')), [])
+
+    def test_commit_checks_size_and_checksum(self):
+        session_id = self.start(total_size=6)
+        self.put_chunk(session_id, 0, b'abc')
+        response = self.client.post(f'{self.url}{session_id}/commit/')
+        self.assertEqual(response.status_code, 400)
+        self.put_chunk(session_id, 1, b'def')
+        response = self.client.post(f'{self.url}{session_id}/commit/', {'checksum': '0' * 64})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProjectDocument.objects.exists())
+
+    def test_interrupted_chunk_is_truncated(self):
+        session_id = self.start()
+        self.put_chunk(session_id, 0, b'abc')
+        session = UploadSession.objects.get()
+        # Octets d'un bloc interrompu, jamais validé
+        with open(os.path.join(self.media_root, 'project_documents', 'sessions', str(session.pk)), 'ab') as f:
+            f.write(b'garbage')
+        self.put_chunk(session_id, 1, b'def')
+        self.client.post(f'{self.url}{session_id}/commit/')
+        self.assertEqual(ProjectDocument.objects.get().file.read(), b'abcdef')
+
+    def test_chunk_size_limit_and_other_users(self):
+        session_id = self.start()
+        with self.settings(UPLOAD_CHUNK_MAX_SIZE=2):
+            self.assertEqual(self.put_chunk(session_id, 0, b'abc').status_code, 413)
+        stranger = User.objects.create_user(
+            username='bob', email='bob@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.put_chunk(session_id, 0, b'a').status_code, 404)
+        response = self.client.post(self.url, {'filename': 'x.pdf'})
+        self.assertEqual(response.status_code, 403)
+
+
+class DocumentDownloadTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.make_project(self.owner)
+        response = self.client.post(
+            f'/api/projects/{self.project.pk}/documents/',
+            {'title': 'rapport.pdf', 'document_type': 'pdf',
+             'file': SimpleUploadedFile('rapport.pdf', b'0123456789')},
+            format='multipart'
+        )
+        self.document = ProjectDocument.objects.get()
+        self.url = response.json()['file_url']
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_download_with_etag(self):
+        self.assertTrue(self.url.endswith(f'/documents/{self.document.pk}/download/'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), b'0123456789')
+        self.assertEqual(response['ETag'], f'"{self.document.checksum}"')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{self.document.checksum}"')
+        self.assertEqual(response.status_code, 304)
+
+    def test_asgi_download_is_read_block_by_block(self):
+        response = self.asgi_response(
+            ProjectDocumentViewSet, {'get': 'download'}, self.url, self.owner,
+            project_pk=self.project.pk, pk=self.document.pk
+        )
+        self.assertEqual(self.async_content(response), b'0123456789')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(self.content(response), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+        # Contenu modifié depuis : réponse complète
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"autre"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_sendfile_and_permissions(self):
+        with self.settings(DOCUMENT_SENDFILE='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.document.file.name}')
+
+        stranger = User.objects.create_user(
+            username='bob', email='bob@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+def png_bytes(size=(800, 600), color='red'):
+    output = BytesIO()
+    Image.new('RGB', size, color).save(output, 'PNG')
+    return output.getvalue()
+
+
+class ThumbnailTests(ProjectTestMixin, APITestCase):
+    def setUp(self):
+        self.use_temp_media()
+        self.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='pass12345'
+        )
+        self.client.force_authenticate(self.owner)
+        self.project = self.make_project(self.owner)
+
+    def upload(self, name, content, document_type):
+        return self.client.post(
+            f'/api/projects/{self.project.pk}/documents/',
+            {'title': name, 'document_type': document_type, 'file': SimpleUploadedFile(name, content)},
+            format='multipart'
+        ).json()
+
+    def image(self, response):
+        return Image.open(BytesIO(b''.join(response.streaming_content)))
+
+    def test_document_thumbnails_are_generated_lazily_and_cached(self):
+        data = self.upload('photo.png', png_bytes(), 'image')
+        url = data['thumbnails']['thumbnail']
+        self.assertIn('?v=', url)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.image(response).size, (320, 240))
+        cached = os.listdir(os.path.join(self.thumbnail_root, data['thumbnails']['thumbnail'].split('?v=')[1][:2]))
+        self.assertEqual(len(cached), 1)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        preview = self.client.get(data['thumbnails']['preview'])
+        self.assertEqual(self.image(preview).size, (800, 600))
+
+    def test_collect_removes_thumbnails_of_deleted_blobs(self):
+        data = self.upload('photo.png', png_bytes(), 'image')
+        self.client.get(data['thumbnails']['thumbnail'])
+        self.client.delete(f'/api/projects/{self.project.pk}/documents/{data["id"]}/')
+        call_command('collect_document_blobs', grace=0, stdout=StringIO())
+        self.assertEqual([name for _, _, names in os.walk(self.thumbnail_root) for name in names], [])
+
+    def test_non_image_documents_have_no_thumbnail(self):
+        data = self.upload('notes.txt', b'text', 'other')
+        self.assertIsNone(data['thumbnails'])
+        document = ProjectDocument.objects.get()
+        response = self.client.get(
+            f'/api/projects/{self.project.pk}/documents/{document.pk}/thumbnail/thumbnail/'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_avatar_variants(self):
+        self.owner.profile_picture.save('me.png', ContentFile(png_bytes((300, 200))))
+        data = self.upload('notes.txt', b'text', 'other')
+        avatar = data['uploaded_by_details']['avatar']
+        self.assertEqual(set(avatar), {'avatar-small', 'avatar'})
+        response = self.client.get(avatar['avatar-small'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.image(response).size, (48, 48))
+
+        other = User.objects.create_user(
+            username='bob', email='bob@example.com', password='pass12345'
+        )
+        self.assertEqual(self.client.get(f'/auth/users/{other.pk}/avatar/avatar/').status_code, 404)
+
+    def test_signed_urls_work_without_credentials(self):
+        self.owner.profile_picture.save('me.png', ContentFile(png_bytes((300, 200))))
+        data = self.upload('photo.png', png_bytes(), 'image')
+        self.client.force_authenticate(None)
+        for url in (data['thumbnails']['thumbnail'], data['uploaded_by_details']['avatar']['avatar']):
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertIn(self.client.get(url[:-1]).status_code, (401, 403))
+            self.assertIn(self.client.get(url.split('&s=')[0]).status_code, (401, 403))
+
+    def test_avatar_version_follows_content(self):
+        self.owner.profile_picture.save('me.png', ContentFile(png_bytes(color='red')))
+        first = self.owner.avatar_source().key
+        self.owner.profile_picture.delete(save=False)
+        self.owner.profile_picture.save('me.png', ContentFile(png_bytes(color='blue')))
+        self.assertEqual(self.owner.profile_picture.name, 'profile_pictures/me.png')
+        self.owner.refresh_from_db()
+        self.assertNotEqual(self.owner.avatar_source().key, first)
+        self.assertEqual(self.owner.profile_picture_checksum, hashlib.sha256(png_bytes(color='blue')).hexdigest())
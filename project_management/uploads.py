@@ -0,0 +1,76 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from auth_api import thumbnails
+
+from .blobs import retain
+from .changelog import changelog_batch, log_document_added
+from .counters import adjust_counters
+from .models import DocumentVersionCounter, ProjectDocument
+from .storage import document_storage
+
+
+def upload_workers():
+    return getattr(settings, 'DOCUMENT_UPLOAD_WORKERS', 4)
+
+
+def store_file(document, file):
+    """Écrit le fichier en calculant son empreinte (exécuté dans un thread du pool)"""
+    field = document.file.field
+    name = field.generate_filename(document, file.name)
+    document.file.name = field.storage.save(name, file, max_length=field.max_length)
+    document.checksum = document_storage.checksum(document.file.name) or ''
+    return document
+
+
+def bulk_upload(project, files, user, title=None, description=None, document_type='other'):
+    """
+    Enregistre plusieurs fichiers en parallèle (pool borné) puis insère documents
+    et entrées du journal en quelques requêtes, dans une seule transaction.
+    Retourne (documents créés, erreurs par fichier).
+    """
+    max_length = ProjectDocument._meta.get_field('title').max_length
+    pending, errors = [], []
+    for file in files:
+        document_title = title or file.name
+        if not file.size:
+            errors.append({'file': file.name, 'error': "Fichier vide"})
+        elif len(document_title) > max_length:
+            errors.append({'file': file.name, 'error': f"Titre trop long ({max_length} caractères max)"})
+        else:
+            pending.append((ProjectDocument(
+                project=project, title=document_title, description=description,
+                document_type=document_type, uploaded_by=user
+            ), file))
+
+    stored = []
+    with ThreadPoolExecutor(max_workers=upload_workers()) as pool:
+        futures = [(pool.submit(store_file, document, file), file) for document, file in pending]
+        for future, file in futures:
+            try:
+                stored.append(future.result())
+            except OSError as exc:
+                errors.append({'file': file.name, 'error': f"Écriture impossible: {exc}"})
+
+    if not stored:
+        return [], errors
+
+    # En cas d'échec, les blobs écrits (peut-être partagés) restent sans
+    # référence et sont supprimés par collect_document_blobs
+    with changelog_batch():
+        first = DocumentVersionCounter.allocate(
+            project.pk, Counter(document.title for document in stored)
+        )
+        for document in stored:
+            document.version = first[document.title]
+            first[document.title] += 1
+        documents = ProjectDocument.objects.bulk_create(stored)
+        # bulk_create n'émet pas post_save
+        adjust_counters(project.pk, document_count=len(documents))
+        retain(documents)
+        for document in documents:
+            log_document_added(document, user)
+            thumbnails.schedule(document.thumbnail_source(), thumbnails.DOCUMENT_VARIANTS)
+    return documents, errors
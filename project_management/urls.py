@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework_nested import routers
 from .views import (
-    ProjectViewSet, TaskViewSet, ProjectDocumentViewSet
+    ProjectViewSet, TaskViewSet, ProjectDocumentViewSet, UploadSessionViewSet,
+    MyActivityView, MyTasksView
 )
 
 router = routers.DefaultRouter()
@@ -10,8 +11,11 @@ router.register(r'projects', ProjectViewSet, basename='project')
 projects_router = routers.NestedDefaultRouter(router, r'projects', lookup='project')
 projects_router.register(r'tasks', TaskViewSet, basename='project-tasks')
 projects_router.register(r'documents', ProjectDocumentViewSet, basename='project-documents')
+projects_router.register(r'uploads', UploadSessionViewSet, basename='project-uploads')
 
 urlpatterns = [
+    path('me/tasks/', MyTasksView.as_view(), name='my-tasks'),
+    path('me/activity/', MyActivityView.as_view(), name='my-activity'),
     path('', include(router.urls)),
     path('', include(projects_router.urls)),
 ]
\ No newline at end of file
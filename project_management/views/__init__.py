@@ -1,9 +1,14 @@
 from .project_views import ProjectViewSet
 from .task_views import TaskViewSet
 from .document_views import ProjectDocumentViewSet
+from .upload_views import UploadSessionViewSet
+from .me_views import MyActivityView, MyTasksView
 
 __all__ = [
     'ProjectViewSet',
     'TaskViewSet',
     'ProjectDocumentViewSet',
+    'UploadSessionViewSet',
+    'MyTasksView',
+    'MyActivityView',
 ]
\ No newline at end of file
@@ -1,20 +1,27 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.forms.models import model_to_dict
-from django.db import transaction
 
-from ..models import ProjectDocument, Project, ProjectChangeLog
+from auth_api import thumbnails
+from ..changelog import changelog_batch
+from ..downloads import document_response
+from ..models import Project
 from ..serializers import ProjectDocumentSerializer
+from ..pagination import DocumentCursorPagination
 from ..permissions import IsProjectMember
+from ..prefetch import document_queryset
 from .mixins import ChangeLogMixin
 
 class ProjectDocumentViewSet(ChangeLogMixin, viewsets.ModelViewSet):
     serializer_class = ProjectDocumentSerializer
     permission_classes = [IsAuthenticated, IsProjectMember]
+    pagination_class = DocumentCursorPagination
 
     def get_queryset(self):
-        return ProjectDocument.objects.filter(
+        return document_queryset().filter(
             project_id=self.kwargs['project_pk']
         )
 
@@ -25,28 +32,18 @@ class ProjectDocumentViewSet(ChangeLogMixin, viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         project = get_object_or_404(Project, id=self.kwargs['project_pk'])
-        with transaction.atomic():
+        with changelog_batch():
             document = serializer.save(
                 project=project,
                 uploaded_by=self.request.user
             )
-
-            self._log_change(
-                project=project,
-                action='document_added',
-                changes={
-                    'document_id': document.id,
-                    'title': document.title,
-                    'document_type': document.document_type
-                },
-                description=f"Ajout du document: {document.title}"
-            )
+            self._log_document_added(document)
 
     def perform_update(self, serializer):
         document = serializer.instance
         old_data = model_to_dict(document)
         
-        with transaction.atomic():
+        with changelog_batch():
             updated_document = serializer.save()
             
             self._log_change(
@@ -63,7 +60,7 @@ class ProjectDocumentViewSet(ChangeLogMixin, viewsets.ModelViewSet):
 
     def perform_destroy(self, instance):
         project = instance.project
-        with transaction.atomic():
+        with changelog_batch():
             self._log_change(
                 project=project,
                 action='document_removed',
@@ -75,3 +72,33 @@ class ProjectDocumentViewSet(ChangeLogMixin, viewsets.ModelViewSet):
                 description=f"Suppression du document: {instance.title}"
             )
             instance.delete()
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None, project_pk=None):
+        """Télécharge le fichier (Range, ETag, ?inline=1 pour l'afficher)"""
+        document = self.get_object()
+        if not document.file or not document.file.storage.exists(document.file.name):
+            return Response(
+                {"error": "Fichier introuvable"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        as_attachment = request.query_params.get('inline') not in ('1', 'true')
+        return document_response(request, document, as_attachment=as_attachment)
+
+    @action(
+        detail=True, methods=['get'], url_path=r'thumbnail/(?P<variant>[\w-]+)',
+        # URL signée (balise <img>) ou membre authentifié du projet
+        permission_classes=[thumbnails.SignedURL | (IsAuthenticated & IsProjectMember)]
+    )
+    def thumbnail(self, request, pk=None, project_pk=None, variant=None):
+        """Miniature ou aperçu (WebP), générés à la première demande s'ils manquent"""
+        document = self.get_object()
+        response = None
+        if variant in thumbnails.DOCUMENT_VARIANTS:
+            response = thumbnails.thumbnail_response(request, document.thumbnail_source(), variant)
+        if response is None:
+            return Response(
+                {"error": "Aperçu indisponible"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return response
@@ -0,0 +1,46 @@
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from django_filters.rest_framework import DjangoFilterBackend
+
+from ..filters import MyActivityFilter, MyTaskFilter
+from ..models import ProjectChangeLog, Task
+from ..pagination import ActivityCursorPagination, DueTaskCursorPagination
+from ..serializers import ActivitySerializer, MyTaskSerializer
+
+class MyTasksView(generics.ListAPIView):
+    """
+    Tâches de l'utilisateur (assignées ou créées) dans tous ses projets,
+    triées par échéance ; une requête par page.
+    """
+    serializer_class = MyTaskSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = MyTaskFilter
+    pagination_class = DueTaskCursorPagination
+
+    def get_queryset(self):
+        return Task.objects.select_related('assigned_to', 'assigned_by', 'project')
+
+    def keyset_branches(self, queryset):
+        """
+        Sans ?role=, la page est l'UNION de deux branches servies chacune par son
+        index (assigned_to | assigned_by, status, due_date, id), plutôt qu'un OU
+        qu'aucun index composite ne couvre. Avec ?role=, MyTaskFilter a déjà restreint
+        """
+        if self.request.query_params.get('role'):
+            return [queryset]
+        user = self.request.user
+        return [queryset.filter(assigned_to=user), queryset.filter(assigned_by=user)]
+
+class MyActivityView(generics.ListAPIView):
+    """Entrées du journal écrites par l'utilisateur, tous projets confondus, des plus récentes aux plus anciennes"""
+    serializer_class = ActivitySerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = MyActivityFilter
+    pagination_class = ActivityCursorPagination
+
+    def get_queryset(self):
+        return ProjectChangeLog.objects.filter(
+            user=self.request.user
+        ).select_related('user', 'project')
@@ -1,28 +1,22 @@
 from datetime import datetime, date
-import json
-from django.forms.models import model_to_dict
 
-from project_management.models import ProjectChangeLog
-
-def json_serial(obj):
-    """Fonction pour sérialiser les objets date en JSON"""
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    raise TypeError(f"Type {type(obj)} n'est pas JSON serializable")
+from project_management.changelog import log_document_added, record
 
 class ChangeLogMixin:
-    def _log_change(self, project, action, changes, description=None):
+    def _log_change(self, project, action, changes, description=None, key=None):
         """Créer une entrée dans le journal des modifications"""
-        json_changes = json.loads(json.dumps(changes, default=json_serial))
-        
-        return ProjectChangeLog.objects.create(
+        return record(
             project=project,
             user=self.request.user,
             action=action,
-            changes=json_changes,
-            description=description
+            changes=changes,
+            description=description,
+            key=key
         )
 
+    def _log_document_added(self, document):
+        return log_document_added(document, self.request.user)
+
     def _get_field_changes(self, old_data, new_data):
         """Identifier les changements entre deux états"""
         changes = {}
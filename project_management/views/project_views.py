@@ -3,31 +3,44 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django.forms.models import model_to_dict
 from django.db import transaction
-from datetime import datetime, date
 from django.contrib.auth import get_user_model
+from auth_api.streaming import stream
+from search.filters import FullTextSearchFilter
 from ..models import Project, ProjectMember, ProjectChangeLog, ProjectDocument
 from ..serializers import (
     ProjectDetailSerializer, ProjectListSerializer,
     ProjectMemberSerializer, ProjectUpdateSerializer,
-    RestoreVersionSerializer, ProjectDocumentSerializer
+    RestoreVersionSerializer, VersionDiffSerializer, ProjectDocumentSerializer,
+    ProjectVersionSerializer, ProjectImportSerializer, ProjectCloneSerializer
 )
+from ..dashboard import project_dashboard
+from ..export import EXPORT_FORMATS, ExportError, export_stream, parse_sections
+from ..filters import ChangeLogFilter
+from ..project_import import PROJECT_FIELDS, clone_graph, create_project_graph
+from ..pagination import MemberCursorPagination, VersionCursorPagination
+from ..prefetch import UnknownSection, member_queryset, parse_include
+from ..history import apply_state, current_state, diff_states, state_at, take_snapshot
+from ..uploads import bulk_upload
 from ..permissions import IsProjectOwner, IsProjectMember, HasProjectRole
 from .mixins import ChangeLogMixin
 User = get_user_model()
 class ProjectViewSet(ChangeLogMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, HasProjectRole]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'location']
-    search_fields = ['title', 'description', 'objectives', 'reference_number']
+    search_document = 'project'  # titre, description, objectifs, référence
     ordering_fields = ['created_at', 'deadline']
 
     def get_queryset(self):
+        queryset = Project.objects.select_related('owner')
         if self.request.user.is_staff:
-            return Project.objects.all()
-        return Project.objects.filter(members__user=self.request.user)
+            return queryset
+        return queryset.filter(members__user=self.request.user)
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -36,6 +49,21 @@ class ProjectViewSet(ChangeLogMixin, viewsets.ModelViewSet):
             return ProjectUpdateSerializer
         return ProjectDetailSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        """Détail du projet ; ?include=members,tasks,documents choisit les sections"""
+        try:
+            include = parse_include(request.query_params.get('include'))
+        except UnknownSection as exc:
+            return Response(
+                {"error": f"Section inconnue : {exc}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        project = self.get_object()
+        serializer = self.get_serializer(
+            project, context={**self.get_serializer_context(), 'include': include}
+        )
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         """Créer un nouveau projet"""
         with transaction.atomic():
@@ -51,9 +79,11 @@ class ProjectViewSet(ChangeLogMixin, viewsets.ModelViewSet):
             self._log_change(
                 project=project,
                 action='create',
-                changes=serializer.data,
+                changes=current_state(project),
                 description="Création initiale du projet"
             )
+            # Compteurs mis à jour par requête : la réponse les relit
+            project.refresh_from_db(fields=Project.COUNTER_FIELDS)
 
     def perform_update(self, serializer):
         with transaction.atomic():
@@ -80,6 +110,48 @@ class ProjectViewSet(ChangeLogMixin, viewsets.ModelViewSet):
             )
             instance.delete()
 
+    # Import et copie : le projet complet est créé en une transaction
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_project(self, request):
+        """Créer un projet avec ses membres, tâches et documents existants"""
+        serializer = ProjectImportSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = dict(serializer.validated_data)
+        project = create_project_graph(
+            request.user, data,
+            members=data.pop('members', []),
+            tasks=data.pop('tasks', []),
+            documents=data.pop('documents', [])
+        )
+        return Response(
+            ProjectDetailSerializer(project, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        """Copier le projet ; les documents partagent les fichiers de l'original"""
+        source = self.get_object()
+        serializer = ProjectCloneSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {field: getattr(source, field) for field in PROJECT_FIELDS}
+        data['title'] = serializer.validated_data.get('title') or f"{source.title} (copie)"[:255]
+        members, tasks, documents = clone_graph(
+            source, serializer.validated_data.get('sections') or {'members', 'tasks', 'documents'}
+        )
+        project = create_project_graph(
+            request.user, data, members=members, tasks=tasks, documents=documents,
+            description=f"Copie du projet {source.reference_number}"
+        )
+        return Response(
+            ProjectDetailSerializer(project, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
     # Actions pour la gestion des membres
     @action(detail=True, methods=['post'])
     def add_member(self, request, pk=None):
@@ -146,30 +218,86 @@ class ProjectViewSet(ChangeLogMixin, viewsets.ModelViewSet):
             )
 
 
-    # Actions pour la gestion des versions
     @action(detail=True, methods=['get'])
-    def versions(self, request, pk=None):
-        """Liste toutes les versions du projet"""
+    def members(self, request, pk=None):
+        """Membres du projet, paginés par curseur"""
         project = self.get_object()
-        logs = project.logs.all().order_by('timestamp')
-        
-        versions = []
-        for index, log in enumerate(logs, start=1):
-            versions.append({
-                'version': index,
-                'timestamp': log.timestamp,
-                'action': log.action,
-                'action_display': log.get_action_display(),
-                'user': log.user.get_full_name() if log.user else "Système",
-                'description': log.description,
-                'changes': log.changes
-            })
+        paginator = MemberCursorPagination()
+        members = paginator.paginate_queryset(
+            member_queryset().filter(project=project), request, view=self
+        )
+        serializer = ProjectMemberSerializer(members, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def dashboard(self, request, pk=None):
+        """Agrégats du projet (tâches, échéances, documents, activité), mis en cache"""
+        project = self.get_object()
         return Response({
-            "project": ProjectListSerializer(project).data,
-            "versions": versions
+            'project': ProjectListSerializer(project).data,
+            **project_dashboard(project.pk)
         })
 
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Export en flux du projet et de son historique :
+        ?output=ndjson|csv&sections=project,members,tasks,documents,changelog&gzip=1
+        """
+        project = self.get_object()
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Format inconnu : {output} (ndjson ou csv)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            sections = parse_sections(request.query_params.get('sections'), output)
+        except ExportError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        content_type, extension = EXPORT_FORMATS[output]
+        filename = f"{project.reference_number}-{'-'.join(sections) if output == 'csv' else 'export'}.{extension}"
+        if compress:
+            content_type, filename = 'application/gzip', f'{filename}.gz'
+        response = StreamingHttpResponse(
+            stream(request, export_stream(project, output, sections, compress=compress)),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        return response
+
+    # Actions pour la gestion des versions
+    @action(detail=True, methods=['get'])
+    def versions(self, request, pk=None):
+        """Versions du projet, paginées par curseur sur le numéro de version"""
+        project = self.get_object()
+        filterset = ChangeLogFilter(
+            request.query_params,
+            queryset=project.logs.select_related('user')
+        )
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = VersionCursorPagination()
+        logs = paginator.paginate_queryset(filterset.qs, request, view=self)
+        response = paginator.get_paginated_response(
+            ProjectVersionSerializer(logs, many=True).data
+        )
+        response.data['project'] = ProjectListSerializer(project).data
+        return response
+
+    def _missing_version(self, project, *versions):
+        """Réponse 404 si l'une des versions dépasse la dernière version du projet"""
+        for version in versions:
+            if version > project.version_count:
+                return Response(
+                    {"error": f"La version {version} n'existe pas. Version max: {project.version_count}"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        return None
+
     @action(detail=True, methods=['post'])
     def restore_version(self, request, pk=None):
         """Restaure le projet à une version spécifique"""
@@ -180,72 +308,70 @@ class ProjectViewSet(ChangeLogMixin, viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         target_version = serializer.validated_data['version']
-        logs = project.logs.all().order_by('timestamp')
-
-        if target_version > logs.count():
-            return Response(
-                {"error": f"La version {target_version} n'existe pas. Version max: {logs.count()}"},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        error = self._missing_version(project, target_version)
+        if error:
+            return error
 
         with transaction.atomic():
-            # Sauvegarder l'état actuel
-            current_state = model_to_dict(
-                project, 
-                exclude=['owner', 'members', 'tasks', 'documents']
-            )
-            
-            # Convertir les dates en string dans l'état actuel
-            for key, value in current_state.items():
-                if isinstance(value, (date, datetime)):
-                    current_state[key] = value.isoformat()
-
-            # Reconstruire l'état à la version cible
-            restored_state = {}
-            for log in logs[:target_version]:
-                if log.action == 'create':
-                    changes = {
-                        k: v for k, v in log.changes.items() 
-                        if k not in ['owner', 'members', 'tasks', 'documents']
-                    }
-                    restored_state.update(changes)
-                elif log.action == 'update':
-                    for field, change in log.changes.items():
-                        if (field not in ['owner', 'members', 'tasks', 'documents'] 
-                            and 'to' in change):
-                            restored_state[field] = change['to']
-
-            # Appliquer l'état restauré
-            for field, value in restored_state.items():
-                if hasattr(project, field) and field not in [
-                    'owner', 'members', 'tasks', 'documents'
-                ]:
-                    if field in ['start_date', 'deadline'] and isinstance(value, str):
-                        try:
-                            value = datetime.fromisoformat(value).date()
-                        except (ValueError, TypeError):
-                            continue
-                    setattr(project, field, value)
-            
+            previous_state = current_state(project)
+            # Dernier instantané + entrées suivantes seulement
+            restored_state = state_at(project.pk, target_version)
+            apply_state(project, restored_state)
             project.save()
 
-            # Logger la restauration avec conversion JSON
-            self._log_change(
+            log = self._log_change(
                 project=project,
                 action='restore',
                 changes={
                     'restored_to_version': target_version,
-                    'previous_state': current_state,
+                    'previous_state': previous_state,
                     'restored_state': restored_state
                 },
                 description=f"Restauration à la version {target_version}"
             )
+            project.refresh_from_db(fields=Project.COUNTER_FIELDS)
+            take_snapshot(project.pk, log, log.version, current_state(project))
 
         return Response({
             "message": f"Projet restauré à la version {target_version}",
             "project": ProjectDetailSerializer(project).data
         })
 
+    @action(detail=True, methods=['get'])
+    def state(self, request, pk=None):
+        """État du projet à une version donnée (lecture seule)"""
+        project = self.get_object()
+        serializer = RestoreVersionSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        version = serializer.validated_data['version']
+        error = self._missing_version(project, version)
+        if error:
+            return error
+        return Response({"version": version, "state": state_at(project.pk, version)})
+
+    @action(detail=True, methods=['get'])
+    def diff(self, request, pk=None):
+        """Différences entre deux versions du projet (lecture seule)"""
+        project = self.get_object()
+        serializer = VersionDiffSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        from_version = serializer.validated_data['from_version']
+        to_version = serializer.validated_data['to_version']
+        error = self._missing_version(project, from_version, to_version)
+        if error:
+            return error
+        return Response({
+            "from_version": from_version,
+            "to_version": to_version,
+            "changes": diff_states(
+                state_at(project.pk, from_version), state_at(project.pk, to_version)
+            )
+        })
+
     # Gestion des documents
     @action(detail=True, methods=['post'])
     def upload_documents(self, request, pk=None):
@@ -264,27 +390,35 @@ class ProjectViewSet(ChangeLogMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        created_documents = []
-        for file in files:
-            doc = ProjectDocument.objects.create(
-                project=project,
-                title=request.data.get('title', file.name),
-                description=request.data.get('description'),
-                document_type=request.data.get('document_type', 'other'),
-                file=file,
-                uploaded_by=request.user
+        document_type = request.data.get('document_type', 'other')
+        if document_type not in dict(ProjectDocument.DOCUMENT_TYPES):
+            return Response(
+                {"error": "Type de document invalide"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        documents, errors = bulk_upload(
+            project, files, request.user,
+            title=request.data.get('title'),
+            description=request.data.get('description'),
+            document_type=document_type
+        )
+        if not documents:
+            return Response(
+                {"error": "Aucun document n'a pu être uploadé", "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            created_documents.append(doc)
 
         serializer = ProjectDocumentSerializer(
-            created_documents,
+            documents,
             many=True,
             context={'request': request}
         )
         return Response(
             {
-                "message": f"{len(files)} document(s) uploadé(s) avec succès",
-                "documents": serializer.data
+                "message": f"{len(documents)} document(s) uploadé(s) avec succès",
+                "documents": serializer.data,
+                "errors": errors
             },
             status=status.HTTP_201_CREATED
         )
@@ -1,12 +1,20 @@
 from rest_framework import viewsets, status, filters
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 
-from ..models import Task, Project, ProjectChangeLog
-from ..serializers import TaskSerializer
+from auth_api.membership import membership
+from ..bulk_tasks import MissingTasks, create_tasks, delete_tasks, update_tasks
+from ..models import Project, ProjectChangeLog
+from ..serializers import (
+    TaskSerializer, TaskBulkCreateSerializer, TaskBulkDeleteSerializer, TaskBulkUpdateSerializer
+)
+from ..pagination import TaskCursorPagination
 from ..permissions import IsProjectMember
+from ..prefetch import task_queryset
 from .mixins import ChangeLogMixin
 
 class TaskViewSet(ChangeLogMixin, viewsets.ModelViewSet):
@@ -15,9 +23,10 @@ class TaskViewSet(ChangeLogMixin, viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'assigned_to']
     ordering_fields = ['due_date', 'created_at']
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
-        return Task.objects.filter(project_id=self.kwargs['project_pk'])
+        return task_queryset().filter(project_id=self.kwargs['project_pk'])
 
     def perform_create(self, serializer):
         project = get_object_or_404(Project, id=self.kwargs['project_pk'])
@@ -66,4 +75,71 @@ class TaskViewSet(ChangeLogMixin, viewsets.ModelViewSet):
                 },
                 description=f"Suppression de la tâche: {instance.title}"
             )
-            instance.delete()
\ No newline at end of file
+            instance.delete()
+
+    # Opérations groupées : tout le lot est validé, puis écrit en une transaction
+    def bulk_project(self, request):
+        """Projet de l'URL si l'utilisateur en est membre, sinon une réponse d'erreur"""
+        project = get_object_or_404(Project, id=self.kwargs['project_pk'])
+        if membership.project_role(request, project.pk, request.user) is None:
+            return None, Response(
+                {"error": "Seuls les membres du projet peuvent modifier les tâches"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return project, None
+
+    def missing_tasks(self, exc):
+        return Response(
+            {"error": f"Tâches introuvables dans ce projet : {exc}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, project_pk=None):
+        """Créer plusieurs tâches : {"tasks": [...]}"""
+        project, error = self.bulk_project(request)
+        if error:
+            return error
+        serializer = TaskBulkCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        tasks = create_tasks(project, serializer.validated_data['tasks'], request.user)
+        return Response(
+            TaskSerializer(tasks, many=True, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @bulk.mapping.patch
+    def bulk_update(self, request, project_pk=None):
+        """Modifier statut, assignation ou échéance de plusieurs tâches : {"ids": [...], "status": ...}"""
+        project, error = self.bulk_project(request)
+        if error:
+            return error
+        serializer = TaskBulkUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        values = dict(serializer.validated_data)
+        ids = values.pop('ids')
+        try:
+            tasks = update_tasks(project, ids, values, request.user)
+        except MissingTasks as exc:
+            return self.missing_tasks(exc)
+        return Response(TaskSerializer(tasks, many=True, context=self.get_serializer_context()).data)
+
+    @bulk.mapping.delete
+    def bulk_delete(self, request, project_pk=None):
+        """Supprimer plusieurs tâches : {"ids": [...]}"""
+        project, error = self.bulk_project(request)
+        if error:
+            return error
+        serializer = TaskBulkDeleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            delete_tasks(project, serializer.validated_data['ids'], request.user)
+        except MissingTasks as exc:
+            return self.missing_tasks(exc)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,122 @@
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
+from django.db import transaction
+
+from auth_api.membership import membership
+from ..changelog import changelog_batch
+from ..chunked import ChunkTooLarge, append_chunk, discard, finalize, max_chunk_size, session_checksum
+from ..models import Project, ProjectDocument, UploadSession
+from ..permissions import IsProjectMember
+from ..serializers import ProjectDocumentSerializer, UploadCommitSerializer, UploadSessionSerializer
+from .mixins import ChangeLogMixin
+
+class UploadSessionViewSet(ChangeLogMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Upload reprenable : création de la session, envoi des blocs numérotés
+    (PUT .../chunks/<n>/, corps brut) puis validation (POST .../commit/).
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated, IsProjectMember]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(
+            project_id=self.kwargs['project_pk'], user=self.request.user
+        )
+
+    def perform_create(self, serializer):
+        project = get_object_or_404(Project, id=self.kwargs['project_pk'])
+        if membership.project_role(self.request, project.pk, self.request.user) is None:
+            raise PermissionDenied("Seuls les membres du projet peuvent uploader des documents")
+        serializer.save(project=project, user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard(instance)
+        instance.delete()
+
+    def locked_session(self):
+        """Session de l'URL, verrouillée jusqu'à la fin de la transaction"""
+        session = self.get_object()
+        return UploadSession.objects.select_for_update().get(pk=session.pk)
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, project_pk=None, index=None):
+        """Ajoute le bloc `index` ; un bloc déjà reçu est ignoré (reprise)"""
+        index = int(index)
+        with transaction.atomic():
+            session = self.locked_session()
+            if index < session.next_chunk:
+                return Response(self.get_serializer(session).data)
+            if index > session.next_chunk:
+                return Response(
+                    {"error": f"Bloc {session.next_chunk} attendu"},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            try:
+                written = append_chunk(session, request.stream)
+            except ChunkTooLarge:
+                return Response(
+                    {"error": f"Bloc trop volumineux ({max_chunk_size()} octets max)"},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+            if not written:
+                return Response({"error": "Bloc vide"}, status=status.HTTP_400_BAD_REQUEST)
+            if session.total_size is not None and session.received_size + written > session.total_size:
+                return Response(
+                    {"error": "Taille totale annoncée dépassée"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            session.received_size += written
+            session.next_chunk += 1
+            session.save(update_fields=['received_size', 'next_chunk', 'updated_at'])
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=['post'])
+    def commit(self, request, pk=None, project_pk=None):
+        """Crée le document à partir des blocs reçus"""
+        serializer = UploadCommitSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            session = self.locked_session()
+            if not session.received_size:
+                return Response({"error": "Fichier vide"}, status=status.HTTP_400_BAD_REQUEST)
+            if session.total_size is not None and session.received_size != session.total_size:
+                return Response(
+                    {"error": f"Upload incomplet : {session.received_size}/{session.total_size} octets"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            checksum = session_checksum(session)
+            expected = serializer.validated_data.get('checksum')
+            if expected and expected.lower() != checksum:
+                return Response(
+                    {"error": "Empreinte SHA-256 différente du contenu reçu"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            with changelog_batch():
+                document = ProjectDocument(
+                    project=session.project,
+                    title=session.title,
+                    description=session.description,
+                    document_type=session.document_type,
+                    uploaded_by=request.user,
+                    file=finalize(session, checksum),
+                    checksum=checksum
+                )
+                document.save()
+                self._log_document_added(document)
+                session.delete()
+
+        return Response(
+            ProjectDocumentSerializer(document, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
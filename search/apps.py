@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        from . import signals
+        # L'index n'est pas un modèle : ses tables sont créées après migrate
+        # (CREATE ... IF NOT EXISTS, idempotent)
+        post_migrate.connect(signals.create_index, dispatch_uid='search.create_index')
@@ -0,0 +1,223 @@
+import html
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .documents import DOCUMENTS, KIND_SLOTS, split_entry_id
+
+TABLE = 'search_index'
+# Marqueurs posés par le moteur autour des termes trouvés : caractères de contrôle,
+# remplacés par <b></b> seulement après l'échappement HTML de l'extrait
+MARKERS = ('\x02', '\x03')
+HIGHLIGHT = ('<b>', '</b>')
+
+
+def highlight(snippet):
+    """Extrait échappé (texte utilisateur) où seuls les termes trouvés sont balisés"""
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet)
+    return escaped.replace(MARKERS[0], HIGHLIGHT[0]).replace(MARKERS[1], HIGHLIGHT[1])
+
+
+def query_terms(query):
+    """Mots de la requête ; chacun est recherché en préfixe"""
+    return re.findall(r'\w+', query.lower())
+
+
+class BaseSearchBackend:
+    """
+    Interface d'un moteur de recherche plein texte.
+    Une entrée par objet indexé : identifiant, portée, titre et corps.
+    """
+
+    def setup(self):
+        """Crée les structures de l'index (appelé après migrate)"""
+        raise NotImplementedError
+
+    def index(self, entries):
+        raise NotImplementedError
+
+    def remove(self, ids):
+        raise NotImplementedError
+
+    def clear(self, document=None):
+        raise NotImplementedError
+
+    def search(self, query, scopes, limit=20):
+        """
+        `scopes` associe chaque type recherché à la liste des portées autorisées
+        (None : aucune restriction). Retourne des résultats triés par pertinence.
+        """
+        raise NotImplementedError
+
+    def scope_condition(self, scopes, id_column):
+        conditions, params = [], []
+        for kind, allowed in scopes.items():
+            condition = f'{id_column} %% {KIND_SLOTS} = %s'
+            kind_params = [DOCUMENTS[kind].code]
+            if allowed is not None:
+                allowed = list(allowed)
+                if not allowed:
+                    continue
+                condition += f" AND scope IN ({', '.join(['%s'] * len(allowed))})"
+                kind_params.extend(allowed)
+            conditions.append(f'({condition})')
+            params.extend(kind_params)
+        if not conditions:
+            return None, []
+        return ' OR '.join(conditions), params
+
+    @staticmethod
+    def result(row):
+        document, object_id = split_entry_id(row[0])
+        return {
+            'type': document.kind,
+            'id': object_id,
+            'title': row[1],
+            'snippet': highlight(row[2]),
+            'rank': row[3],
+        }
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """Index FTS5 de SQLite, classement BM25 (titre pondéré x10)"""
+
+    def setup(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+                "scope UNINDEXED, title, body, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def index(self, entries):
+        with connection.cursor() as cursor:
+            # FTS5 ne gère pas ON CONFLICT : suppression puis insertion par rowid
+            self.remove([entry['id'] for entry in entries])
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, scope, title, body) VALUES (%s, %s, %s, %s)',
+                [(e['id'], e['scope'], e['title'], e['body']) for e in entries]
+            )
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(i,) for i in ids])
+
+    def clear(self, document=None):
+        with connection.cursor() as cursor:
+            if document is None:
+                cursor.execute(f'DELETE FROM {TABLE}')
+            else:
+                cursor.execute(
+                    f'DELETE FROM {TABLE} WHERE rowid %% {KIND_SLOTS} = %s', [document.code]
+                )
+
+    def search(self, query, scopes, limit=20):
+        terms = query_terms(query)
+        condition, params = self.scope_condition(scopes, 'rowid')
+        if not terms or condition is None:
+            return []
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, title, snippet({TABLE}, -1, %s, %s, '…', 16), "
+                f"-bm25({TABLE}, 0, 10.0, 1.0) AS rank "
+                f"FROM {TABLE} WHERE {TABLE} MATCH %s AND ({condition}) "
+                f"ORDER BY rank DESC LIMIT %s",
+                [*MARKERS, match, *params, limit]
+            )
+            return [self.result(row) for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """tsvector indexé en GIN, classement ts_rank (titre en poids A)"""
+    config = 'simple'
+
+    def __init__(self):
+        self.config = getattr(settings, 'SEARCH_CONFIG', self.config)
+
+    def setup(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+                "id bigint PRIMARY KEY, scope bigint, title text, body text, "
+                "document tsvector)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLE}_document ON {TABLE} USING GIN (document)"
+            )
+
+    def index(self, entries):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (id, scope, title, body, document) "
+                "VALUES (%s, %s, %s, %s, "
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+                "ON CONFLICT (id) DO UPDATE SET scope = EXCLUDED.scope, "
+                "title = EXCLUDED.title, body = EXCLUDED.body, document = EXCLUDED.document",
+                [
+                    (e['id'], e['scope'], e['title'], e['body'],
+                     self.config, e['title'], self.config, e['body'])
+                    for e in entries
+                ]
+            )
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE id = ANY(%s)', [list(ids)])
+
+    def clear(self, document=None):
+        with connection.cursor() as cursor:
+            if document is None:
+                cursor.execute(f'TRUNCATE {TABLE}')
+            else:
+                cursor.execute(
+                    f'DELETE FROM {TABLE} WHERE id %% {KIND_SLOTS} = %s', [document.code]
+                )
+
+    def search(self, query, scopes, limit=20):
+        terms = query_terms(query)
+        condition, params = self.scope_condition(scopes, 'id')
+        if not terms or condition is None:
+            return []
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, title, ts_headline(%s::regconfig, title || ' ' || body, q, %s), "
+                f"ts_rank(document, q) AS rank "
+                f"FROM {TABLE}, to_tsquery(%s::regconfig, %s) q "
+                f"WHERE document @@ q AND ({condition}) "
+                f"ORDER BY rank DESC LIMIT %s",
+                [
+                    self.config,
+                    f'StartSel="{MARKERS[0]}", StopSel="{MARKERS[1]}", MaxWords=16, MinWords=5',
+                    self.config, tsquery, *params, limit
+                ]
+            )
+            return [self.result(row) for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTS5Backend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    """Moteur défini par SEARCH_BACKEND, sinon celui de la base par défaut"""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH_BACKEND', None)
+        backend_class = import_string(path) if path else BACKENDS.get(connection.vendor)
+        if backend_class is None:
+            raise NotImplementedError(
+                f"Aucun moteur de recherche pour la base {connection.vendor}"
+            )
+        _backend = backend_class()
+    return _backend
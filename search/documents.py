@@ -0,0 +1,81 @@
+from django.apps import apps
+
+
+class SearchDocument:
+    """
+    Décrit comment un modèle est indexé : titre, corps et portée d'accès
+    (groupe de discussion, projet...). `code` sert à composer l'identifiant
+    de ligne de l'index, voir `entry_id`. `visible_scopes` renvoie les portées
+    accessibles à un utilisateur (None : aucune restriction).
+    """
+
+    def __init__(self, kind, code, model, title, body, scope=None, visible_scopes=None):
+        self.kind = kind
+        self.code = code
+        self.model_label = model
+        self.title = title
+        self.body = body
+        self.scope = scope
+        self._visible_scopes = visible_scopes
+
+    def visible_scopes(self, user):
+        if self._visible_scopes is None or user.is_staff:
+            return None
+        return self._visible_scopes(user)
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def to_entry(self, instance):
+        return {
+            'id': entry_id(self, instance.pk),
+            'scope': getattr(instance, self.scope) if self.scope else None,
+            'title': ' '.join(str(getattr(instance, f) or '') for f in self.title),
+            'body': ' '.join(str(getattr(instance, f) or '') for f in self.body),
+        }
+
+
+def visible_groups(user):
+    from forum.models import DiscussionGroup
+    return DiscussionGroup.objects.visible_to(user).values_list('pk', flat=True)
+
+
+def member_projects(user):
+    from project_management.models import ProjectMember
+    return ProjectMember.objects.filter(user=user).values_list('project_id', flat=True)
+
+
+# Nombre de types de documents encodables dans l'identifiant de ligne
+KIND_SLOTS = 8
+
+DOCUMENTS = {
+    document.kind: document
+    for document in [
+        SearchDocument(
+            'forum', 1, 'forum.Forum',
+            title=['title', 'category'], body=['description']
+        ),
+        SearchDocument(
+            'discussion', 2, 'forum.Discussion',
+            title=[], body=['message'], scope='discussion_group_id',
+            visible_scopes=visible_groups
+        ),
+        SearchDocument(
+            'project', 3, 'project_management.Project',
+            title=['title', 'reference_number'], body=['description', 'objectives'],
+            scope='id', visible_scopes=member_projects
+        ),
+    ]
+}
+
+DOCUMENTS_BY_CODE = {document.code: document for document in DOCUMENTS.values()}
+
+
+def entry_id(document, object_id):
+    """Identifiant de ligne unique (type, objet) : accès direct par clé primaire"""
+    return object_id * KIND_SLOTS + document.code
+
+
+def split_entry_id(value):
+    return DOCUMENTS_BY_CODE[value % KIND_SLOTS], value // KIND_SLOTS
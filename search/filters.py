@@ -0,0 +1,44 @@
+from django.db.models import Case, IntegerField, When
+from rest_framework.filters import BaseFilterBackend
+
+from .backends import get_backend
+from .documents import DOCUMENTS
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Remplace SearchFilter (LIKE sur chaque champ) par l'index plein texte.
+    La vue déclare `search_document` (type indexé) et peut restreindre les
+    portées avec `get_search_scopes()`. Résultats triés par pertinence.
+    """
+    search_param = 'search'
+    max_results = 1000
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        document = DOCUMENTS[view.search_document]
+        if hasattr(view, 'get_search_scopes'):
+            scopes = view.get_search_scopes()
+        else:
+            scopes = document.visible_scopes(request.user)
+        results = get_backend().search(query, {document.kind: scopes}, limit=self.max_results)
+
+        ids = [result['id'] for result in results]
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+            output_field=IntegerField()
+        ))
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Recherche plein texte (préfixes acceptés)',
+            'schema': {'type': 'string'},
+        }]
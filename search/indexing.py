@@ -0,0 +1,43 @@
+from django.db import transaction
+
+from .backends import get_backend
+from .documents import DOCUMENTS, entry_id
+
+
+def document_for(model):
+    for document in DOCUMENTS.values():
+        if document.model is model:
+            return document
+    return None
+
+
+def index_instance(instance):
+    """Indexe (ou réindexe) un objet après validation de la transaction"""
+    document = document_for(type(instance))
+    entry = document.to_entry(instance)
+    transaction.on_commit(lambda: get_backend().index([entry]))
+
+
+def remove_instance(instance):
+    document = document_for(type(instance))
+    ids = [entry_id(document, instance.pk)]
+    transaction.on_commit(lambda: get_backend().remove(ids))
+
+
+def reindex(document, batch_size=500):
+    """Reconstruit l'index d'un type de document ; retourne le nombre d'objets"""
+    backend = get_backend()
+    total = 0
+    with transaction.atomic():
+        backend.clear(document)
+        batch = []
+        for instance in document.model.objects.order_by().iterator(chunk_size=batch_size):
+            batch.append(document.to_entry(instance))
+            if len(batch) >= batch_size:
+                backend.index(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            backend.index(batch)
+            total += len(batch)
+    return total
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search.backends import get_backend
+from search.documents import DOCUMENTS
+from search.indexing import reindex
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'types', nargs='*',
+            help=f"Types à réindexer ({', '.join(DOCUMENTS)}) ; tous par défaut"
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        kinds = options['types'] or list(DOCUMENTS)
+        unknown = set(kinds) - set(DOCUMENTS)
+        if unknown:
+            raise CommandError(f"Type(s) inconnu(s) : {', '.join(sorted(unknown))}")
+
+        get_backend().setup()
+        for kind in kinds:
+            total = reindex(DOCUMENTS[kind], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{kind} : {total} objet(s) indexé(s)"))
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+
+from .backends import get_backend
+from .documents import DOCUMENTS
+from .indexing import index_instance, remove_instance
+
+
+def update_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_instance(instance)
+
+
+def remove_from_index(sender, instance, **kwargs):
+    remove_instance(instance)
+
+
+def create_index(sender, **kwargs):
+    get_backend().setup()
+
+
+for document in DOCUMENTS.values():
+    post_save.connect(update_index, sender=document.model_label, weak=False)
+    post_delete.connect(remove_from_index, sender=document.model_label, weak=False)
@@ -0,0 +1,91 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from forum.models import Forum, DiscussionGroup, DiscussionMember, Discussion
+from project_management.models import Project, ProjectMember
+from .backends import get_backend
+
+User = get_user_model()
+
+
+class FullTextSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.forum = Forum.objects.create(
+                title='Agriculture durable', description='Échanges sur les récoltes',
+                category='Environnement', created_by=self.user
+            )
+            Forum.objects.create(
+                title='Santé', description='Les récoltes de données médicales',
+                category='Santé', created_by=self.user
+            )
+            self.private = DiscussionGroup.objects.create(
+                theme='Privé', created_by=self.other, forum=self.forum, visibility='private'
+            )
+            DiscussionMember.objects.create(discussion_group=self.private, member=self.other)
+            self.secret = Discussion.objects.create(
+                discussion_group=self.private, sender=self.other,
+                message='Calendrier des récoltes confidentiel'
+            )
+            self.project = Project.objects.create(
+                title='Irrigation', description='Réseau de récolte des eaux',
+                objectives='obj', deadline=date(2030, 1, 1),
+                start_date=date(2024, 1, 1), location='Dakar', owner=self.other
+            )
+            ProjectMember.objects.create(project=self.project, user=self.other, role='owner')
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        return self.client.get('/api/search/', {'q': query, **params}).json()['results']
+
+    def test_ranked_prefix_search_with_snippets(self):
+        results = self.search('récol', type='forum')
+        self.assertEqual([r['title'] for r in results][0], 'Agriculture durable Environnement')
+        self.assertEqual(len(results), 2)
+        self.assertIn('<b>récoltes</b>', results[0]['snippet'])
+        self.assertEqual(self.search('agri recol')[0]['id'], self.forum.pk)
+
+    def test_snippets_escape_user_markup(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Discussion.objects.create(
+                discussion_group=self.private, sender=self.other,
+                message='<img src=x onerror=alert(1)> récoltes <script>alert(2)</script>'
+            )
+        self.client.force_authenticate(self.other)
+        snippet = self.search('onerror', type='discussion')[0]['snippet']
+        self.assertNotIn('<img', snippet)
+        self.assertNotIn('<script>', snippet)
+        self.assertIn('&lt;img src=x <b>onerror</b>=alert(1)&gt;', snippet)
+
+    def test_results_respect_access(self):
+        kinds = {r['type'] for r in self.search('recolt')}
+        self.assertEqual(kinds, {'forum'})
+        self.client.force_authenticate(self.other)
+        kinds = {r['type'] for r in self.search('recolt')}
+        self.assertEqual(kinds, {'forum', 'discussion', 'project'})
+
+    def test_viewset_search_filter_and_signals(self):
+        data = self.client.get('/api/forums/', {'search': 'environ'}).json()
+        self.assertEqual([f['id'] for f in data], [self.forum.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.forum.delete()
+        self.assertEqual(self.client.get('/api/forums/', {'search': 'environ'}).json(), [])
+
+    def test_discussion_list_search_through_url(self):
+        self.client.force_authenticate(self.other)
+        url = f'/api/forums/{self.forum.pk}/groups/{self.private.pk}/discussions/'
+        data = self.client.get(url, {'search': 'calend'}).json()
+        self.assertEqual([d['id'] for d in data['results']], [self.secret.pk])
+        self.assertEqual(self.client.get(url, {'search': 'absent'}).json()['results'], [])
+
+    def test_reindex_command(self):
+        get_backend().clear()
+        self.assertEqual(self.search('recolt'), [])
+        call_command('reindex_search', stdout=StringIO())
+        self.assertEqual(len(self.search('recolt')), 2)
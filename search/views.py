@@ -0,0 +1,38 @@
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .backends import get_backend
+from .documents import DOCUMENTS
+
+
+class SearchView(APIView):
+    """Recherche plein texte sur les forums, les discussions et les projets"""
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"error": "Le paramètre q est requis"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        kinds = request.query_params.get('type')
+        kinds = kinds.split(',') if kinds else list(DOCUMENTS)
+        unknown = set(kinds) - set(DOCUMENTS)
+        if unknown:
+            return Response(
+                {"error": f"Type inconnu : {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        limit = request.query_params.get('limit', '')
+        limit = min(int(limit), self.max_limit) if limit.isdigit() else self.default_limit
+
+        scopes = {kind: DOCUMENTS[kind].visible_scopes(request.user) for kind in kinds}
+        results = get_backend().search(query, scopes, limit=limit)
+        return Response({"results": results})